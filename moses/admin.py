@@ -1,10 +1,17 @@
+import uuid
+
 from django import forms
 from django.contrib import admin
 from django.contrib.admin.forms import AdminAuthenticationForm
 from django.contrib.auth import authenticate
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.text import smart_split, unescape_string_literal
 
-from .models import CustomUser
+from .common.pagination import EstimatedCountPaginator
+from . import conf
+from .models import CustomUser, is_mfa_enabled_annotation
 
 
 class OTPAdminAuthenticationForm(AdminAuthenticationForm):
@@ -78,11 +85,70 @@ class CustomUserAdmin(UserAdmin):
     )
 
     list_display = (
-        'id', 'first_name', 'last_name', 'phone_number', 'email', 'created_at')
+        'id', 'first_name', 'last_name', 'phone_number', 'email', 'is_mfa_enabled', 'created_at')
     readonly_fields = ('mfa_url', )
     ordering = ('-created_at',)
-    list_filter = ('is_staff', 'is_superuser', 'is_active', 'groups')
+    list_filter = ('site', 'is_staff', 'is_superuser', 'is_active', 'groups')
     search_fields = ('phone_number', 'first_name', 'last_name', 'email', 'id')
+    search_help_text = 'UUID, phone number, email or name.'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Filtered to a site, the list is read from the database holding it
+        # (MOSES["SITE_DATABASES"]).
+        if (site_id := request.GET.get('site__id__exact', '')).isdigit():
+            queryset = CustomUser.objects.for_site(int(site_id)).order_by(*self.get_ordering(request))
+        else:
+            queryset = super().get_queryset(request)
+        return queryset.annotate(is_mfa_enabled=is_mfa_enabled_annotation())
+
+    def get_object(self, request, object_id, from_field=None):
+        if from_field is not None:
+            return super().get_object(request, object_id, from_field)
+        # Change forms don't know the user's site: look on every user database.
+        try:
+            return CustomUser.objects.get_from_any_database(object_id)
+        except (CustomUser.DoesNotExist, CustomUser.MultipleObjectsReturned, ValidationError, ValueError):
+            return None
+
+    @admin.display(boolean=True, description='MFA', ordering='is_mfa_enabled')
+    def is_mfa_enabled(self, obj):
+        return obj.is_mfa_enabled
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        ``"contains"`` (the default ``ADMIN_SEARCH_MODE``) is the stock
+        ``icontains`` search over every column. In the opt-in ``"prefix"`` and
+        ``"exact"`` modes each term is matched against the one column its shape
+        fits: a UUID against ``id``, a term with ``@`` against ``email``, digits
+        against ``phone_number`` and anything else against the names. That
+        shrinks the predicate, but the ``(site, ...)`` indexes don't serve it
+        (there is no site filter), a prefix ``LIKE`` needs a
+        ``varchar_pattern_ops`` index under a non-C collation, and names are
+        matched case-insensitively (``UPPER(...) LIKE``).
+        """
+        mode = conf.settings.ADMIN_SEARCH_MODE
+        if mode == 'contains' or not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        lookup = 'exact' if mode == 'exact' else 'startswith'
+        for term in smart_split(search_term):
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            queryset = queryset.filter(self.term_query(term, lookup))
+        return queryset, False
+
+    @staticmethod
+    def term_query(term, lookup):
+        try:
+            return Q(id=uuid.UUID(term))
+        except ValueError:
+            pass
+        if '@' in term:
+            return Q(**{f'email__{lookup}': term})
+        if term.lstrip('+').isdigit():
+            return Q(**{f'phone_number__{lookup}': term})
+        return Q(**{f'first_name__i{lookup}': term}) | Q(**{f'last_name__i{lookup}': term})
 
 
 admin.site.register(CustomUser, CustomUserAdmin)
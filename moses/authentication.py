@@ -1,16 +1,27 @@
 import logging
+import threading
+import time
+from collections import OrderedDict
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password, verify_password
 from django.contrib.auth.models import Permission
+from django.test.signals import setting_changed
 from django.utils.translation import gettext as _
 from rest_framework import HTTP_HEADER_ENCODING, authentication
 from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError, InvalidToken
 from rest_framework_simplejwt.models import TokenUser
 from rest_framework_simplejwt.settings import api_settings
 
+from moses import conf
 from moses.models import CustomUser
 from moses.services.mfa import check_mfa_otp
+from moses.services.phone_numbers import normalize_phone_number
+from moses.services.sites import asite_id_for_domain
+from moses.services.token_revocation import is_token_revoked
+from moses.services.token_versions import current_token_version, token_version_matches, users_for_token
 
 AUTH_HEADER_TYPES = api_settings.AUTH_HEADER_TYPES
 
@@ -25,6 +36,56 @@ AUTH_HEADER_TYPE_BYTES = set(
 UserModel = get_user_model()
 
 
+class VerifiedTokenCache:
+    """
+    Bounded LRU of raw bearer token -> validated token. An entry is kept until
+    the token's ``exp``, so a token reused across requests is decoded and has
+    its signature verified once. Keys are the raw tokens themselves: a hit is
+    a dict lookup and needs the whole token to match.
+    """
+
+    def __init__(self):
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            entry = self._tokens.get(raw_token)
+            if entry is None:
+                return None
+            token, expires_at = entry
+            if expires_at <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return token
+
+    def put(self, raw_token, token, maxsize):
+        if maxsize <= 0 or (expires_at := token.get('exp')) is None:
+            return
+        with self._lock:
+            self._tokens[raw_token] = (token, expires_at)
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > maxsize:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+verified_tokens = VerifiedTokenCache()
+
+
+def _clear_verified_tokens(*args, setting, **kwargs):
+    # Tokens verified under other signing settings must be verified again.
+    if setting in ('SIMPLE_JWT', 'MOSES'):
+        verified_tokens.clear()
+
+
+setting_changed.connect(_clear_verified_tokens)
+
+
 class JWTAuthentication(authentication.BaseAuthentication):
     """
     An authentication plugin that authenticates requests through a JSON web
@@ -92,6 +153,17 @@ class JWTAuthentication(authentication.BaseAuthentication):
         Validates an encoded JSON web token and returns a validated token
         wrapper object.
         """
+        token = verified_tokens.get(raw_token)
+        if token is None:
+            token = self.verify_token(raw_token)
+            verified_tokens.put(raw_token, token, conf.settings.VERIFIED_TOKEN_CACHE_SIZE)
+        # Revocation is checked on every request, cached or not.
+        if is_token_revoked(token):
+            raise AuthenticationFailed(_('Token is revoked'), code='token_revoked')
+        return token
+
+    def verify_token(self, raw_token):
+        """Decode ``raw_token`` and verify its signature and claims."""
         messages = []
         for AuthToken in api_settings.AUTH_TOKEN_CLASSES:
             try:
@@ -115,13 +187,16 @@ class JWTAuthentication(authentication.BaseAuthentication):
             raise InvalidToken(_('Token contained no recognizable user identification'))
 
         try:
-            user = CustomUser.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            user = users_for_token(validated_token).for_auth().get(**{api_settings.USER_ID_FIELD: user_id})
         except CustomUser.DoesNotExist:
             raise AuthenticationFailed(_('User not found'), code='user_not_found')
 
         if not user.is_active:
             raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
 
+        if not token_version_matches(validated_token, user.token_version):
+            raise AuthenticationFailed(_('Token is revoked'), code='token_revoked')
+
         return user
 
 
@@ -136,6 +211,11 @@ class JWTTokenUserAuthentication(JWTAuthentication):
             # identifier claim.
             raise InvalidToken(_('Token contained no recognizable user identification'))
 
+        # The user row isn't loaded here, so the version comes from the cache.
+        token_version = current_token_version(validated_token, validated_token[api_settings.USER_ID_CLAIM])
+        if token_version is None or not token_version_matches(validated_token, token_version):
+            raise AuthenticationFailed(_('Token is revoked'), code='token_revoked')
+
         return TokenUser(validated_token)
 
 
@@ -144,7 +224,7 @@ class MFAModelBackend:
         if username is None:
             username = kwargs.get(UserModel.USERNAME_FIELD)
         try:
-            user = UserModel.objects.get(phone_number=username, site__domain=domain)
+            user = UserModel.objects.for_domain(domain).for_auth().get(phone_number=normalize_phone_number(username))
         except UserModel.DoesNotExist:
             UserModel().set_password(password)
         else:
@@ -153,18 +233,49 @@ class MFAModelBackend:
                     check_mfa_otp(user, kwargs.get('otp')) and
                     self.user_can_authenticate(user)
             )
+            self._log_attempt(username, success, kwargs.get('ip'))
+            if success:
+                return user
 
-            extra_fields = {
-                "ip": kwargs.get('ip'),
-                "username": username,
-                "success": success
-            }
-            if not settings.DEBUG:
-                logger = logging.getLogger('kibana')
-                logger.info("LOGIN", extra=extra_fields)
+    async def aauthenticate(self, request, username=None, password=None, domain=None, **kwargs):
+        """
+        Async authenticate: the lookup uses the async ORM and password hashing
+        runs in a worker thread, so the event loop is never blocked on either.
+        """
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        try:
+            user = await UserModel.objects.for_site(await asite_id_for_domain(domain)).for_auth().aget(
+                phone_number=normalize_phone_number(username)
+            )
+        except UserModel.DoesNotExist:
+            await sync_to_async(make_password, thread_sensitive=False)(password)
+        else:
+            password_ok, must_update = await sync_to_async(verify_password, thread_sensitive=False)(
+                password, user.password
+            )
+            if password_ok and must_update:
+                await sync_to_async(user.set_password, thread_sensitive=False)(password)
+                await user.asave(update_fields=['password'])
+            success = (
+                    password_ok and
+                    check_mfa_otp(user, kwargs.get('otp')) and
+                    self.user_can_authenticate(user)
+            )
+            self._log_attempt(username, success, kwargs.get('ip'))
             if success:
                 return user
 
+    def _log_attempt(self, username, success, ip):
+        extra_fields = {
+            "ip": ip,
+            "username": username,
+            "success": success
+        }
+        if not settings.DEBUG:
+            logger = logging.getLogger('kibana')
+            logger.info("LOGIN", extra=extra_fields)
+
     def user_can_authenticate(self, user):
         """
         Reject users with is_active=False. Custom user models that don't have
@@ -238,7 +349,7 @@ class MFAModelBackend:
 
     def get_user(self, user_id):
         try:
-            user = UserModel._default_manager.get(pk=user_id)
+            user = UserModel._default_manager.for_auth().get(pk=user_id)
         except UserModel.DoesNotExist:
             return None
         return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,23 @@
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+_json_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+if orjson is not None:
+    # Datetimes go through DRF's encoder so the output format stays identical.
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(obj) -> bytes:
+    """
+    Encode ``obj`` to compact UTF-8 JSON. Uses orjson when it is installed and
+    falls back to the stdlib encoder; types neither handles natively (lazy
+    strings, decimals, datetimes, ...) are converted like DRF does.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_encoder.default, option=_ORJSON_OPTIONS)
+    return _json_encoder.encode(obj).encode('utf-8')
@@ -29,6 +29,9 @@ TELEGRAM_AUTH_DATA_EXPIRED = 'telegram_auth_data_expired'
 INVALID_TELEGRAM_AUTH_TEMP_TOKEN = 'invalid_telegram_auth_temp_token'
 TELEGRAM_AUTH_TEMP_TOKEN_EXPIRED = 'telegram_auth_temp_token_expired'
 
+# Social sign-in error codes
+SOCIAL_ACCOUNT_ALREADY_REGISTERED_ON_DOMAIN = 'social_account_already_registered_on_domain'
+
 # Validator error codes
 INVALID_EMAIL = 'invalid_email'
 FIELD_IS_REQUIRED = 'field_is_required'
@@ -36,3 +39,14 @@ PASSWORD_TOO_SHORT = 'password_too_short'
 PASSWORD_TOO_COMMON = 'password_too_common'
 PASSWORD_ENTIRELY_NUMERIC = 'password_entirely_numeric'
 PASSWORD_TOO_SIMILAR = 'password_too_similar'
+
+# Pagination error codes
+INVALID_CURSOR = 'invalid_cursor'
+
+# Export error codes
+INVALID_EXPORT_FORMAT = 'invalid_export_format'
+
+# Import error codes
+INVALID_IMPORT_ROW = 'invalid_import_row'
+IMPORT_ROW_CONFLICT = 'import_row_conflict'
+INVALID_PREFERRED_LANGUAGE = 'invalid_preferred_language'
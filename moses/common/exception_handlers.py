@@ -1,10 +1,43 @@
 from rest_framework.exceptions import NotAuthenticated
-from rest_framework.views import exception_handler
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import exception_handler, set_rollback
 
 from moses.common.exceptions import CustomAPIException
 
 
+class PrerenderedResponse(Response):
+    """A JSON Response whose body was serialized ahead of time."""
+
+    def __init__(self, data, body, **kwargs):
+        super().__init__(data, **kwargs)
+        self.body = body
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = self.accepted_renderer.media_type
+        return self.body
+
+
+def _renders_plain_json(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return (
+            isinstance(renderer, JSONRenderer)
+            and not renderer.get_indent(getattr(request, 'accepted_media_type', ''), {})
+    )
+
+
 def custom_exception_handler(exc, context):
+    if (
+            isinstance(exc, CustomAPIException)
+            and exc.body is not None
+            and _renders_plain_json(context.get('request'))
+    ):
+        # Kwargs-free errors (throttling, failed logins, wrong PINs) carry a
+        # pre-serialized body; serve it without building or encoding anything.
+        set_rollback()
+        return PrerenderedResponse(exc.envelope, exc.body, status=exc.status_code)
+
     response = exception_handler(exc, context)
 
     if response is not None:
@@ -29,4 +62,4 @@ def custom_exception_handler(exc, context):
                 "data": {},
             }
 
-    return response
\ No newline at end of file
+    return response
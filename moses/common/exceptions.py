@@ -1,10 +1,22 @@
+from types import MappingProxyType
 from typing import Dict, List
 
 from rest_framework import status
 from rest_framework.exceptions import APIException
 
+from moses.common import encoders, error_codes
+
+ERRORS_BODY_PREFIX = b'{"errors":'
+ERRORS_BODY_SUFFIX = b',"data":{}}'
+# Upper bound for the number of distinct kwargs-free error payloads kept.
+ERROR_PAYLOAD_CACHE_SIZE = 1024
+
+_EMPTY = MappingProxyType({})
+
 
 class KwargsError(object):
+    __slots__ = ('code', 'kwargs')
+
     code: str
     kwargs: Dict[str, str]
 
@@ -13,6 +25,46 @@ class KwargsError(object):
         self.kwargs = kwargs
 
 
+def _error_entry(code, empty_kwargs):
+    return MappingProxyType({'error_code': code, 'kwargs': _EMPTY if empty_kwargs else None})
+
+
+# Read-only entries for every code of moses.common.error_codes raised without
+# kwargs. kwargs=None and kwargs={} render differently, so both are prebuilt.
+PREBUILT_ERROR_ENTRIES = {
+    (code, empty_kwargs): _error_entry(code, empty_kwargs)
+    for name, code in vars(error_codes).items() if name.isupper()
+    for empty_kwargs in (False, True)
+}
+
+_error_payloads = {}
+
+
+def get_error_payload(key):
+    """
+    Shared ``(errors_repr, envelope, body)`` for a kwargs-free error payload.
+    ``key`` is ``((field_name, ((code, empty_kwargs), ...)), ...)``; ``body`` is
+    the complete serialized response envelope.
+    """
+    if (payload := _error_payloads.get(key)) is not None:
+        return payload
+    errors_repr = MappingProxyType({
+        field_name: tuple(
+            PREBUILT_ERROR_ENTRIES.get(entry_key) or _error_entry(*entry_key)
+            for entry_key in entry_keys
+        )
+        for field_name, entry_keys in key
+    })
+    body = ERRORS_BODY_PREFIX + encoders.dumps({
+        field_name: [dict(entry) for entry in entries]
+        for field_name, entries in errors_repr.items()
+    }) + ERRORS_BODY_SUFFIX
+    payload = (errors_repr, MappingProxyType({'errors': errors_repr, 'data': _EMPTY}), body)
+    if len(_error_payloads) < ERROR_PAYLOAD_CACHE_SIZE:
+        _error_payloads[key] = payload
+    return payload
+
+
 class CustomAPIException(APIException):
     default_detail = "Invalid input."
     default_code = "error"
@@ -20,11 +72,22 @@ class CustomAPIException(APIException):
     def __init__(self, errors: Dict[str, List[KwargsError]], status_code=status.HTTP_400_BAD_REQUEST):
         """
         :param errors: List of error dictionaries, each with `code` and optional `kwargs`.
+
+        Payloads without kwargs are shared, read-only and pre-serialized into
+        ``body``; otherwise ``envelope`` and ``body`` are ``None``.
         """
         if not isinstance(errors, dict):
             raise ValueError("Errors must be a dict.")
         self.detail = 'Bad request'
         self.status_code = status_code
+        if all(not error.kwargs for field_errors in errors.values() for error in field_errors):
+            self.errors_repr, self.envelope, self.body = get_error_payload(tuple(
+                (field_name, tuple((error.code, error.kwargs is not None) for error in field_errors))
+                for field_name, field_errors in errors.items()
+            ))
+            return
+        self.envelope = None
+        self.body = None
         self.errors_repr = {
             field_name: [
                 {
@@ -0,0 +1,137 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from moses.common import error_codes
+from moses.common.exceptions import CustomAPIException, KwargsError
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over ``(created_at, id)``, newest first.
+
+    Every page is a range predicate on the ordering columns instead of an
+    OFFSET, so deep pages cost the same as the first one. ``COUNT(*)`` is only
+    issued when the client asks for it with ``?count=1``.
+    """
+    page_size = 100
+    max_page_size = 1000
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = (F('created_at').desc(nulls_last=True), F('id').desc())
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ('1', 'true'):
+            self.count = queryset.count()
+
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        if (cursor := request.query_params.get(self.cursor_query_param)) is not None:
+            queryset = queryset.filter(self.after(*self.decode_cursor(cursor)))
+
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    @staticmethod
+    def after(created_at, pk):
+        """Rows strictly after ``(created_at, pk)`` in the pagination order (NULL dates last)."""
+        if created_at is None:
+            return Q(created_at__isnull=True, id__lt=pk)
+        return (
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, id__lt=pk)
+                | Q(created_at__isnull=True)
+        )
+
+    def encode_cursor(self, instance):
+        position = [
+            instance.created_at.isoformat() if instance.created_at else None,
+            str(instance.pk),
+        ]
+        return base64.urlsafe_b64encode(json.dumps(position).encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return (
+                datetime.fromisoformat(created_at) if created_at is not None else None,
+                uuid.UUID(pk),
+            )
+        except (AttributeError, TypeError, ValueError):
+            raise CustomAPIException({
+                self.cursor_query_param: [KwargsError(code=error_codes.INVALID_CURSOR)]
+            })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(self.last)
+        params.pop(self.count_query_param, None)
+        return self.request.build_absolute_uri(f'{self.request.path}?{params.urlencode()}')
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'results': schema,
+        }
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
+
+def estimated_row_count(model, using) -> int | None:
+    """The planner's row estimate for ``model``'s table on PostgreSQL, ``None`` elsewhere or if never analyzed."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [model._meta.db_table])
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for large tables: an unfiltered queryset is counted from the
+    planner statistics once they exceed ``estimate_threshold`` rows, instead
+    of a full ``COUNT(*)``. Filtered querysets are still counted exactly.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query') or queryset.query.has_filters():
+            return super().count
+        estimate = estimated_row_count(queryset.model, queryset.db)
+        if estimate is None or estimate < self.estimate_threshold:
+            return super().count
+        return estimate
@@ -1,5 +1,13 @@
 from rest_framework.renderers import JSONRenderer
 
+from moses.common import encoders
+from moses import conf
+
+ENVELOPE_DATA_PREFIX = b'{"errors":{},"data":'
+ENVELOPE_ERRORS_PREFIX = b'{"errors":'
+ENVELOPE_ERRORS_SUFFIX = b',"data":{}}'
+NO_CONTENT_BODY = b'{"errors":{},"data":null}'
+
 
 class CustomJSONRenderer(JSONRenderer):
     def render(self, data, accepted_media_type=None, renderer_context=None):
@@ -22,3 +30,31 @@ class CustomJSONRenderer(JSONRenderer):
             response_data["data"] = data
 
         return super().render(response_data, accepted_media_type, renderer_context)
+
+
+class FastJSONRenderer(CustomJSONRenderer):
+    """
+    Same envelope as CustomJSONRenderer, written straight to bytes.
+
+    The constant parts of the envelope are pre-encoded, payloads that already
+    are an envelope are encoded as-is, and encoding goes through
+    ``MOSES["JSON_ENCODER"]`` (``moses.common.encoders.dumps`` by default: orjson
+    when installed, the stdlib otherwise).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            # Pretty-printed output is for humans; keep DRF's path for it.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        dumps = conf.settings.JSON_ENCODER or encoders.dumps
+        if isinstance(data, dict) and "errors" in data and "data" in data:
+            return dumps(data)
+
+        response = renderer_context.get("response")
+        if response is None or response.status_code < 300:
+            if response is not None and response.status_code == 204:
+                return NO_CONTENT_BODY
+            return ENVELOPE_DATA_PREFIX + dumps(data) + b'}'
+        return ENVELOPE_ERRORS_PREFIX + dumps(data if data else {}) + ENVELOPE_ERRORS_SUFFIX
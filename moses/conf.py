@@ -1,6 +1,7 @@
+from types import MappingProxyType
+
 from django.conf import settings as django_settings
 from django.test.signals import setting_changed
-from django.utils.functional import LazyObject
 from django.utils.module_loading import import_string
 from django.utils.translation import gettext as _
 
@@ -9,28 +10,21 @@ from moses.constants import strings
 MOSES_SETTINGS_NAMESPACE = "MOSES"
 
 
-class ObjDict(dict):
-    def __getattribute__(self, item):
-        try:
-            val = self[item]
-            if isinstance(val, str):
-                val = import_string(val)
-            elif isinstance(val, (list, tuple)):
-                val = [import_string(v) if isinstance(v, str) else v for v in val]
-            self[item] = val
-        except KeyError:
-            val = super(ObjDict, self).__getattribute__(item)
-
-        return val
-
-
 default_settings = {
     "PHONE_NUMBER_VALIDATOR": None,
+    "PHONE_NUMBER_NORMALIZER": None,
     "SHORT_USER_SERIALIZER": None,
     "DEFAULT_LANGUAGE": None,
     "SEND_SMS_HANDLER": None,
     "REQUIRE_EMAIL_CONFIRMATION": True,
     "EMAILS_DISABLED": False,
+    "EMAIL_CONNECTION_MAX_IDLE_SECONDS": 30,
+    "DEFER_SIDE_EFFECTS": True,
+    "SIGNAL_DISPATCH": "inline",
+    "SIGNAL_EXECUTOR_WORKERS": 4,
+    "SIGNAL_EXECUTOR_MAX_PENDING": 1000,
+    "SIGNAL_RECEIVER_TIMEOUT_SECONDS": 10,
+    "SIGNAL_RECEIVER_METRICS_HANDLER": None,
     "REQUIRE_PHONE_NUMBER_CONFIRMATION": True,
     "DOMAIN": None,
     "SENDER_EMAIL": None,
@@ -49,63 +43,77 @@ default_settings = {
     "TELEGRAM_AUTH_TEMP_TOKEN_EXPIRY_MINUTES": 5,
     "TELEGRAM_AUTH_DATA_MAX_AGE_SECONDS": 300,
     "MESSAGE_TEMPLATES": strings.DEFAULT_MESSAGE_TEMPLATES,
+    "READ_REPLICA_DATABASE": None,
+    "READ_REPLICA_STICKINESS_SECONDS": 10,
+    "JSON_ENCODER": None,
+    "ASYNC_VIEWS": False,
+    "ADMIN_SEARCH_MODE": "contains",
+    "TOKEN_REVOCATION_FILTER_CAPACITY": 100000,
+    "TOKEN_REVOCATION_FILTER_ERROR_RATE": 0.001,
+    "TOKEN_REVOCATION_SYNC_SECONDS": 5,
+    "TOKEN_REVOCATION_FILTER_REBUILD_SECONDS": 3600,
+    "TOKEN_VERSION_CACHE_SECONDS": 300,
+    "VERIFIED_TOKEN_CACHE_SIZE": 1024,
+    "SITE_ID_CACHE_SECONDS": 300,
+    "SITE_DATABASES": {},
 }
 
-SETTINGS_TO_IMPORT = ["SEND_SMS_HANDLER", "PHONE_NUMBER_VALIDATOR", "SHORT_USER_SERIALIZER"]
+SETTINGS_TO_IMPORT = ["SEND_SMS_HANDLER", "PHONE_NUMBER_VALIDATOR", "PHONE_NUMBER_NORMALIZER", "SHORT_USER_SERIALIZER",
+                      "JSON_ENCODER", "SIGNAL_RECEIVER_METRICS_HANDLER"]
 
 
 class Settings:
-    def __init__(self, default_settings, explicit_overriden_settings: dict = None):
-        if explicit_overriden_settings is None:
-            explicit_overriden_settings = {}
+    """
+    Immutable snapshot of the MOSES settings.
+
+    Built once per configuration by ``compile_settings``: dict settings are
+    merged over their defaults and frozen, handlers are imported eagerly, and
+    every setting is a slot, so reading one is a plain attribute lookup.
+    """
+    __slots__ = ()
 
-        overriden_settings = (
-                getattr(django_settings, MOSES_SETTINGS_NAMESPACE, {})
-                or explicit_overriden_settings
-        )
+    def __init__(self, values: dict):
+        for setting_name, setting_value in values.items():
+            object.__setattr__(self, setting_name, setting_value)
 
-        self._load_default_settings()
-        self._override_settings(overriden_settings)
-        self._init_settings_to_import()
+    def __setattr__(self, name, value):
+        raise AttributeError("MOSES settings are read-only; use override_settings(MOSES=...)")
 
-    def _load_default_settings(self):
-        for setting_name, setting_value in default_settings.items():
-            if setting_name.isupper():
-                # Copy dict defaults so the in-place merge in _override_settings
-                # never mutates the module-level default_settings between
-                # Settings instances (e.g. across setting_changed reloads).
-                if isinstance(setting_value, dict):
-                    setting_value = dict(setting_value)
-                setattr(self, setting_name, setting_value)
+    def __delattr__(self, name):
+        raise AttributeError("MOSES settings are read-only; use override_settings(MOSES=...)")
 
-    def _override_settings(self, overriden_settings: dict):
-        for setting_name, setting_value in overriden_settings.items():
-            value = setting_value
-            if isinstance(setting_value, dict):
-                value = getattr(self, setting_name, {})
-                value.update(ObjDict(setting_value))
-            setattr(self, setting_name, value)
 
-    def _init_settings_to_import(self):
-        for setting_name in SETTINGS_TO_IMPORT:
-            value = getattr(self, setting_name)
-            if isinstance(value, str):
-                setattr(self, setting_name, import_string(value))
+def compile_settings(overriden_settings: dict = None) -> Settings:
+    values = {
+        setting_name: setting_value
+        for setting_name, setting_value in default_settings.items() if setting_name.isupper()
+    }
+    for setting_name, setting_value in (overriden_settings or {}).items():
+        if isinstance(setting_value, dict):
+            setting_value = {**values.get(setting_name, {}), **setting_value}
+        values[setting_name] = setting_value
 
+    for setting_name in SETTINGS_TO_IMPORT:
+        if isinstance(values[setting_name], str):
+            values[setting_name] = import_string(values[setting_name])
+    for setting_name, setting_value in values.items():
+        if isinstance(setting_value, dict):
+            values[setting_name] = MappingProxyType(setting_value)
 
-class LazySettings(LazyObject):
-    def _setup(self, explicit_overriden_settings=None):
-        self._wrapped = Settings(default_settings, explicit_overriden_settings)
+    snapshot_class = type('Settings', (Settings,), {'__slots__': tuple(values)})
+    return snapshot_class(values)
 
 
-settings = LazySettings()
+settings = compile_settings(getattr(django_settings, MOSES_SETTINGS_NAMESPACE, {}))
 
 
 def reload_moses_settings(*args, **kwargs):
+    # Modules read the snapshot as ``conf.settings`` at call time, so
+    # rebinding this one attribute is enough.
     global settings
     setting, value = kwargs["setting"], kwargs["value"]
     if setting == MOSES_SETTINGS_NAMESPACE:
-        settings._setup(explicit_overriden_settings=value)
+        settings = compile_settings(value)
 
 
 setting_changed.connect(reload_moses_settings)
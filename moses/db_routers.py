@@ -0,0 +1,130 @@
+"""
+Database routers for moses: read-replica routing for read-only actions, and
+per-site user databases (``SiteDatabaseRouter``, at the end of this module).
+
+Add ``moses.db_routers.ReadReplicaRouter`` to ``DATABASE_ROUTERS`` and point
+``MOSES["READ_REPLICA_DATABASE"]`` at the replica alias. Reads are only sent to
+the replica inside ``read_replica()`` (``UserViewSet`` enters it for its pure
+read actions); everything else keeps using the default database.
+
+A client that wrote through moses is pinned to the primary for
+``READ_REPLICA_STICKINESS_SECONDS`` so it always reads its own writes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from moses import conf
+from moses.services.sites import database_for_site
+
+PRIMARY_PIN_CACHE_KEY = 'moses:primary_pin:{}'
+
+_read_database = ContextVar('moses_read_database', default=None)
+
+
+def get_client_ip(request):
+    if conf.settings.IP_HEADER and (ip := request.META.get(conf.settings.IP_HEADER)):
+        return ip
+    return request.META.get('REMOTE_ADDR')
+
+
+def _pin_keys(request, user=None):
+    keys = [PRIMARY_PIN_CACHE_KEY.format(f'ip:{get_client_ip(request)}')]
+    if user is not None and user.is_authenticated:
+        keys.append(PRIMARY_PIN_CACHE_KEY.format(f'user:{user.pk}'))
+    return keys
+
+
+def pin_to_primary(request, user=None):
+    """Keep the client (and ``user``, if given) on the primary for the stickiness window."""
+    if not conf.settings.READ_REPLICA_DATABASE:
+        return
+    cache.set_many(
+        {key: True for key in _pin_keys(request, user)},
+        timeout=conf.settings.READ_REPLICA_STICKINESS_SECONDS
+    )
+
+
+def is_pinned_to_primary(request, user=None):
+    if not conf.settings.READ_REPLICA_DATABASE:
+        return False
+    return bool(cache.get_many(_pin_keys(request, user)))
+
+
+def use_read_replica():
+    """
+    Route subsequent reads to the replica. Returns a token for
+    ``release_read_replica`` (``None`` when no replica is configured).
+    """
+    if alias := conf.settings.READ_REPLICA_DATABASE:
+        return _read_database.set(alias)
+    return None
+
+
+def release_read_replica(token):
+    if token is not None:
+        _read_database.reset(token)
+
+
+@contextmanager
+def read_replica():
+    token = use_read_replica()
+    try:
+        yield
+    finally:
+        release_read_replica(token)
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        # Instances read from the replica remember it in _state.db; make sure
+        # saving them never targets the replica.
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == conf.settings.READ_REPLICA_DATABASE:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, conf.settings.READ_REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if conf.settings.READ_REPLICA_DATABASE and db == conf.settings.READ_REPLICA_DATABASE:
+            return False
+        return None
+
+
+class SiteDatabaseRouter:
+    """
+    Keeps each site's users in the database ``MOSES["SITE_DATABASES"]`` maps
+    its id to (the default database for unmapped sites).
+
+    Queries can't be routed by their filters, so moses reads users through
+    ``CustomUser.objects.for_site(site_id)``, which picks the database itself;
+    this router places writes of user instances and reads that follow one. Every
+    database needs a copy of ``django_site``.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if model._meta.label != settings.AUTH_USER_MODEL or instance is None:
+            return None
+        # A user being saved, or the site whose users are being read.
+        site_id = instance.pk if instance._meta.label == 'sites.Site' else getattr(instance, 'site_id', None)
+        return database_for_site(site_id)
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Sites are replicated to every database.
+        if {obj1._meta.label, obj2._meta.label} & {'sites.Site'}:
+            return True
+        return None
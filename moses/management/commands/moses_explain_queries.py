@@ -0,0 +1,85 @@
+import re
+import uuid
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from moses.models import CustomUser, RevokedToken, email_iexact
+
+SAMPLE_PHONE_NUMBER = '+10000000000'
+SAMPLE_EMAIL = 'explain@example.com'
+
+# Plan fragments of index access on PostgreSQL and SQLite, and of full table scans.
+INDEX_MARKERS = ('Index Scan', 'Index Only Scan', 'USING INDEX', 'USING COVERING INDEX', 'USING PRIMARY KEY',
+                 'USING INTEGER PRIMARY KEY')
+FULL_SCAN_RE = re.compile(r'Seq Scan on|\bSCAN \S+$', re.MULTILINE)
+
+
+def moses_queries(site_id):
+    """The lookups moses runs on every request of its endpoints, by name."""
+    users = CustomUser.objects.for_site(site_id)
+    return {
+        'sign_in': users.for_auth().filter(phone_number=SAMPLE_PHONE_NUMBER),
+        'user_by_id': CustomUser.objects.for_auth().filter(pk=uuid.UUID(int=0)),
+        'email_availability': users.filter(email_iexact(SAMPLE_EMAIL)),
+        'phone_number_availability': users.filter(phone_number=SAMPLE_PHONE_NUMBER),
+        'mfa_status': users.with_mfa_status().filter(phone_number=SAMPLE_PHONE_NUMBER).values_list('is_mfa_enabled'),
+        'sms_unlock_time': users.for_throttle().filter(phone_number=SAMPLE_PHONE_NUMBER),
+        'sms_unlock_time_candidate': users.for_throttle().exclude(phone_number_candidate='').filter(
+            phone_number_candidate=SAMPLE_PHONE_NUMBER
+        ),
+        'reset_password': users.filter(
+            Q(phone_number=SAMPLE_PHONE_NUMBER, is_phone_number_confirmed=True)
+            | email_iexact(SAMPLE_EMAIL) & Q(is_email_confirmed=True)
+        ),
+        'social_sign_in': users.for_social().filter(Q(google_sub='0') | email_iexact(SAMPLE_EMAIL))[:2],
+        'admin_changelist': CustomUser.objects.order_by('-created_at')[:100],
+        'admin_site_changelist': users.order_by('-created_at')[:100],
+        'revoked_token': RevokedToken.objects.filter(jti='0', expires_at__gt=timezone.now()),
+    }
+
+
+def uses_index(plan: str) -> bool:
+    return any(marker in plan for marker in INDEX_MARKERS) and not FULL_SCAN_RE.search(plan)
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the queries moses runs per request and report whether each is served by an index. "
+            "Run it against production-sized data: on small tables the planner prefers full scans.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--domain', help="Site whose id the queries use (default: the first site).")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--no-seqscan', action='store_true',
+                            help="PostgreSQL: disable sequential scans to see whether an index can serve a query.")
+        parser.add_argument('--strict', action='store_true',
+                            help="Fail when a query isn't served by an index, e.g. in CI.")
+
+    def handle(self, *args, domain, database, no_seqscan, strict, verbosity, **options):
+        connection = connections[database]
+        if no_seqscan and connection.vendor != 'postgresql':
+            raise CommandError("--no-seqscan needs PostgreSQL.")
+        sites = Site.objects.using(database).values_list('id', flat=True)
+        site_id = sites.filter(domain=domain).first() if domain else sites.order_by('id').first()
+        if domain and site_id is None:
+            raise CommandError(f"No site with domain {domain!r} on database {database!r}.")
+
+        unindexed = []
+        with transaction.atomic(using=database):
+            if no_seqscan:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, queryset in moses_queries(site_id).items():
+                plan = queryset.using(database).explain()
+                indexed = uses_index(plan)
+                if not indexed:
+                    unindexed.append(name)
+                self.stdout.write(f"{name:<28} {'index' if indexed else 'FULL SCAN'}")
+                if verbosity >= 2:
+                    self.stdout.write(f"    {plan}".replace('\n', '\n    '))
+
+        if strict and unindexed:
+            raise CommandError(f"Not served by an index: {', '.join(unindexed)}")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from moses.services.export import EXPORT_FORMATS, export_users
+
+
+class Command(BaseCommand):
+    help = "Stream the users of one site as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('domain', help="Domain of the site whose users are exported.")
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000,
+                            help="Rows fetched per server-side cursor round trip.")
+        parser.add_argument('--output', help="File to write to (default: stdout).")
+        parser.add_argument('--database', default=None,
+                            help="Database alias to read from, e.g. a replica (default: the site's).")
+
+    def handle(self, *args, domain, export_format, chunk_size, output, database, **options):
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+        lines = export_users(domain, export_format, chunk_size=chunk_size, using=database)
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            f.writelines(lines)
@@ -0,0 +1,57 @@
+import sys
+import time
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+
+from moses.services.user_import import IMPORT_FORMATS, UserImport, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk-import users of one site from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('domain', help="Domain of the site the users are imported into.")
+        parser.add_argument('path', help="File to import, or - for stdin. Columns: phone_number, email, "
+                                         "password, first_name, last_name, preferred_language.")
+        parser.add_argument('--format', dest='import_format', choices=IMPORT_FORMATS, default='csv')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Password hashing processes (default: CPU count, 0 hashes in-process).")
+        parser.add_argument('--send-confirmations', action='store_true',
+                            help="Send confirmation codes to the imported users once the import is done.")
+        parser.add_argument('--database', default=None,
+                            help="Database alias to import into (default: the site's, see SITE_DATABASES).")
+
+    def handle(self, *args, domain, path, import_format, batch_size, workers, send_confirmations, database,
+               **options):
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        try:
+            site = Site.objects.using(database).get(domain=domain)
+        except Site.DoesNotExist:
+            raise CommandError(f"Site with domain {domain} does not exist.")
+
+        user_import = UserImport(site, batch_size=batch_size, workers=workers, using=database)
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        started_at = time.monotonic()
+        try:
+            for processed in user_import.run(read_rows(stream, import_format)):
+                elapsed = time.monotonic() - started_at
+                self.stdout.write(
+                    f"{processed} rows: {len(user_import.created_ids)} created, "
+                    f"{len(user_import.rejected)} rejected ({processed / elapsed:.0f} rows/s)"
+                )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line_number, field, code in user_import.rejected:
+            self.stderr.write(f"line {line_number}: {field or '-'}: {code}")
+        if send_confirmations:
+            self.stdout.write(f"Sending confirmation codes to {len(user_import.created_ids)} users...")
+            user_import.send_confirmations()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(user_import.created_ids)} of {user_import.processed} rows "
+            f"in {time.monotonic() - started_at:.1f}s."
+        ))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from moses.services.token_revocation import purge_expired_revocations
+
+
+class Command(BaseCommand):
+    help = "Delete revocations of tokens that have expired anyway. Run it periodically, e.g. daily."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {purge_expired_revocations()} expired revocations.")
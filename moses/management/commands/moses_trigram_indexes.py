@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from moses.models import CustomUser
+
+TRIGRAM_COLUMNS = ('phone_number', 'email', 'first_name', 'last_name')
+
+
+def trigram_index_name(column):
+    return f'moses_user_{column}_trgm'
+
+
+class Command(BaseCommand):
+    help = ("Create (or drop) PostgreSQL trigram indexes backing the admin's "
+            "ADMIN_SEARCH_MODE = \"contains\" search.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drop', action='store_true', help="Drop the indexes instead.")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, drop, database, **options):
+        connection = connections[database]
+        if connection.vendor != 'postgresql':
+            raise CommandError("Trigram indexes need PostgreSQL with the pg_trgm extension.")
+        table = connection.ops.quote_name(CustomUser._meta.db_table)
+        with connection.cursor() as cursor:
+            if not drop:
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for column in TRIGRAM_COLUMNS:
+                name = connection.ops.quote_name(trigram_index_name(column))
+                if drop:
+                    cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+                else:
+                    # Matches the UPPER("column"::text) LIKE ... that icontains compiles to.
+                    cursor.execute(
+                        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} '
+                        f'USING gin (UPPER({connection.ops.quote_name(column)}::text) gin_trgm_ops)'
+                    )
+                self.stdout.write(f"{'Dropped' if drop else 'Created'} {trigram_index_name(column)}")
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_only_duplicates(apps, schema_editor):
+    """
+    Fail, listing them, when users of a site share an email in all but case:
+    the case-insensitive constraint can't be added until they are resolved.
+    """
+    CustomUser = apps.get_model('moses', 'CustomUser')
+    duplicates = list(
+        CustomUser.objects.using(schema_editor.connection.alias)
+        .values('site_id', lower_email=Lower('email'))
+        .annotate(users=Count('pk'))
+        .filter(users__gt=1)
+        .values_list('site_id', 'lower_email')
+        .order_by('site_id', 'lower_email')
+    )
+    if duplicates:
+        rows = ''.join(f"\n  site {site_id}: {email!r}" for site_id, email in duplicates)
+        raise RuntimeError(f"Users of these sites share an email in all but case, resolve them first:{rows}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moses', '0007_customuser_site_created_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_only_duplicates, migrations.RunPython.noop, elidable=True),
+        migrations.RemoveConstraint(model_name='customuser', name='one_email_per_site'),
+        # Its unique index also serves the LOWER(email) lookups of email_iexact.
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(models.F('site'), Lower('email'), name='one_email_per_site_ci'),
+        ),
+    ]
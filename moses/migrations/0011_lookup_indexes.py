@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+from moses.common.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('moses', '0010_customuser_token_version'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='customuser',
+            index=models.Index(
+                fields=['site', 'phone_number_candidate'],
+                name='moses_user_site_phone_cand_idx',
+                condition=~models.Q(phone_number_candidate=''),
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name='customuser',
+            index=models.Index(fields=['created_at'], name='moses_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+# moses.services.phone_numbers.to_e164 as of this migration, frozen so that
+# later changes to it or to PHONE_NUMBER_NORMALIZER don't change what it did.
+_SEPARATORS_RE = re.compile(r'[\s\-().]')
+
+
+def to_e164(phone_number):
+    if not phone_number:
+        return phone_number
+    compact = _SEPARATORS_RE.sub('', phone_number)
+    if compact.startswith('00'):
+        compact = '+' + compact[2:]
+    return compact
+
+
+def normalize_phone_numbers(apps, schema_editor):
+    """
+    Store phone numbers saved before canonicalization in their canonical form,
+    so their users can sign in, reset a password and be found again. Fails,
+    listing them, when a row's canonical number is taken by another user of
+    its site: those accounts must be resolved before migrating.
+    """
+    CustomUser = apps.get_model('moses', 'CustomUser')
+    users = CustomUser.objects.using(schema_editor.connection.alias)
+    collisions = []
+    last_pk = None
+    while True:
+        batch = users.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch.values_list('pk', 'site_id', 'phone_number', 'phone_number_candidate')[:BATCH_SIZE])
+        if not batch:
+            break
+        for pk, site_id, phone_number, phone_number_candidate in batch:
+            changes = {}
+            if (candidate := to_e164(phone_number_candidate)) != phone_number_candidate:
+                changes['phone_number_candidate'] = candidate
+            if (canonical := to_e164(phone_number)) != phone_number:
+                if users.filter(site_id=site_id, phone_number=canonical).exclude(pk=pk).exists():
+                    collisions.append((pk, site_id, phone_number))
+                else:
+                    changes['phone_number'] = canonical
+            if changes:
+                users.filter(pk=pk).update(**changes)
+        last_pk = batch[-1][0]
+    if collisions:
+        rows = ''.join(
+            f"\n  user {pk} of site {site_id}: {phone_number!r}" for pk, site_id, phone_number in collisions
+        )
+        raise RuntimeError(f"Another user of the site already has the canonical form of these numbers:{rows}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moses', '0011_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phone_numbers, migrations.RunPython.noop, elidable=True),
+    ]
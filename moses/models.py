@@ -4,18 +4,135 @@ import pyotp as pyotp
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.contrib.auth.models import PermissionsMixin
 from django.db import models
+from django.db.models import ExpressionWrapper, F, Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact, In
 from django.utils import timezone
 from django.utils.translation import gettext as _
 
-from moses.conf import settings as moses_settings
+from moses import conf
 from moses.enums import Credential
+from moses.services.phone_numbers import normalize_phone_number
+from moses.services.sites import database_for_site, site_id_for_domain
+from moses.services.token_versions import forget_token_version
+
+
+def is_mfa_enabled_annotation():
+    """``is_mfa_enabled`` computed by the database, so the secret never has to be loaded."""
+    return ExpressionWrapper(~Q(mfa_secret_key=''), output_field=models.BooleanField())
+
+
+def email_iexact(email: str) -> Q:
+    """
+    Case-insensitive email match. Compiles to ``LOWER(email) = ...``, which
+    the ``(site, LOWER(email))`` unique index serves, where ``iexact`` would scan.
+    """
+    return Q(Exact(Lower('email'), email.lower()))
+
+
+def email_iexact_in(emails) -> Q:
+    return Q(In(Lower('email'), [email.lower() for email in emails]))
 
 
 class CustomUserManager(BaseUserManager):
     use_in_migrations = True
 
+    # Column profiles for the hot lookups. Everything outside a profile stays
+    # deferred and is fetched on first access (see CustomUser.load_deferred).
+    AUTH_FIELDS = (
+        'id',
+        'site',
+        'password',
+        'last_login',
+        'is_active',
+        'is_staff',
+        'is_superuser',
+        'mfa_secret_key',
+        'email',
+        'email_candidate',
+        'is_email_confirmed',
+        'phone_number',
+        'phone_number_candidate',
+        'is_phone_number_confirmed',
+        'first_name',
+        'last_name',
+        'preferred_language',
+        'token_version',
+    )
+    THROTTLE_FIELDS = (
+        'id',
+        'password_reset_code_sms_unlocks_at',
+        'phone_number_confirmation_code_sms_unlocks_at',
+        'phone_number_candidate_confirmation_code_sms_unlocks_at',
+    )
+    SOCIAL_FIELDS = (
+        'id',
+        'site',
+        'is_active',
+        'email',
+        'is_email_confirmed',
+        'google_sub',
+        'telegram_id',
+        'token_version',
+    )
+
+    # Set on the copies returned by for_site().
+    _scoped = False
+    _site_id = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self._scoped:
+            queryset = queryset.filter(site_id=self._site_id)
+        return queryset
+
+    def for_site(self, site_id):
+        """
+        This manager bound to the users of ``site_id``: its querysets filter on
+        the site id (no ``django_site`` join) and use the database holding the
+        site (``MOSES["SITE_DATABASES"]``). A ``None`` site id matches nothing.
+        """
+        manager = self.db_manager(database_for_site(site_id))
+        manager._scoped, manager._site_id = True, site_id
+        return manager
+
+    def for_domain(self, domain):
+        """``for_site`` for the site with ``domain``, resolved through the cached site id."""
+        return self.for_site(site_id_for_domain(domain))
+
+    def get_from_any_database(self, pk):
+        """
+        The user with ``pk`` on whichever database holds their site, for lookups
+        that don't know the site (activation links, the admin change form).
+        Ids are random UUIDs, so a user's id names one database; rows copied
+        between databases break that, and then ``MultipleObjectsReturned`` is
+        raised rather than picking one. ``DoesNotExist`` when no database has it.
+        """
+        users = [
+            user
+            for alias in (None, *dict.fromkeys(conf.settings.SITE_DATABASES.values()))
+            if (user := self.db_manager(alias).filter(pk=pk).first()) is not None
+        ]
+        if len(users) > 1:
+            raise self.model.MultipleObjectsReturned(f"User {pk} exists on several databases.")
+        if not users:
+            raise self.model.DoesNotExist
+        return users[0]
+
+    def for_auth(self):
+        return self.get_queryset().only(*self.AUTH_FIELDS)
+
+    def for_throttle(self):
+        return self.get_queryset().only(*self.THROTTLE_FIELDS)
+
+    def for_social(self):
+        return self.get_queryset().only(*self.SOCIAL_FIELDS)
+
+    def with_mfa_status(self):
+        return self.get_queryset().annotate(is_mfa_enabled=is_mfa_enabled_annotation())
+
     def _create_user(self, phone_number, password, **extra_fields):
-        user = self.model(phone_number=phone_number, **extra_fields)
+        user = self.model(phone_number=normalize_phone_number(phone_number), **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
         return user
@@ -26,9 +143,9 @@ class CustomUserManager(BaseUserManager):
         extra_fields.setdefault('is_superuser', False)
         extra_fields.setdefault('is_active', True)
         user = self._create_user(phone_number, password, **extra_fields)
-        if moses_settings.REQUIRE_EMAIL_CONFIRMATION:
+        if conf.settings.REQUIRE_EMAIL_CONFIRMATION:
             send_credential_confirmation_code(user, Credential.EMAIL, generate_new=True)
-        if moses_settings.REQUIRE_PHONE_NUMBER_CONFIRMATION:
+        if conf.settings.REQUIRE_PHONE_NUMBER_CONFIRMATION:
             send_credential_confirmation_code(user, Credential.PHONE_NUMBER, generate_new=True)
         return user
 
@@ -50,7 +167,7 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         verbose_name_plural = _("Users")
         constraints = [
             models.UniqueConstraint(fields=['site', 'phone_number'], name='one_phone_number_per_site'),
-            models.UniqueConstraint(fields=['site', 'email'], name='one_email_per_site'),
+            models.UniqueConstraint(F('site'), Lower('email'), name='one_email_per_site_ci'),
             models.UniqueConstraint(
                 fields=['site', 'google_sub'],
                 name='one_google_sub_per_site',
@@ -62,6 +179,16 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
                 condition=~models.Q(telegram_id=''),
             ),
         ]
+        indexes = [
+            models.Index(fields=['site', 'created_at'], name='moses_user_site_created_idx'),
+            # Optional candidates are mostly blank: index only the set ones.
+            models.Index(
+                fields=['site', 'phone_number_candidate'],
+                name='moses_user_site_phone_cand_idx',
+                condition=~Q(phone_number_candidate=''),
+            ),
+            models.Index(fields=['created_at'], name='moses_user_created_idx'),
+        ]
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -116,14 +243,16 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False, verbose_name=_("Is staff"))
 
     preferred_language = models.CharField(
-        choices=moses_settings.LANGUAGE_CHOICES,
-        default=moses_settings.DEFAULT_LANGUAGE,
+        choices=conf.settings.LANGUAGE_CHOICES,
+        default=conf.settings.DEFAULT_LANGUAGE,
         max_length=10,
         verbose_name=_("Preferred language")
     )
     created_at = models.DateTimeField(default=timezone.now, blank=True, null=True, verbose_name=_("Created at"))
 
     mfa_secret_key = models.CharField(blank=True, default='', max_length=160)
+    # Embedded in JWTs; bumping it revokes all of the user's tokens (moses.services.token_versions).
+    token_version = models.PositiveIntegerField(default=0, verbose_name=_("Token version"))
 
     google_sub = models.CharField(
         max_length=255,
@@ -145,12 +274,89 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     @property
     def mfa_url(self):
-        return pyotp.totp.TOTP(
-            self.mfa_secret_key.encode('utf-8')
-        ).provisioning_uri(
-            f"{self.first_name} {self.last_name}",
-            moses_settings.DOMAIN
-        )
+        """
+        Provisioning URI of the user's TOTP secret, empty without one. Built on
+        first access and memoized until the secret, name or domain changes.
+        """
+        if not self.mfa_secret_key:
+            return ''
+        key = (self.mfa_secret_key, self.first_name, self.last_name, conf.settings.DOMAIN)
+        cached = self.__dict__.get('_mfa_url')
+        if cached is None or cached[0] != key:
+            url = pyotp.totp.TOTP(
+                self.mfa_secret_key.encode('utf-8')
+            ).provisioning_uri(
+                f"{self.first_name} {self.last_name}",
+                conf.settings.DOMAIN
+            )
+            cached = self._mfa_url = (key, url)
+        return cached[1]
+
+    @property
+    def is_mfa_enabled(self):
+        """
+        Whether the user has a TOTP secret. Read from the loaded secret, or from
+        the ``is_mfa_enabled`` annotation (``CustomUser.objects.with_mfa_status()``)
+        when the secret column is deferred.
+        """
+        if 'mfa_secret_key' in self.__dict__ or '_is_mfa_enabled' not in self.__dict__:
+            return bool(self.mfa_secret_key)
+        return self._is_mfa_enabled
+
+    @is_mfa_enabled.setter
+    def is_mfa_enabled(self, value):
+        # Set by the queryset annotation.
+        self._is_mfa_enabled = value
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so that save() can tell a deactivation.
+        instance._loaded_is_active = instance.__dict__.get('is_active')
+        return instance
+
+    def bump_token_version(self):
+        """Revoke every JWT issued to the user so far, once saved."""
+        self._token_version_bumped = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if (
+                self.__dict__.get('is_active') is False and getattr(self, '_loaded_is_active', None)
+                and (update_fields is None or 'is_active' in update_fields)
+        ):
+            self.bump_token_version()
+        bumped = self.__dict__.pop('_token_version_bumped', False) and not self._state.adding
+        if bumped:
+            # Incremented by the database, so concurrent bumps are never lost.
+            self.token_version = F('token_version') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        self._loaded_is_active = self.__dict__.get('is_active')
+        if bumped:
+            self.refresh_from_db(fields=['token_version'])
+            # Only now that the new version is written can the cached one go.
+            forget_token_version(self.site_id, self.pk, using=self._state.db)
+
+    def load_deferred(self, *fields):
+        """Fetch those of ``fields`` left deferred by a manager profile in one query."""
+        deferred = self.get_deferred_fields().intersection(fields)
+        if deferred:
+            self.refresh_from_db(fields=deferred)
 
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
+
+
+class RevokedToken(models.Model):
+    """
+    A revoked JWT, kept until it would have expired anyway.
+    See moses.services.token_revocation.
+    """
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -1,24 +1,42 @@
+from asgiref.sync import sync_to_async
+from django.apps import apps
 from django.conf import settings as django_settings
-from django.contrib.auth import authenticate
+from django.contrib.auth import aauthenticate, authenticate
 from django.contrib.auth.models import Group
 from django.contrib.sites.models import Site
-from django.db import IntegrityError, transaction
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError
 from django.db.models import Q
-from djoser import constants
+from django.utils.translation import gettext as _
+from djoser import constants, serializers as djoser_serializers
+from djoser.utils import decode_uid
 from rest_framework import serializers, status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.fields import CharField
 from rest_framework.serializers import raise_errors_on_nested_writes, ModelSerializer, Serializer
 from rest_framework.utils import model_meta
+from rest_framework_simplejwt import serializers as jwt_serializers, settings as jwt_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
 from rest_framework_simplejwt.serializers import TokenObtainSerializer
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from moses.common import error_codes
 from moses.common.exceptions import CustomAPIException, KwargsError
-from moses.conf import settings as moses_settings
+from moses import conf
 from moses.enums import Credential
-from moses.models import CustomUser
+from moses.models import CustomUser, email_iexact
 from moses.services.credentials_confirmation import send_credential_confirmation_code
-from moses.validators import EmailValidator, PasswordValidator
+from moses.services import side_effects
+from moses.services.phone_numbers import is_valid_phone_number, normalize_phone_number
+from moses.services.sites import database_for_site
+from moses.services.token_revocation import is_token_revoked, revoke_token
+from moses.services.token_versions import (
+    pair_access_tokens,
+    refresh_token_for,
+    token_version_matches,
+    users_for_token,
+)
+from moses.validators import PasswordValidator, validate_email
 
 
 class CustomEmailField(serializers.EmailField):
@@ -26,8 +44,8 @@ class CustomEmailField(serializers.EmailField):
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # Use the custom EmailValidator
-        self.validators = [EmailValidator(field_name='email')]
+        # The shared EmailValidator, so its verdict cache is shared too
+        self.validators = [validate_email]
 
     def run_validation(self, data=serializers.empty):
         """Override to handle required field validation with CustomAPIException."""
@@ -48,6 +66,13 @@ class CustomEmailField(serializers.EmailField):
         return super().run_validation(data)
 
 
+class PhoneNumberField(serializers.CharField):
+    """Phone number canonicalized (see ``PHONE_NUMBER_NORMALIZER``) once, when the request is parsed."""
+
+    def to_internal_value(self, data):
+        return normalize_phone_number(super().to_internal_value(data))
+
+
 class CustomPasswordField(serializers.CharField):
     """Custom password field that raises CustomAPIException for all validation errors."""
 
@@ -133,10 +158,12 @@ class PublicCustomUserSerializer(serializers.ModelSerializer):
 
 
 class PrivateCustomUserSerializer(serializers.ModelSerializer):
-    is_mfa_enabled = serializers.SerializerMethodField()
-
-    def get_is_mfa_enabled(self, obj):
-        return len(obj.mfa_secret_key) > 0
+    # Annotated on the users list (CustomUser.objects.with_mfa_status()), so listing
+    # users never loads the secret.
+    is_mfa_enabled = serializers.BooleanField(read_only=True)
+    phone_number = PhoneNumberField(required=False, max_length=20)
+    # Columns backing non-model fields, for ?fields= projections on the users list.
+    sparse_field_columns = {'is_mfa_enabled': ()}
 
     def _update_credential(self, user, credential: Credential, value: str):
         match credential:
@@ -191,17 +218,19 @@ class PrivateCustomUserSerializer(serializers.ModelSerializer):
     def update(self, user, validated_data):
         raise_errors_on_nested_writes('update', self, validated_data)
         info = model_meta.get_field_info(user)
-        if (phone_number := validated_data.pop('phone_number', None)) is not None:
-            self._update_credential(user, Credential.PHONE_NUMBER, phone_number)
-        if (email := validated_data.pop('email', None)) is not None:
-            self._update_credential(user, Credential.EMAIL, email)
-        for attr, value in validated_data.items():
-            if attr in info.relations and info.relations[attr].to_many:
-                field = getattr(user, attr)
-                field.set(value)
-            else:
-                setattr(user, attr, value)
-        user.save()
+        # Confirmation codes go out once the changes commit, never for a failed save.
+        with side_effects.atomic(using=user._state.db):
+            if (phone_number := validated_data.pop('phone_number', None)) is not None:
+                self._update_credential(user, Credential.PHONE_NUMBER, phone_number)
+            if (email := validated_data.pop('email', None)) is not None:
+                self._update_credential(user, Credential.EMAIL, email)
+            for attr, value in validated_data.items():
+                if attr in info.relations and info.relations[attr].to_many:
+                    field = getattr(user, attr)
+                    field.set(value)
+                else:
+                    setattr(user, attr, value)
+            user.save()
         self.instance = user
         return user
 
@@ -236,7 +265,7 @@ def site_with_domain_exists(value):
 
 
 class CustomUserCreateSerializer(serializers.ModelSerializer):
-    phone_number = serializers.CharField(validators=[moses_settings.PHONE_NUMBER_VALIDATOR])
+    phone_number = PhoneNumberField()
     email = CustomEmailField(required=False)
     domain = serializers.CharField(validators=[site_with_domain_exists], write_only=True)
     password = CustomPasswordField(required=True)
@@ -257,9 +286,8 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         ]
 
     def validate(self, attrs):
-        if 'email' not in attrs or CustomUser.objects.filter(
-                site__domain=attrs['domain'],
-                email=attrs['email']
+        if 'email' not in attrs or CustomUser.objects.for_domain(attrs['domain']).filter(
+                email_iexact(attrs['email']),
         ).exists():
             raise CustomAPIException(
                 {
@@ -270,8 +298,7 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
                     ]
                 }
             )
-        if 'phone_number' not in attrs or CustomUser.objects.filter(
-                site__domain=attrs['domain'],
+        if 'phone_number' not in attrs or CustomUser.objects.for_domain(attrs['domain']).filter(
                 phone_number=attrs['phone_number']
         ).exists():
             raise CustomAPIException(
@@ -283,7 +310,7 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
                     ]
                 }
             )
-        elif not moses_settings.PHONE_NUMBER_VALIDATOR(attrs['phone_number']):
+        elif not is_valid_phone_number(attrs['phone_number']):
             raise CustomAPIException(
                 {
                     'phone_number': [
@@ -307,10 +334,12 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
         return user
 
     def perform_create(self, validated_data):
-        with transaction.atomic():
+        site_id = validated_data['site'].pk
+        # On the site's database, so the confirmation codes wait for its commit.
+        with side_effects.atomic(using=database_for_site(site_id)):
             if 'preferred_language' not in validated_data:
-                validated_data['preferred_language'] = moses_settings.DEFAULT_LANGUAGE
-            user = CustomUser.objects.create_user(**validated_data)
+                validated_data['preferred_language'] = conf.settings.DEFAULT_LANGUAGE
+            user = CustomUser.objects.for_site(site_id).create_user(**validated_data)
         return user
 
 
@@ -322,9 +351,9 @@ class TokenObtainPairSerializer(TokenObtainSerializer):
 
     @classmethod
     def get_token(cls, user):
-        return RefreshToken.for_user(user)
+        return refresh_token_for(user)
 
-    def validate(self, attrs):
+    def get_authenticate_kwargs(self, attrs):
         authenticate_kwargs = {
             self.username_field: attrs[self.username_field],
             'password': attrs['password'],
@@ -335,9 +364,21 @@ class TokenObtainPairSerializer(TokenObtainSerializer):
             authenticate_kwargs['request'] = self.context['request']
         except KeyError:
             pass
+        return authenticate_kwargs
 
-        self.user = authenticate(**authenticate_kwargs)
-
+    def validate(self, attrs):
+        self.user = authenticate(**self.get_authenticate_kwargs(attrs))
+        return self.get_tokens()
+
+    async def avalidate(self, attrs):
+        """Async ``validate`` for already field-validated ``attrs``."""
+        self.user = await aauthenticate(**self.get_authenticate_kwargs(attrs))
+        if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+            # Issuing a refresh token then writes it to the database.
+            return await sync_to_async(self.get_tokens)()
+        return self.get_tokens()
+
+    def get_tokens(self):
         if self.user is None or not self.user.is_active:
             raise CustomAPIException(
                 {
@@ -359,6 +400,51 @@ class TokenObtainPairSerializer(TokenObtainSerializer):
         return data
 
 
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    simplejwt's refresh, checked against and rotated through moses' revocation
+    store (moses.services.token_revocation) instead of the blacklist app.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_token_revoked(refresh):
+            raise TokenError(_('Token is revoked'))
+
+        user_id = refresh.payload.get(jwt_settings.api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            users = users_for_token(refresh).for_auth()
+            user = users.filter(**{jwt_settings.api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None or not jwt_settings.api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+            if not token_version_matches(refresh, user.token_version):
+                raise TokenError(_('Token is revoked'))
+
+        # Read through the module: override_settings(SIMPLE_JWT=...) rebinds api_settings.
+        rotate = jwt_settings.api_settings.ROTATE_REFRESH_TOKENS
+        if rotate:
+            # Revoking first makes the refresh token single-use, even under concurrent refreshes.
+            # It also revokes the access tokens issued from it.
+            if not revoke_token(refresh):
+                raise TokenError(_('Token is revoked'))
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            pair_access_tokens(refresh)
+        data = {'access': str(refresh.access_token)}
+        if rotate:
+            data['refresh'] = str(refresh)
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        revoke_token(RefreshToken(attrs['refresh']))
+        return {}
+
+
 class PasswordSerializer(serializers.Serializer):
     new_password = CustomPasswordField(field_name='new_password', required=True)
 
@@ -386,10 +472,9 @@ class ResetPasswordSerializer(serializers.Serializer):
 
     def validate(self, attrs):
         validated_data = super().validate(attrs)
-        if (user := CustomUser.objects.filter(
-                Q(phone_number=validated_data['credential'], is_phone_number_confirmed=True) | Q(
-                    email=validated_data['credential'], is_email_confirmed=True),
-                site__domain=validated_data['domain'],
+        if (user := CustomUser.objects.for_domain(validated_data['domain']).filter(
+                Q(phone_number=normalize_phone_number(validated_data['credential']), is_phone_number_confirmed=True)
+                | email_iexact(validated_data['credential']) & Q(is_email_confirmed=True),
         ).first()) is None:
             raise CustomAPIException(
                 {
@@ -402,36 +487,41 @@ class ResetPasswordSerializer(serializers.Serializer):
             )
         else:
             self.user = user
+            # Hand on the credential as stored, so it matches user.email / user.phone_number exactly.
+            if validated_data['credential'].lower() == user.email.lower():
+                validated_data['credential'] = user.email
+            else:
+                validated_data['credential'] = user.phone_number
         return validated_data
 
 
 class GoogleSignInSerializer(serializers.Serializer):
     id_token = serializers.CharField(required=True)
-    domain = serializers.CharField(validators=[site_with_domain_exists], required=True)
+    # Resolved (and checked) once by moses.services.social_auth.
+    domain = serializers.CharField(required=True)
 
 
 class GoogleCompleteRegistrationSerializer(serializers.Serializer):
     google_auth_token = serializers.CharField(required=True)
-    phone_number = serializers.CharField(
-        validators=[moses_settings.PHONE_NUMBER_VALIDATOR],
-        required=True
-    )
-    domain = serializers.CharField(validators=[site_with_domain_exists], required=True)
+    # Validated once by moses.services.social_auth.
+    phone_number = PhoneNumberField(required=True)
+    # Resolved (and checked) once by moses.services.social_auth.
+    domain = serializers.CharField(required=True)
 
 
 class TelegramSignInSerializer(serializers.Serializer):
     auth_data = serializers.DictField(required=True)
-    domain = serializers.CharField(validators=[site_with_domain_exists], required=True)
+    # Resolved (and checked) once by moses.services.social_auth.
+    domain = serializers.CharField(required=True)
 
 
 class TelegramCompleteRegistrationSerializer(serializers.Serializer):
     telegram_auth_token = serializers.CharField(required=True)
-    phone_number = serializers.CharField(
-        validators=[moses_settings.PHONE_NUMBER_VALIDATOR],
-        required=True
-    )
+    # Validated once by moses.services.social_auth.
+    phone_number = PhoneNumberField(required=True)
     email = serializers.EmailField(required=False, allow_blank=True, default='')
-    domain = serializers.CharField(validators=[site_with_domain_exists], required=True)
+    # Resolved (and checked) once by moses.services.social_auth.
+    domain = serializers.CharField(required=True)
 
 
 class ConfirmResetPasswordSerializer(PasswordSerializer):
@@ -441,9 +531,9 @@ class ConfirmResetPasswordSerializer(PasswordSerializer):
 
     def validate(self, attrs):
         validated_data = super().validate(attrs)
-        if (user := CustomUser.objects.filter(
-                Q(phone_number=validated_data['credential']) | Q(email=validated_data['credential']),
-                site__domain=validated_data['domain'],
+        if (user := CustomUser.objects.for_domain(validated_data['domain']).filter(
+                Q(phone_number=normalize_phone_number(validated_data['credential']))
+                | email_iexact(validated_data['credential']),
         ).first()) is not None:
 
             if user.password_reset_code != validated_data['code'] and not (django_settings.DEBUG and validated_data['code'] == 123456):
@@ -468,3 +558,19 @@ class ConfirmResetPasswordSerializer(PasswordSerializer):
             )
         self.user = user
         return validated_data
+
+
+class ActivationSerializer(djoser_serializers.ActivationSerializer):
+    """djoser's activation, finding the user on whichever database holds their site."""
+
+    def validate(self, attrs):
+        try:
+            self.user = CustomUser.objects.get_from_any_database(decode_uid(self.initial_data.get('uid', '')))
+        except (CustomUser.DoesNotExist, CustomUser.MultipleObjectsReturned, DjangoValidationError, ValueError,
+                TypeError, OverflowError):
+            raise serializers.ValidationError({'uid': [self.error_messages['invalid_uid']]}, code='invalid_uid')
+        if not self.context['view'].token_generator.check_token(self.user, self.initial_data.get('token', '')):
+            raise serializers.ValidationError({'token': [self.error_messages['invalid_token']]}, code='invalid_token')
+        if self.user.is_active:
+            raise PermissionDenied(self.error_messages['stale_token'])
+        return attrs
@@ -2,16 +2,18 @@ import random
 from datetime import timedelta
 
 from django.conf import settings as django_settings
-from django.core.mail import send_mail
 from django.utils import timezone
 from django.utils.timezone import now
 
 from moses.common import error_codes
 from moses.common.exceptions import CustomAPIException, KwargsError
-from moses.conf import settings as moses_settings
+from moses import conf
 from moses.enums import Credential, SMSType
+from moses.services.mail import send_email
 from moses.services.messages import render_message
-from moses.services.sms import sms_unlock_time
+from moses.services.side_effects import after_commit
+from moses.services.signal_dispatch import dispatch_signal
+from moses.services.sms import send_sms, sms_unlock_time
 from moses.signals import phone_number_confirmed, email_confirmed
 
 
@@ -22,7 +24,7 @@ def try_to_confirm_credential(user, credential: Credential, main_pin_str: str, c
             current_credential_field = 'phone_number'
             candidate_credential_field = 'phone_number_candidate'
             current_credential_confirmation_field = 'is_phone_number_confirmed'
-            max_attempts_limit = moses_settings.PHONE_NUMBER_CONFIRMATION_ATTEMPTS_LIMIT
+            max_attempts_limit = conf.settings.PHONE_NUMBER_CONFIRMATION_ATTEMPTS_LIMIT
             current_pin_field = 'phone_number_confirmation_pin'
             candidate_pin_field = 'phone_number_candidate_confirmation_pin'
         case Credential.EMAIL:
@@ -30,11 +32,12 @@ def try_to_confirm_credential(user, credential: Credential, main_pin_str: str, c
             current_credential_field = 'email'
             candidate_credential_field = 'email_candidate'
             current_credential_confirmation_field = 'is_email_confirmed'
-            max_attempts_limit = moses_settings.EMAIL_CONFIRMATION_ATTEMPTS_LIMIT
+            max_attempts_limit = conf.settings.EMAIL_CONFIRMATION_ATTEMPTS_LIMIT
             current_pin_field = 'email_confirmation_pin'
             candidate_pin_field = 'email_candidate_confirmation_pin'
         case _:
             raise ValueError(error_codes.INVALID_CREDENTIAL)
+    user.load_deferred(attempts_field, current_pin_field, candidate_pin_field)
     if getattr(user, attempts_field) >= max_attempts_limit:
         raise CustomAPIException(
             {
@@ -68,14 +71,18 @@ def try_to_confirm_credential(user, credential: Credential, main_pin_str: str, c
         is_initial_confirmation = not had_candidate
 
         if credential == Credential.PHONE_NUMBER:
-            phone_number_confirmed.send(
+            after_commit(
+                dispatch_signal,
+                phone_number_confirmed,
                 sender=user.__class__,
                 user=user,
                 phone_number=confirmed_value,
                 is_initial_confirmation=is_initial_confirmation
             )
         elif credential == Credential.EMAIL:
-            email_confirmed.send(
+            after_commit(
+                dispatch_signal,
+                email_confirmed,
                 sender=user.__class__,
                 user=user,
                 email=confirmed_value,
@@ -105,6 +112,7 @@ def send_credential_confirmation_code(
                 unlock_time_field = 'phone_number_confirmation_code_sms_unlocks_at'
                 credential_field = 'phone_number'
                 pin_field = 'phone_number_confirmation_pin'
+            user.load_deferred(unlock_time_field, pin_field)
             if (
                     (
                             sut := sms_unlock_time(
@@ -113,7 +121,7 @@ def send_credential_confirmation_code(
                                 candidate=candidate)
                     ) is None or sut <= timezone.now() or ignore_frequency_limit
             ):
-                new_unlock_time = now() + timedelta(seconds=moses_settings.PHONE_NUMBER_CONFIRMATION_SMS_SECONDS_PERIOD)
+                new_unlock_time = now() + timedelta(seconds=conf.settings.PHONE_NUMBER_CONFIRMATION_SMS_SECONDS_PERIOD)
                 setattr(user, unlock_time_field, new_unlock_time)
             else:
                 raise CustomAPIException(
@@ -135,14 +143,16 @@ def send_credential_confirmation_code(
 
     if generate_new:
         setattr(user, pin_field, random.randint(100000, 999999))
+    else:
+        user.load_deferred(pin_field)
     user.save()
     pin = getattr(user, pin_field)
     recipient = getattr(user, credential_field)
     match credential_type:
         case Credential.PHONE_NUMBER:
             body = render_message('PHONE_NUMBER_CONFIRMATION_PIN_BODY', user, pin=pin)
-            moses_settings.SEND_SMS_HANDLER(recipient, body)
+            send_sms(recipient, body)
         case Credential.EMAIL:
             title = render_message('EMAIL_CONFIRMATION_PIN_TITLE', user, pin=pin)
             body = render_message('EMAIL_CONFIRMATION_PIN_BODY', user, pin=pin)
-            send_mail(title, body, moses_settings.SENDER_EMAIL, [recipient])
+            send_email(title, body, [recipient])
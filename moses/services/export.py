@@ -0,0 +1,63 @@
+import csv
+import json
+
+from moses.models import CustomUser
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+# Secrets (password hash, PINs, MFA key) are never exported.
+EXPORT_FIELDS = (
+    'id',
+    'email',
+    'is_email_confirmed',
+    'phone_number',
+    'is_phone_number_confirmed',
+    'first_name',
+    'last_name',
+    'preferred_language',
+    'is_active',
+    'is_staff',
+    'created_at',
+    'google_sub',
+    'telegram_id',
+)
+
+
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def _serialize(value):
+    if value is None or isinstance(value, (bool, int, str)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def export_users(domain: str, export_format: str = 'csv', chunk_size: int = 2000, using=None):
+    """
+    Yield the users of the site with ``domain`` as CSV or NDJSON lines.
+
+    Rows are read through a server-side cursor in ``chunk_size`` batches and
+    never materialized as model instances, so memory stays flat regardless of
+    the table size.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+    queryset = CustomUser.objects.for_domain(domain).all()
+    if using is not None:
+        queryset = queryset.using(using)
+    rows = queryset.order_by('created_at', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+    if export_format == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow([_serialize(value) for value in row])
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(EXPORT_FIELDS, map(_serialize, row)))) + '\n'
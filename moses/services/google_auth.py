@@ -1,13 +1,21 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+import json
+import re
+import time
+import urllib.request
+import weakref
 
-import jwt
-from django.conf import settings as django_settings
-from google.auth.transport import requests as google_requests
-from google.oauth2 import id_token as google_id_token
+from asgiref.sync import sync_to_async
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx is an optional dependency of the async views
+    httpx = None
 
 from moses.common import error_codes
 from moses.common.exceptions import CustomAPIException, KwargsError
-from moses.conf import settings as moses_settings
+from moses import conf
+from moses.services.social_auth import SocialProvider, register_provider
 
 
 def verify_google_id_token(token: str) -> dict:
@@ -15,12 +23,16 @@ def verify_google_id_token(token: str) -> dict:
     Verify a Google ID token and return the decoded claims.
     Returns dict with keys: sub, email, email_verified, given_name, family_name, picture.
     """
-    client_id = moses_settings.GOOGLE_OAUTH2_CLIENT_ID
+    client_id = conf.settings.GOOGLE_OAUTH2_CLIENT_ID
     if not client_id:
         raise CustomAPIException({
             '': [KwargsError(code=error_codes.GOOGLE_SIGN_IN_NOT_CONFIGURED)]
         })
 
+    # google-auth (and its transport stack) is imported on first use only.
+    from google.auth.transport import requests as google_requests
+    from google.oauth2 import id_token as google_id_token
+
     try:
         id_info = google_id_token.verify_oauth2_token(
             token,
@@ -34,53 +46,123 @@ def verify_google_id_token(token: str) -> dict:
         })
 
 
-def create_google_auth_temp_token(google_claims: dict) -> str:
-    """
-    Create a short-lived signed JWT containing Google user info.
-    Used when a new user needs to complete registration (provide phone number).
-    """
-    expiry_minutes = moses_settings.GOOGLE_AUTH_TEMP_TOKEN_EXPIRY_MINUTES
-    payload = {
-        'google_sub': google_claims['sub'],
-        'email': google_claims.get('email', ''),
-        'first_name': google_claims.get('given_name', ''),
-        'last_name': google_claims.get('family_name', ''),
-        'token_type': 'google_auth_temp',
-        'exp': datetime.now(timezone.utc) + timedelta(minutes=expiry_minutes),
-        'iat': datetime.now(timezone.utc),
-    }
-    return jwt.encode(payload, django_settings.SECRET_KEY, algorithm='HS256')
-
-
-def decode_google_auth_temp_token(token: str) -> dict:
+GOOGLE_OAUTH2_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+# Used when the certs response carries no max-age.
+GOOGLE_CERTS_DEFAULT_MAX_AGE_SECONDS = 300
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+# (expires_at, certs) of the last fetched Google signing certificates.
+_google_certs = (0.0, None)
+# (client, lifetime) per event loop; clients cannot be shared across loops.
+_http_clients = weakref.WeakKeyDictionary()
+
+
+def _max_age(cache_control):
+    match = _MAX_AGE_RE.search(cache_control or '')
+    return int(match.group(1)) if match else GOOGLE_CERTS_DEFAULT_MAX_AGE_SECONDS
+
+
+def _fetch_google_certs_sync():
+    with urllib.request.urlopen(GOOGLE_OAUTH2_CERTS_URL, timeout=10) as response:
+        return json.loads(response.read()), _max_age(response.headers.get('Cache-Control'))
+
+
+async def _client_lifetime(client):
+    # A started async generator is finalized by loop.shutdown_asyncgens(),
+    # which asyncio.run() and ASGI servers await when the loop shuts down.
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def _http_client():
+    """The running loop's keep-alive httpx client, closed when the loop shuts down."""
+    loop = asyncio.get_running_loop()
+    if (entry := _http_clients.get(loop)) is None:
+        client = httpx.AsyncClient(timeout=10)
+        lifetime = _client_lifetime(client)
+        await lifetime.asend(None)
+        entry = _http_clients[loop] = (client, lifetime)
+    return entry[0]
+
+
+async def _afetch_google_certs():
+    if httpx is None:
+        return await sync_to_async(_fetch_google_certs_sync, thread_sensitive=False)()
+    client = await _http_client()
+    response = await client.get(GOOGLE_OAUTH2_CERTS_URL)
+    response.raise_for_status()
+    return response.json(), _max_age(response.headers.get('Cache-Control'))
+
+
+async def aget_google_certs() -> dict:
+    """Google's signing certificates, cached for as long as Google allows."""
+    global _google_certs
+    expires_at, certs = _google_certs
+    if certs is None or time.monotonic() >= expires_at:
+        certs, max_age = await _afetch_google_certs()
+        _google_certs = (time.monotonic() + max_age, certs)
+    return certs
+
+
+async def averify_google_id_token(token: str) -> dict:
     """
-    Decode and validate the temporary Google auth token.
-    Returns the payload dict.
+    Async verify_google_id_token: the certificates are fetched with a reused
+    async HTTP client (httpx when installed, a worker thread otherwise) and
+    cached, and the token is checked locally.
     """
-    try:
-        payload = jwt.decode(
-            token,
-            django_settings.SECRET_KEY,
-            algorithms=['HS256']
-        )
-    except jwt.ExpiredSignatureError:
+    client_id = conf.settings.GOOGLE_OAUTH2_CLIENT_ID
+    if not client_id:
         raise CustomAPIException({
-            'google_auth_token': [
-                KwargsError(code=error_codes.GOOGLE_AUTH_TEMP_TOKEN_EXPIRED)
-            ]
+            '': [KwargsError(code=error_codes.GOOGLE_SIGN_IN_NOT_CONFIGURED)]
         })
-    except jwt.InvalidTokenError:
+
+    from google.auth import jwt as google_jwt
+
+    try:
+        certs = await aget_google_certs()
+        id_info = google_jwt.decode(token, certs=certs, audience=client_id)
+    except ValueError:
         raise CustomAPIException({
-            'google_auth_token': [
-                KwargsError(code=error_codes.INVALID_GOOGLE_AUTH_TEMP_TOKEN)
-            ]
+            'id_token': [KwargsError(code=error_codes.INVALID_GOOGLE_ID_TOKEN)]
         })
-
-    if payload.get('token_type') != 'google_auth_temp':
+    if id_info.get('iss') not in GOOGLE_ISSUERS:
         raise CustomAPIException({
-            'google_auth_token': [
-                KwargsError(code=error_codes.INVALID_GOOGLE_AUTH_TEMP_TOKEN)
-            ]
+            'id_token': [KwargsError(code=error_codes.INVALID_GOOGLE_ID_TOKEN)]
         })
+    return id_info
+
+
+class GoogleProvider(SocialProvider):
+    name = 'google'
+    subject_field = 'google_sub'
+    token_field = 'google_auth_token'
+    sign_up_fields = ('email', 'first_name', 'last_name')
+    link_by_email = True
+    email_confirmed = True
+    temp_token_expiry_setting = 'GOOGLE_AUTH_TEMP_TOKEN_EXPIRY_MINUTES'
+    invalid_temp_token_code = error_codes.INVALID_GOOGLE_AUTH_TEMP_TOKEN
+    temp_token_expired_code = error_codes.GOOGLE_AUTH_TEMP_TOKEN_EXPIRED
+
+    def verify(self, credentials) -> dict:
+        return self.identity(verify_google_id_token(credentials))
+
+    async def averify(self, credentials) -> dict:
+        return self.identity(await averify_google_id_token(credentials))
+
+    def identity(self, google_claims: dict) -> dict:
+        if not google_claims.get('email') or not google_claims.get('email_verified', False):
+            raise CustomAPIException({
+                'id_token': [KwargsError(code=error_codes.INVALID_GOOGLE_ID_TOKEN)]
+            })
+        return {
+            'subject': google_claims.get('sub', ''),
+            'email': google_claims['email'],
+            'first_name': google_claims.get('given_name', ''),
+            'last_name': google_claims.get('family_name', ''),
+        }
+
 
-    return payload
+GOOGLE = register_provider(GoogleProvider())
@@ -0,0 +1,96 @@
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings as django_settings
+from django.core.mail import EmailMessage, get_connection
+
+from moses import conf
+from moses.services.side_effects import after_commit
+
+_outbox = ContextVar('moses_mail_outbox', default=None)
+_local = threading.local()
+
+
+def get_pooled_connection():
+    """
+    This thread's long-lived email backend connection. It is reopened when
+    EMAIL_BACKEND changes or after EMAIL_CONNECTION_MAX_IDLE_SECONDS of
+    idling, before the server would drop it.
+    """
+    connection = getattr(_local, 'connection', None)
+    used_at = time.monotonic()
+    if connection is not None and (
+            _local.backend != django_settings.EMAIL_BACKEND
+            or used_at - _local.used_at > conf.settings.EMAIL_CONNECTION_MAX_IDLE_SECONDS
+    ):
+        close_pooled_connection()
+        connection = None
+    if connection is None:
+        connection = get_connection()
+        connection.open()
+        _local.connection = connection
+        _local.backend = django_settings.EMAIL_BACKEND
+    _local.used_at = used_at
+    return connection
+
+
+def close_pooled_connection():
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        connection.close()
+
+
+def _drop_pooled_connection():
+    # The connection may be broken; closing it must not mask the send error.
+    try:
+        close_pooled_connection()
+    except (smtplib.SMTPException, OSError):
+        pass
+
+
+def send_messages(messages):
+    """Send ``messages`` over the pooled connection, reconnecting once if the server hung up."""
+    if not messages:
+        return
+    for attempt in range(2):
+        try:
+            get_pooled_connection().send_messages(messages)
+            return
+        except (smtplib.SMTPException, OSError) as exc:
+            # Whatever failed, the connection is in an unknown state: never reuse it.
+            _drop_pooled_connection()
+            if attempt or not isinstance(exc, smtplib.SMTPServerDisconnected):
+                raise
+
+
+def send_email(subject: str, body: str, recipients: list, from_email: str = None):
+    """Send one email after the current transaction commits, or queue it inside ``mail_batch``."""
+    message = EmailMessage(subject, body, from_email or conf.settings.SENDER_EMAIL, recipients)
+    if (outbox := _outbox.get()) is not None:
+        outbox.append(message)
+        return
+    after_commit(send_messages, [message])
+
+
+@contextmanager
+def mail_batch():
+    """
+    Queue every ``send_email`` made inside the block. When it exits without
+    an error the queued messages are sent together, over one connection,
+    once the current transaction commits (right away outside a transaction).
+    """
+    if _outbox.get() is not None:
+        yield
+        return
+    messages = []
+    token = _outbox.set(messages)
+    try:
+        yield
+    finally:
+        _outbox.reset(token)
+    if messages:
+        after_commit(send_messages, messages)
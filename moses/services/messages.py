@@ -1,6 +1,6 @@
 from django.utils import translation
 
-from moses.conf import settings as moses_settings
+from moses import conf
 
 
 def render_message(key: str, user, *, pin=None, **extra) -> str:
@@ -11,7 +11,7 @@ def render_message(key: str, user, *, pin=None, **extra) -> str:
     (and its attributes, e.g. ``{user.name}``) and ``{domain}`` are always
     available; callers add anything else through ``extra``.
     """
-    template = moses_settings.MESSAGE_TEMPLATES[key]
-    context = {"user": user, "pin": pin, "domain": moses_settings.DOMAIN, **extra}
+    template = conf.settings.MESSAGE_TEMPLATES[key]
+    context = {"user": user, "pin": pin, "domain": conf.settings.DOMAIN, **extra}
     with translation.override(user.preferred_language):
         return str(template).format(**context)
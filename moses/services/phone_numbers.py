@@ -0,0 +1,38 @@
+import re
+from functools import lru_cache
+
+from moses import conf
+
+# Separators people type inside phone numbers.
+_SEPARATORS_RE = re.compile(r'[\s\-().]')
+# Recent PHONE_NUMBER_VALIDATOR verdicts, keyed by (validator, canonical number).
+VALIDATION_CACHE_SIZE = 4096
+
+
+def to_e164(phone_number: str) -> str:
+    """
+    The default ``PHONE_NUMBER_NORMALIZER``: drop separators and turn a leading
+    ``00`` into ``+``. A number without a country code keeps its national
+    form, since the country can't be guessed, but is compacted all the same.
+    """
+    compact = _SEPARATORS_RE.sub('', phone_number)
+    if compact.startswith('00'):
+        compact = '+' + compact[2:]
+    return compact
+
+
+def normalize_phone_number(phone_number):
+    """The canonical form phone numbers are stored and looked up in."""
+    if not phone_number:
+        return phone_number
+    return (conf.settings.PHONE_NUMBER_NORMALIZER or to_e164)(phone_number)
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _is_valid(validator, phone_number):
+    return bool(validator(phone_number))
+
+
+def is_valid_phone_number(phone_number: str) -> bool:
+    """``PHONE_NUMBER_VALIDATOR`` on the canonical number, memoized."""
+    return _is_valid(conf.settings.PHONE_NUMBER_VALIDATOR, normalize_phone_number(phone_number))
@@ -1,15 +1,15 @@
 import random
 from datetime import timedelta
 
-from django.core.mail import send_mail
 from django.utils import timezone
 
 from moses.common import error_codes
 from moses.common.exceptions import CustomAPIException, KwargsError
-from moses.conf import settings as moses_settings
+from moses import conf
 from moses.enums import SMSType, Credential
+from moses.services.mail import send_email
 from moses.services.messages import render_message
-from moses.services.sms import sms_unlock_time
+from moses.services.sms import send_sms, sms_unlock_time
 
 
 def send_password_reset_code(user, credential: Credential) -> bool:
@@ -20,7 +20,7 @@ def send_password_reset_code(user, credential: Credential) -> bool:
                 user.save()
                 title = render_message('PASSWORD_RESET_PIN_TITLE', user, pin=user.password_reset_code)
                 body = render_message('PASSWORD_RESET_EMAIL_BODY', user, pin=user.password_reset_code)
-                send_mail(title, body, moses_settings.SENDER_EMAIL, [user.email])
+                send_email(title, body, [user.email])
                 return True
             return False
         case user.phone_number:
@@ -28,10 +28,10 @@ def send_password_reset_code(user, credential: Credential) -> bool:
                 if (sut:=sms_unlock_time(user, SMSType.PASSWORD_RESET)) is None or sut <= timezone.now():
                     user.password_reset_code = random.randint(100000, 999999)
                     user.password_reset_code_sms_unlocks_at = timezone.now() + timedelta(
-                        seconds=moses_settings.PASSWORD_RESET_TIMEOUT_SECONDS)
+                        seconds=conf.settings.PASSWORD_RESET_TIMEOUT_SECONDS)
                     user.save()
                     body = render_message('PASSWORD_RESET_SMS_BODY', user, pin=user.password_reset_code)
-                    moses_settings.SEND_SMS_HANDLER(user.phone_number, body)
+                    send_sms(user.phone_number, body)
                     return True
                 else:
                     raise CustomAPIException(
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial, update_wrapper
+
+from django.db import transaction
+
+from moses import conf
+
+_database = ContextVar('moses_side_effects_database', default=None)
+
+
+@contextmanager
+def atomic(using=None):
+    """
+    ``transaction.atomic(using=using)`` whose ``after_commit`` side effects wait
+    for that database's commit. Writes to a site's database (``for_site``) go
+    through this, so nothing is sent for a write that is rolled back.
+    """
+    token = _database.set(using)
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        _database.reset(token)
+
+
+def after_commit(func, *args, **kwargs):
+    """
+    Run ``func(*args, **kwargs)`` once the current transaction commits, right
+    away outside one, and drop it if the transaction rolls back.
+
+    Moses sends SMS, emails and its signals through this, so a slow gateway
+    never holds a transaction (and its row locks) open. By the time a side
+    effect runs its data is committed, so a failure is logged, not raised.
+    ``MOSES["DEFER_SIDE_EFFECTS"] = False`` restores inline dispatch.
+    """
+    if not conf.settings.DEFER_SIDE_EFFECTS:
+        return func(*args, **kwargs)
+    # robust on_commit logs failures by the callback's __qualname__.
+    transaction.on_commit(update_wrapper(partial(func, *args, **kwargs), func), robust=True, using=_database.get())
@@ -0,0 +1,161 @@
+import asyncio
+import atexit
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import django
+from asgiref.sync import async_to_sync
+from django.db import close_old_connections
+from django.dispatch import Signal
+
+from moses import signals
+from moses import conf
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR = 'executor'
+# Signal._live_receivers() is private; it returns (sync_receivers,
+# async_receivers) from Django 5.0 on. On other versions receivers go through
+# the public send_robust() instead, inline and without per-receiver metrics.
+LIVE_RECEIVERS_API = (5, 0) <= django.VERSION[:2] < (6, 0)
+
+_lock = threading.Lock()
+_executor = None
+_executor_workers = None
+_slots = None
+_pending = set()
+
+
+def _signal_name(signal: Signal) -> str:
+    for name, value in vars(signals).items():
+        if value is signal:
+            return name
+    return repr(signal)
+
+
+def _receiver_name(receiver) -> str:
+    return f'{getattr(receiver, "__module__", "")}.{getattr(receiver, "__qualname__", repr(receiver))}'
+
+
+def _record(signal_name: str, receiver, seconds: float, outcome: str):
+    logger.debug('%s receiver %s: %s in %.3fs', signal_name, _receiver_name(receiver), outcome, seconds)
+    if conf.settings.SIGNAL_RECEIVER_METRICS_HANDLER is not None:
+        try:
+            conf.settings.SIGNAL_RECEIVER_METRICS_HANDLER(signal_name, _receiver_name(receiver), seconds, outcome)
+        except Exception:
+            logger.exception('SIGNAL_RECEIVER_METRICS_HANDLER failed')
+
+
+async def _await_receiver(receiver, signal, sender, named, timeout):
+    await asyncio.wait_for(receiver(signal=signal, sender=sender, **named), timeout)
+
+
+def _run_receiver(signal: Signal, receiver, is_async: bool, sender, named: dict):
+    """
+    Call one receiver, isolating its failure and reporting its latency.
+    Async receivers are cancelled at the timeout; a sync one cannot be
+    interrupted, so running past it is only reported.
+    """
+    signal_name = _signal_name(signal)
+    timeout = conf.settings.SIGNAL_RECEIVER_TIMEOUT_SECONDS
+    started = time.monotonic()
+    try:
+        if is_async:
+            async_to_sync(_await_receiver)(receiver, signal, sender, named, timeout)
+        else:
+            receiver(signal=signal, sender=sender, **named)
+    except (asyncio.TimeoutError, TimeoutError):
+        outcome = 'timeout'
+        logger.warning('%s receiver %s timed out after %ss', signal_name, _receiver_name(receiver), timeout)
+    except Exception:
+        outcome = 'error'
+        logger.exception('%s receiver %s failed', signal_name, _receiver_name(receiver))
+    else:
+        outcome = 'ok'
+    seconds = time.monotonic() - started
+    if outcome == 'ok' and timeout is not None and seconds > timeout:
+        outcome = 'timeout'
+        logger.warning('%s receiver %s took %.3fs, over its %ss timeout',
+                       signal_name, _receiver_name(receiver), seconds, timeout)
+    _record(signal_name, receiver, seconds, outcome)
+
+
+def _run_in_worker(slots, signal, receiver, is_async, sender, named):
+    close_old_connections()
+    try:
+        _run_receiver(signal, receiver, is_async, sender, named)
+    finally:
+        close_old_connections()
+        slots.release()
+
+
+def _get_executor():
+    global _executor, _executor_workers, _slots
+    workers = conf.settings.SIGNAL_EXECUTOR_WORKERS
+    with _lock:
+        if _executor is None or _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='moses-signals')
+            _executor_workers = workers
+            _slots = threading.BoundedSemaphore(conf.settings.SIGNAL_EXECUTOR_MAX_PENDING)
+        return _executor, _slots
+
+
+def _submit(signal, receiver, is_async, sender, named):
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        # The queue is full: apply backpressure instead of dropping the event.
+        logger.warning('%s dispatch queue is full, running %s inline',
+                       _signal_name(signal), _receiver_name(receiver))
+        _run_receiver(signal, receiver, is_async, sender, named)
+        return
+    future = executor.submit(_run_in_worker, slots, signal, receiver, is_async, sender, named)
+    with _lock:
+        _pending.add(future)
+    future.add_done_callback(_pending.discard)
+
+
+def dispatch_signal(signal: Signal, sender, **named):
+    """
+    Send ``signal`` to each of its receivers on its own: a failing or slow
+    receiver never affects the others or the caller.
+
+    ``MOSES["SIGNAL_DISPATCH"]`` picks where receivers run: ``"inline"`` (the
+    default) calls them in the current thread, ``"executor"`` hands them to a
+    bounded thread pool and returns at once.
+    """
+    if not LIVE_RECEIVERS_API:
+        for receiver, response in signal.send_robust(sender, **named):
+            if isinstance(response, Exception):
+                logger.error('%s receiver %s failed', _signal_name(signal), _receiver_name(receiver),
+                             exc_info=response)
+        return
+    sync_receivers, async_receivers = signal._live_receivers(sender)
+    receivers = [(receiver, False) for receiver in sync_receivers]
+    receivers += [(receiver, True) for receiver in async_receivers]
+    for receiver, is_async in receivers:
+        if conf.settings.SIGNAL_DISPATCH == EXECUTOR:
+            _submit(signal, receiver, is_async, sender, named)
+        else:
+            _run_receiver(signal, receiver, is_async, sender, named)
+
+
+def wait_for_receivers(timeout: float = None) -> bool:
+    """Wait for the receivers queued on the executor; False if some are still running at ``timeout``."""
+    with _lock:
+        pending = list(_pending)
+    return not wait(pending, timeout=timeout).not_done
+
+
+def shutdown_signal_executor():
+    global _executor, _executor_workers
+    with _lock:
+        executor, _executor, _executor_workers = _executor, None, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+atexit.register(shutdown_signal_executor)
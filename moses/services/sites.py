@@ -0,0 +1,66 @@
+"""
+Site resolution for tenant-scoped user lookups.
+
+Requests name their site by domain. ``site_id_for_domain`` turns that into the
+site id once and caches it, so user queries filter on ``site_id`` directly
+instead of joining ``django_site``. ``database_for_site`` maps a site id to
+the database alias holding its users (``MOSES["SITE_DATABASES"]``); see
+``CustomUser.objects.for_site`` and ``moses.db_routers.SiteDatabaseRouter``.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from moses import conf
+
+SITE_ID_CACHE_KEY = 'moses:site_id:{}'
+
+
+def _site_id_queryset(domain):
+    from django.contrib.sites.models import Site
+
+    return Site.objects.filter(domain=domain).values_list('id', flat=True)
+
+
+def site_id_for_domain(domain):
+    """The id of the site with ``domain``, cached. ``None`` when there is no such site."""
+    key = SITE_ID_CACHE_KEY.format(domain)
+    site_id = cache.get(key)
+    if site_id is None:
+        site_id = _site_id_queryset(domain).first()
+        if site_id is not None:
+            cache.set(key, site_id, timeout=conf.settings.SITE_ID_CACHE_SECONDS)
+    return site_id
+
+
+async def asite_id_for_domain(domain):
+    key = SITE_ID_CACHE_KEY.format(domain)
+    site_id = await cache.aget(key)
+    if site_id is None:
+        site_id = await _site_id_queryset(domain).afirst()
+        if site_id is not None:
+            await cache.aset(key, site_id, timeout=conf.settings.SITE_ID_CACHE_SECONDS)
+    return site_id
+
+
+def database_for_site(site_id):
+    """
+    The database alias holding the users of ``site_id``, or ``None`` for an
+    unmapped site, leaving the choice to the other routers (e.g. the replica).
+    """
+    return conf.settings.SITE_DATABASES.get(site_id)
+
+
+def _forget_previous_domain(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        previous = sender.objects.filter(pk=instance.pk).values_list('domain', flat=True).first()
+        if previous is not None and previous != instance.domain:
+            cache.delete(SITE_ID_CACHE_KEY.format(previous))
+
+
+def _forget_domain(sender, instance, **kwargs):
+    cache.delete(SITE_ID_CACHE_KEY.format(instance.domain))
+
+
+pre_save.connect(_forget_previous_domain, sender='sites.Site')
+post_save.connect(_forget_domain, sender='sites.Site')
+post_delete.connect(_forget_domain, sender='sites.Site')
@@ -1,6 +1,17 @@
+import asyncio
+import atexit
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+
 from moses.common import error_codes
+from moses import conf
 from moses.enums import SMSType
 from moses.models import CustomUser
+from moses.services.side_effects import after_commit
 
 
 def sms_unlock_time(user: CustomUser, sms_type: SMSType, candidate:bool = False):
@@ -13,3 +24,194 @@ def sms_unlock_time(user: CustomUser, sms_type: SMSType, candidate:bool = False)
             return user.phone_number_confirmation_code_sms_unlocks_at
         case _:
             raise ValueError(error_codes.INVALID_SMS_TYPE)
+
+
+class SMSHandler:
+    """
+    SMS gateway handler protocol for ``SEND_SMS_HANDLER``.
+
+    Only ``send`` is required. Gateways with keep-alive connections open them
+    in ``open`` (called once, before the first send) and release them in
+    ``close``; gateways with batch submission override ``send_many``; native
+    async clients override ``asend``/``asend_many``. ``max_concurrency``
+    bounds the sends in flight through this handler, across threads and
+    within each event loop.
+    """
+    max_concurrency = None
+
+    def __init__(self):
+        self.is_open = False
+        self._open_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency) if self.max_concurrency else None
+        self._async_semaphores = weakref.WeakKeyDictionary()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send(self, recipient: str, body: str):
+        raise NotImplementedError
+
+    def send_many(self, messages):
+        for recipient, body in messages:
+            self.send(recipient, body)
+
+    async def asend(self, recipient: str, body: str):
+        await sync_to_async(self.send, thread_sensitive=False)(recipient, body)
+
+    async def asend_many(self, messages):
+        await sync_to_async(self.send_many, thread_sensitive=False)(messages)
+
+    def ensure_open(self):
+        if not self.is_open:
+            with self._open_lock:
+                if not self.is_open:
+                    self.open()
+                    self.is_open = True
+
+    def shutdown(self):
+        with self._open_lock:
+            if self.is_open:
+                self.is_open = False
+                self.close()
+
+    @contextmanager
+    def limit(self):
+        if self._semaphore is None:
+            yield
+            return
+        with self._semaphore:
+            yield
+
+    def alimit(self):
+        if not self.max_concurrency:
+            return _NO_LIMIT
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+
+class _NoLimit:
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+_NO_LIMIT = _NoLimit()
+
+
+class FunctionSMSHandler(SMSHandler):
+    """Adapts a plain ``(recipient, body)`` callable to the SMSHandler protocol."""
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def send(self, recipient: str, body: str):
+        self.function(recipient, body)
+
+
+_handlers = {}
+_batch = ContextVar('moses_sms_batch', default=None)
+
+
+def get_sms_handler() -> SMSHandler:
+    """
+    The SMSHandler for the current ``SEND_SMS_HANDLER``: an instance is used
+    as-is, an SMSHandler subclass is instantiated once and a plain callable
+    is wrapped.
+    """
+    configured = conf.settings.SEND_SMS_HANDLER
+    if isinstance(configured, SMSHandler):
+        return configured
+    handler = _handlers.get(configured)
+    if handler is None:
+        if isinstance(configured, type) and issubclass(configured, SMSHandler):
+            handler = configured()
+        else:
+            handler = FunctionSMSHandler(configured)
+        handler = _handlers.setdefault(configured, handler)
+    return handler
+
+
+def send_sms(recipient: str, body: str):
+    """
+    Send one SMS through the configured handler after the current transaction
+    commits, or queue it inside ``sms_batch``.
+    """
+    if (batch := _batch.get()) is not None:
+        batch.append((recipient, body))
+        return
+    after_commit(_deliver, recipient, body)
+
+
+def _deliver(recipient: str, body: str):
+    handler = get_sms_handler()
+    handler.ensure_open()
+    with handler.limit():
+        handler.send(recipient, body)
+
+
+def send_sms_many(messages):
+    messages = list(messages)
+    if not messages:
+        return
+    handler = get_sms_handler()
+    handler.ensure_open()
+    with handler.limit():
+        handler.send_many(messages)
+
+
+async def asend_sms(recipient: str, body: str):
+    handler = get_sms_handler()
+    await sync_to_async(handler.ensure_open, thread_sensitive=False)()
+    async with handler.alimit():
+        await handler.asend(recipient, body)
+
+
+async def asend_sms_many(messages):
+    messages = list(messages)
+    if not messages:
+        return
+    handler = get_sms_handler()
+    await sync_to_async(handler.ensure_open, thread_sensitive=False)()
+    async with handler.alimit():
+        await handler.asend_many(messages)
+
+
+@contextmanager
+def sms_batch():
+    """
+    Queue every ``send_sms`` made inside the block and submit them together
+    with one ``send_many`` call, after commit, when it exits without an error.
+    """
+    if _batch.get() is not None:
+        yield
+        return
+    messages = []
+    token = _batch.set(messages)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    if messages:
+        after_commit(send_sms_many, messages)
+
+
+def close_sms_handlers():
+    """Close the pooled connections of every handler opened in this process."""
+    configured = conf.settings.SEND_SMS_HANDLER
+    handlers = list(_handlers.values())
+    if isinstance(configured, SMSHandler):
+        handlers.append(configured)
+    for handler in handlers:
+        handler.shutdown()
+
+
+atexit.register(close_sms_handlers)
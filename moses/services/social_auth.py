@@ -0,0 +1,311 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from asgiref.sync import sync_to_async
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Q, When
+
+from moses.common import error_codes
+from moses.common.exceptions import CustomAPIException, KwargsError
+from moses import conf
+from moses.models import CustomUser, email_iexact
+from moses.services import side_effects
+from moses.services.phone_numbers import is_valid_phone_number, normalize_phone_number
+from moses.services.sites import asite_id_for_domain, database_for_site, site_id_for_domain
+
+TEMP_TOKEN_CACHE_KEY = 'moses:social_temp_token:{jti}'
+
+
+class SocialProvider:
+    """
+    A social identity provider plugged into the shared sign-in pipeline.
+
+    Subclasses only implement ``verify``, which checks the credentials sent
+    by the client and returns an identity dict with ``subject`` and, when
+    known, ``email``, ``first_name``, ``last_name`` and any of
+    ``sign_up_fields``.
+    """
+    # Registry key, also the prefix of the temp token type.
+    name = None
+    # CustomUser column holding the provider's stable user id.
+    subject_field = None
+    # Request/response field carrying the temporary registration token.
+    token_field = None
+    # Identity fields echoed back when a phone number is still required.
+    sign_up_fields = ('first_name', 'last_name')
+    # Fall back to an email match (and link the subject) for existing users.
+    link_by_email = False
+    # Whether an email supplied by the provider counts as confirmed.
+    email_confirmed = False
+    temp_token_expiry_setting = None
+    invalid_temp_token_code = None
+    temp_token_expired_code = None
+
+    @property
+    def temp_token_type(self):
+        return f'{self.name}_auth_temp'
+
+    def verify(self, credentials) -> dict:
+        raise NotImplementedError
+
+    async def averify(self, credentials) -> dict:
+        """Async ``verify``; runs it in a worker thread unless overridden."""
+        return await sync_to_async(self.verify, thread_sensitive=False)(credentials)
+
+
+providers = {}
+
+
+def register_provider(provider: SocialProvider) -> SocialProvider:
+    providers[provider.name] = provider
+    return provider
+
+
+def get_provider(name: str) -> SocialProvider:
+    return providers[name]
+
+
+def _site_does_not_exist(domain):
+    return CustomAPIException({
+        'domain': [
+            KwargsError(
+                kwargs={'domain': domain},
+                code=error_codes.SITE_WITH_DOMAIN_DOES_NOT_EXIST
+            )
+        ]
+    })
+
+
+def resolve_site_id(domain: str) -> int:
+    site_id = site_id_for_domain(domain)
+    if site_id is None:
+        raise _site_does_not_exist(domain)
+    return site_id
+
+
+async def aresolve_site_id(domain: str) -> int:
+    site_id = await asite_id_for_domain(domain)
+    if site_id is None:
+        raise _site_does_not_exist(domain)
+    return site_id
+
+
+def _candidates(provider: SocialProvider, site_id: int, identity: dict):
+    subject_match = Q(**{provider.subject_field: identity['subject']})
+    lookup = subject_match
+    if provider.link_by_email and identity.get('email'):
+        lookup |= email_iexact(identity['email'])
+    # The subject's own account first, so the slice never drops it.
+    return CustomUser.objects.for_site(site_id).for_social().filter(lookup).order_by(
+        Case(When(subject_match, then=0), default=1)
+    )[:2]
+
+
+def _pick_user(provider: SocialProvider, users, subject: str):
+    """Return ``(user, link)``; ``link`` tells whether the subject must be linked to ``user``."""
+    if not users:
+        return None, False
+    for user in users:
+        if getattr(user, provider.subject_field) == subject:
+            return user, False
+    user = users[0]
+    return user, not getattr(user, provider.subject_field) and user.is_email_confirmed
+
+
+def _link_subject(provider: SocialProvider, user, subject: str):
+    setattr(user, provider.subject_field, subject)
+    try:
+        with transaction.atomic(using=user._state.db):
+            user.save(update_fields=[provider.subject_field])
+    except IntegrityError:
+        # Another account on the site got linked to the subject meanwhile.
+        setattr(user, provider.subject_field, '')
+
+
+def find_user(provider: SocialProvider, site_id: int, identity: dict):
+    """
+    Look the user up by ``(site, subject)`` and, for email-linking providers,
+    by email in the same query; a subject match always wins.
+    """
+    user, link = _pick_user(provider, list(_candidates(provider, site_id, identity)), identity['subject'])
+    if link:
+        _link_subject(provider, user, identity['subject'])
+    return user
+
+
+async def afind_user(provider: SocialProvider, site_id: int, identity: dict):
+    users = [user async for user in _candidates(provider, site_id, identity)]
+    user, link = _pick_user(provider, users, identity['subject'])
+    if link:
+        await sync_to_async(_link_subject)(provider, user, identity['subject'])
+    return user
+
+
+def create_temp_token(provider: SocialProvider, identity: dict) -> str:
+    """
+    Create a short-lived, single-use signed JWT carrying the verified identity.
+    Used when a new user needs to complete registration (provide phone number).
+    """
+    issued_at = datetime.now(timezone.utc)
+    expiry_minutes = getattr(conf.settings, provider.temp_token_expiry_setting)
+    payload = {
+        'sub': identity['subject'],
+        'email': identity.get('email', ''),
+        'first_name': identity.get('first_name', ''),
+        'last_name': identity.get('last_name', ''),
+        **{field: identity.get(field, '') for field in provider.sign_up_fields},
+        'token_type': provider.temp_token_type,
+        'jti': uuid.uuid4().hex,
+        'exp': issued_at + timedelta(minutes=expiry_minutes),
+        'iat': issued_at,
+    }
+    return jwt.encode(payload, django_settings.SECRET_KEY, algorithm='HS256')
+
+
+def decode_temp_token(provider: SocialProvider, token: str) -> dict:
+    """
+    Decode and validate a temporary registration token of ``provider``.
+    Returns the payload dict.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            django_settings.SECRET_KEY,
+            algorithms=['HS256']
+        )
+    except jwt.ExpiredSignatureError:
+        raise CustomAPIException({
+            provider.token_field: [KwargsError(code=provider.temp_token_expired_code)]
+        })
+    except jwt.InvalidTokenError:
+        raise CustomAPIException({
+            provider.token_field: [KwargsError(code=provider.invalid_temp_token_code)]
+        })
+
+    if payload.get('token_type') != provider.temp_token_type or not payload.get('jti'):
+        raise CustomAPIException({
+            provider.token_field: [KwargsError(code=provider.invalid_temp_token_code)]
+        })
+
+    return payload
+
+
+def _claim_temp_token(provider: SocialProvider, payload: dict) -> str:
+    key = TEMP_TOKEN_CACHE_KEY.format(jti=payload['jti'])
+    timeout = max(1, int(payload['exp'] - datetime.now(timezone.utc).timestamp()))
+    if not cache.add(key, True, timeout=timeout):
+        raise CustomAPIException({
+            provider.token_field: [KwargsError(code=provider.invalid_temp_token_code)]
+        })
+    return key
+
+
+def _registration_conflict(provider: SocialProvider, site_id: int, email: str, phone_number: str):
+    taken = list(CustomUser.objects.for_site(site_id).filter(
+        (email_iexact(email) if email else Q(email=email)) | Q(phone_number=phone_number)
+    ).values_list('email', 'phone_number'))
+    if any(taken_email.lower() == email.lower() for taken_email, _ in taken):
+        return CustomAPIException({
+            'email': [
+                KwargsError(
+                    kwargs={'email': email},
+                    code=error_codes.EMAIL_ALREADY_REGISTERED_ON_DOMAIN
+                )
+            ]
+        })
+    if any(taken_phone_number == phone_number for _, taken_phone_number in taken):
+        return CustomAPIException({
+            'phone_number': [
+                KwargsError(
+                    kwargs={'phone_number': phone_number},
+                    code=error_codes.PHONE_NUMBER_ALREADY_REGISTERED_ON_DOMAIN
+                )
+            ]
+        })
+    return CustomAPIException({
+        provider.token_field: [KwargsError(code=error_codes.SOCIAL_ACCOUNT_ALREADY_REGISTERED_ON_DOMAIN)]
+    })
+
+
+def _check_phone_number(phone_number: str):
+    if not is_valid_phone_number(phone_number):
+        raise CustomAPIException({
+            'phone_number': [
+                KwargsError(
+                    kwargs={'phone_number': phone_number},
+                    code=error_codes.INVALID_PHONE_NUMBER
+                )
+            ]
+        })
+
+
+def _register(provider: SocialProvider, payload: dict, site_id: int, phone_number: str, email: str):
+    token_key = _claim_temp_token(provider, payload)
+    try:
+        with side_effects.atomic(using=database_for_site(site_id)):
+            return CustomUser.objects.for_site(site_id).create_user(
+                phone_number=phone_number,
+                password=None,
+                email=email,
+                first_name=payload.get('first_name', ''),
+                last_name=payload.get('last_name', ''),
+                site_id=site_id,
+                is_email_confirmed=provider.email_confirmed and bool(payload.get('email')),
+                preferred_language=conf.settings.DEFAULT_LANGUAGE,
+                **{provider.subject_field: payload['sub']},
+            )
+    except IntegrityError:
+        cache.delete(token_key)
+        raise _registration_conflict(provider, site_id, email, phone_number)
+
+
+def sign_in(provider: SocialProvider, credentials, domain: str):
+    """
+    Step 1 of social sign-in. Returns ``(user, None, identity)`` for a known
+    user and ``(None, temp_token, identity)`` when registration must be completed.
+    """
+    identity = provider.verify(credentials)
+    site_id = resolve_site_id(domain)
+    user = find_user(provider, site_id, identity)
+    if user is not None:
+        return user, None, identity
+    return None, create_temp_token(provider, identity), identity
+
+
+async def asign_in(provider: SocialProvider, credentials, domain: str):
+    """Async ``sign_in``: verification and lookups never block the event loop."""
+    identity = await provider.averify(credentials)
+    site_id = await aresolve_site_id(domain)
+    user = await afind_user(provider, site_id, identity)
+    if user is not None:
+        return user, None, identity
+    return None, create_temp_token(provider, identity), identity
+
+
+def complete_registration(provider: SocialProvider, token: str, phone_number: str, domain: str, email: str = ''):
+    """
+    Step 2 of social sign-in: create the user from a temp token in a single
+    insert. Uniqueness is left to the database constraints; the conflicting
+    credential is only looked up when the insert fails.
+    """
+    payload = decode_temp_token(provider, token)
+    site_id = resolve_site_id(domain)
+    phone_number = normalize_phone_number(phone_number)
+    _check_phone_number(phone_number)
+    return _register(provider, payload, site_id, phone_number, payload.get('email') or email)
+
+
+async def acomplete_registration(provider: SocialProvider, token: str, phone_number: str, domain: str,
+                                 email: str = ''):
+    """
+    Async ``complete_registration``. The insert (and the confirmation codes
+    ``create_user`` sends) run in a thread, inside a regular transaction.
+    """
+    payload = decode_temp_token(provider, token)
+    site_id = await aresolve_site_id(domain)
+    phone_number = normalize_phone_number(phone_number)
+    _check_phone_number(phone_number)
+    return await sync_to_async(_register)(provider, payload, site_id, phone_number, payload.get('email') or email)
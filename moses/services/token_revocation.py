@@ -0,0 +1,156 @@
+"""
+Revocation store for JWTs, keyed by their ``jti``.
+
+Revoked ``jti`` values are kept in the ``RevokedToken`` table until the token
+would have expired anyway. Every process holds a Bloom filter of them, synced
+from the table every ``TOKEN_REVOCATION_SYNC_SECONDS``: a ``jti`` the filter
+doesn't contain is definitely not revoked, which answers almost every check
+with a few hashes. Filter hits (revoked tokens and rare false positives) are
+confirmed through the cache, and cache misses through the table.
+
+A revocation is seen at once by the process that made it, and by the others
+at their next sync. Revoking a refresh token also revokes the access tokens
+issued from it, which carry its jti in their ``refresh_jti`` claim.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from moses import conf
+from moses.models import RevokedToken
+from moses.services.token_versions import REFRESH_JTI_CLAIM
+
+REVOKED_CACHE_KEY = 'moses:revoked_jti:{}'
+
+
+class BloomFilter:
+    """Set membership with no false negatives, in ``-capacity * ln(error_rate) / ln(2)**2`` bits."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, item: str):
+        """Add ``item``. ``count`` only grows when some of its bits were unset, so re-adding is free."""
+        added = False
+        for position in self._positions(item):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                added = True
+        self.count += added
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+_lock = threading.Lock()
+_filter = None
+_synced_at = None
+_checked_at = 0.0
+_built_at = 0.0
+
+
+def _build_filter(now):
+    global _filter, _built_at
+    jtis = list(RevokedToken.objects.filter(expires_at__gt=now).values_list('jti', flat=True))
+    bloom = BloomFilter(
+        max(conf.settings.TOKEN_REVOCATION_FILTER_CAPACITY, 2 * len(jtis)),
+        conf.settings.TOKEN_REVOCATION_FILTER_ERROR_RATE,
+    )
+    for jti in jtis:
+        bloom.add(jti)
+    _filter, _built_at = bloom, time.monotonic()
+
+
+def _sync_filter(now):
+    # Windows overlap by one sync period, for rows committed late; re-adding a jti doesn't grow the count.
+    since = _synced_at - timedelta(seconds=conf.settings.TOKEN_REVOCATION_SYNC_SECONDS)
+    for jti in RevokedToken.objects.filter(revoked_at__gte=since, expires_at__gt=now).values_list('jti', flat=True):
+        _filter.add(jti)
+
+
+def _current_filter() -> BloomFilter:
+    global _synced_at, _checked_at
+    if _filter is not None and time.monotonic() - _checked_at < conf.settings.TOKEN_REVOCATION_SYNC_SECONDS:
+        return _filter
+    with _lock:
+        if _filter is None or time.monotonic() - _checked_at >= conf.settings.TOKEN_REVOCATION_SYNC_SECONDS:
+            now = timezone.now()
+            # A full rebuild sheds expired jtis and resizes an overfull filter.
+            if (
+                    _filter is None
+                    or _filter.count > _filter.capacity
+                    or time.monotonic() - _built_at >= conf.settings.TOKEN_REVOCATION_FILTER_REBUILD_SECONDS
+            ):
+                _build_filter(now)
+            else:
+                _sync_filter(now)
+            _synced_at, _checked_at = now, time.monotonic()
+    return _filter
+
+
+def reset_revocation_filter():
+    """Drop this process' filter; the next check rebuilds it from the table."""
+    global _filter
+    with _lock:
+        _filter = None
+
+
+def _expires_at(token) -> datetime:
+    return datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+
+
+def is_revoked(jti) -> bool:
+    if not jti or jti not in _current_filter():
+        return False
+    key = REVOKED_CACHE_KEY.format(jti)
+    revoked = cache.get(key)
+    if revoked is None:
+        revoked = RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+        cache.set(key, revoked, timeout=conf.settings.TOKEN_REVOCATION_SYNC_SECONDS)
+    return revoked
+
+
+def is_token_revoked(token) -> bool:
+    """Whether ``token``, or the refresh token it was issued from, is revoked."""
+    jti, refresh_jti = token.get(api_settings.JTI_CLAIM), token.get(REFRESH_JTI_CLAIM)
+    return is_revoked(jti) or (refresh_jti != jti and is_revoked(refresh_jti))
+
+
+def revoke_token(token) -> bool:
+    """
+    Revoke a validated simplejwt token until it expires. Returns False when it
+    was already revoked, which makes a rotated refresh token single-use.
+    """
+    jti, expires_at = token[api_settings.JTI_CLAIM], _expires_at(token)
+    _, created = RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at})
+    cache.set(
+        REVOKED_CACHE_KEY.format(jti),
+        True,
+        timeout=max(1, math.ceil((expires_at - timezone.now()).total_seconds())),
+    )
+    with _lock:
+        if _filter is not None:
+            _filter.add(jti)
+    return created
+
+
+def purge_expired_revocations() -> int:
+    """Delete revocations of tokens that have expired anyway. Returns how many were deleted."""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
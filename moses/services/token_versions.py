@@ -0,0 +1,74 @@
+"""
+Per-user token versions: revoke every JWT of a user with one write.
+
+Tokens carry the user's ``token_version`` as a claim; a token whose claim is
+behind the user's current version is rejected. ``CustomUser.bump_token_version``
+advances it on password change, MFA disable and deactivation.
+"""
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from moses import conf
+
+TOKEN_VERSION_CLAIM = 'token_version'
+# Lets a user be looked up by id on the database holding their site.
+SITE_ID_CLAIM = 'site_id'
+# The jti of the refresh token an access token was issued from: revoking the
+# refresh token revokes its access tokens too (see token_revocation).
+REFRESH_JTI_CLAIM = 'refresh_jti'
+# Per site and user: user ids are only unique within a database (MOSES["SITE_DATABASES"]).
+TOKEN_VERSION_CACHE_KEY = 'moses:token_version:{}:{}'
+
+
+def refresh_token_for(user) -> RefreshToken:
+    """``RefreshToken.for_user`` with the user's token version and site; access tokens inherit the claims."""
+    refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    refresh[SITE_ID_CLAIM] = user.site_id
+    pair_access_tokens(refresh)
+    return refresh
+
+
+def pair_access_tokens(refresh):
+    """Tie the access tokens ``refresh`` issues from now on to its current jti."""
+    refresh[REFRESH_JTI_CLAIM] = refresh[api_settings.JTI_CLAIM]
+
+
+def users_for_token(token):
+    """The manager to look the token's user up with: scoped to its site when the token names one."""
+    from moses.models import CustomUser
+
+    if (site_id := token.get(SITE_ID_CLAIM)) is None:
+        return CustomUser.objects
+    return CustomUser.objects.for_site(site_id)
+
+
+def token_version_matches(token, token_version: int) -> bool:
+    # Tokens issued before versions existed are at version 0.
+    return token.get(TOKEN_VERSION_CLAIM, 0) == token_version
+
+
+def current_token_version(token, user_id):
+    """The token user's current token version, cached. ``None`` when there is no such user."""
+    key = TOKEN_VERSION_CACHE_KEY.format(token.get(SITE_ID_CLAIM), user_id)
+    token_version = cache.get(key)
+    if token_version is None:
+        token_version = users_for_token(token).filter(pk=user_id).values_list('token_version', flat=True).first()
+        if token_version is not None:
+            cache.set(key, token_version, timeout=conf.settings.TOKEN_VERSION_CACHE_SECONDS)
+    return token_version
+
+
+def forget_token_version(site_id, user_id, using=None):
+    """
+    Drop the cached version once the bump is committed on ``using`` (a rolled
+    back bump must not log anyone out). Call it after the bump is written:
+    outside a transaction the entry is dropped at once.
+    """
+    # Tokens issued before the site claim existed are cached without a site.
+    keys = [TOKEN_VERSION_CACHE_KEY.format(site_id, user_id), TOKEN_VERSION_CACHE_KEY.format(None, user_id)]
+    transaction.on_commit(partial(cache.delete_many, keys), using=using)
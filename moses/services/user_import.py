@@ -0,0 +1,206 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from moses import conf
+from moses.common import error_codes
+from moses.enums import Credential
+from moses.models import CustomUser, email_iexact_in
+from moses.services.credentials_confirmation import send_credential_confirmation_code
+from moses.services.phone_numbers import is_valid_phone_number, normalize_phone_number
+from moses.services.sites import database_for_site
+from moses.services.sms import sms_batch
+from moses.validators import validate_email
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_FIELDS = ('phone_number', 'email', 'password', 'first_name', 'last_name', 'preferred_language')
+
+
+def read_rows(stream, import_format='csv'):
+    """
+    Lazily yield ``(line_number, row)`` pairs from a CSV or NDJSON text stream.
+    Unparsable NDJSON lines yield ``None`` as the row.
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif import_format == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError(f'Unsupported import format: {import_format}')
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _is_valid_phone_number(phone_number):
+    try:
+        return is_valid_phone_number(phone_number)
+    except Exception:
+        return False
+
+
+def _language_codes():
+    return {code for code, _ in conf.settings.LANGUAGE_CHOICES}
+
+
+class UserImport:
+    """
+    Bulk-creates users of one site from parsed rows.
+
+    Rows are validated a batch at a time (one uniqueness query per credential
+    per batch), passwords are hashed in a process pool and each batch is
+    written with a single ``bulk_create``. Rejected rows are collected in
+    ``rejected`` as ``(line_number, field, error_code)``; confirmation codes
+    are not sent until ``send_confirmations`` is called.
+    """
+
+    def __init__(self, site, batch_size=1000, workers=None, using=None):
+        self.site = site
+        self.batch_size = batch_size
+        self.workers = workers
+        self.using = using or database_for_site(site.pk) or DEFAULT_DB_ALIAS
+        self.processed = 0
+        self.created_ids = []
+        self.rejected = []
+        self._seen_phone_numbers = set()
+        self._seen_emails = set()
+
+    def run(self, rows):
+        """Import ``rows``; yields after every batch so callers can report progress."""
+        executor = None
+        if self.workers != 0:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=django.setup)
+        try:
+            for batch in _batches(rows, self.batch_size):
+                self._import_batch(batch, executor)
+                self.processed += len(batch)
+                yield self.processed
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _reject(self, line_number, field, code):
+        self.rejected.append((line_number, field, code))
+
+    def _validate(self, line_number, row):
+        if row is None:
+            self._reject(line_number, '', error_codes.INVALID_IMPORT_ROW)
+            return None
+        row = {field: str(row.get(field) or '').strip() for field in IMPORT_FIELDS}
+        row['phone_number'] = normalize_phone_number(row['phone_number'])
+        if not row['phone_number']:
+            self._reject(line_number, 'phone_number', error_codes.FIELD_IS_REQUIRED)
+            return None
+        if not _is_valid_phone_number(row['phone_number']):
+            self._reject(line_number, 'phone_number', error_codes.INVALID_PHONE_NUMBER)
+            return None
+        # bulk_create skips model validation, so the choices are checked here.
+        if row['preferred_language'] and row['preferred_language'] not in _language_codes():
+            self._reject(line_number, 'preferred_language', error_codes.INVALID_PREFERRED_LANGUAGE)
+            return None
+        return row
+
+    def _drop_invalid_emails(self, rows):
+        with_email = [(line_number, row) for line_number, row in rows if row['email']]
+        codes = dict(zip(
+            (line_number for line_number, _ in with_email),
+            validate_email.validate_many(row['email'] for _, row in with_email),
+        ))
+        valid_rows = []
+        for line_number, row in rows:
+            if (code := codes.get(line_number)) is not None:
+                self._reject(line_number, 'email', code)
+            else:
+                valid_rows.append((line_number, row))
+        return valid_rows
+
+    def _drop_duplicates(self, rows):
+        queryset = CustomUser.objects.using(self.using).filter(site=self.site)
+        taken_phone_numbers = set(queryset.filter(
+            phone_number__in=[row['phone_number'] for _, row in rows]
+        ).values_list('phone_number', flat=True))
+        taken_emails = {email.lower() for email in queryset.filter(
+            email_iexact_in(row['email'] for _, row in rows if row['email'])
+        ).values_list('email', flat=True)}
+
+        unique_rows = []
+        for line_number, row in rows:
+            if row['phone_number'] in taken_phone_numbers or row['phone_number'] in self._seen_phone_numbers:
+                self._reject(line_number, 'phone_number', error_codes.PHONE_NUMBER_ALREADY_REGISTERED_ON_DOMAIN)
+            elif row['email'] and (row['email'].lower() in taken_emails or row['email'].lower() in self._seen_emails):
+                self._reject(line_number, 'email', error_codes.EMAIL_ALREADY_REGISTERED_ON_DOMAIN)
+            else:
+                self._seen_phone_numbers.add(row['phone_number'])
+                if row['email']:
+                    self._seen_emails.add(row['email'].lower())
+                unique_rows.append((line_number, row))
+        return unique_rows
+
+    def _hash_passwords(self, passwords, executor):
+        # make_password(None) gives an unusable password, like create_user(password=None).
+        if executor is None:
+            return [make_password(password) for password in passwords]
+        return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+    def _import_batch(self, batch, executor):
+        rows = [
+            (line_number, row)
+            for line_number, raw_row in batch
+            if (row := self._validate(line_number, raw_row)) is not None
+        ]
+        rows = self._drop_duplicates(self._drop_invalid_emails(rows))
+        if not rows:
+            return
+        hashes = self._hash_passwords([row['password'] or None for _, row in rows], executor)
+        users = [
+            CustomUser(
+                site=self.site,
+                phone_number=row['phone_number'],
+                email=row['email'],
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                preferred_language=row['preferred_language'] or conf.settings.DEFAULT_LANGUAGE,
+                password=password_hash,
+            )
+            for (_, row), password_hash in zip(rows, hashes)
+        ]
+        with transaction.atomic(using=self.using):
+            CustomUser.objects.using(self.using).bulk_create(users, ignore_conflicts=True)
+            # Rows that lost a race with a concurrent insert were skipped by
+            # the database; the ids generated here tell which ones made it.
+            inserted = set(CustomUser.objects.using(self.using).filter(
+                pk__in=[user.pk for user in users]
+            ).values_list('pk', flat=True))
+        for (line_number, _), user in zip(rows, users):
+            if user.pk in inserted:
+                self.created_ids.append(user.pk)
+            else:
+                self._reject(line_number, '', error_codes.IMPORT_ROW_CONFLICT)
+
+    def send_confirmations(self, chunk_size=500):
+        """Send the confirmation codes ``create_user`` would have sent, for every imported user."""
+        for ids in _batches(self.created_ids, chunk_size):
+            # The chunk's SMS go to the gateway as one send_many batch.
+            with sms_batch():
+                for user in CustomUser.objects.using(self.using).filter(pk__in=ids):
+                    if conf.settings.REQUIRE_EMAIL_CONFIRMATION and user.email:
+                        send_credential_confirmation_code(user, Credential.EMAIL, generate_new=True)
+                    if conf.settings.REQUIRE_PHONE_NUMBER_CONFIRMATION:
+                        send_credential_confirmation_code(user, Credential.PHONE_NUMBER, generate_new=True)
@@ -1,12 +1,9 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import (
-    TokenRefreshView
-)
 
-from .views.google_auth import GoogleSignInView, GoogleCompleteRegistrationView
-from .views.telegram_auth import TelegramSignInView, TelegramCompleteRegistrationView
-from .views.token_obtain_pair import TokenObtainPairView
+from . import conf
+from .views.token_obtain_pair import AsyncTokenObtainPairView, TokenObtainPairView
+from .views.token_refresh import TokenRefreshView, TokenRevokeView
 from .views.user import UserViewSet
 
 router = DefaultRouter()
@@ -14,11 +11,67 @@ router.register("users", UserViewSet)
 
 app_name = 'moses'
 
-urlpatterns = [
-                  path('token/obtain/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-                  path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-                  path('token/google/', GoogleSignInView.as_view(), name='google_sign_in'),
-                  path('token/google/complete/', GoogleCompleteRegistrationView.as_view(), name='google_complete_registration'),
-                  path('token/telegram/', TelegramSignInView.as_view(), name='telegram_sign_in'),
-                  path('token/telegram/complete/', TelegramCompleteRegistrationView.as_view(), name='telegram_complete_registration'),
-              ] + router.urls
+
+def build_urlpatterns():
+    """The moses routes for the current MOSES settings."""
+    # ASYNC_VIEWS serves sign-in through async views, for ASGI deployments.
+    # They run DRF's throttles and exception handler but no authentication
+    # classes (see moses.views.asynchronous.AsyncAPIView).
+    async_views = conf.settings.ASYNC_VIEWS
+
+    urlpatterns = [
+                      path(
+                          'token/obtain/',
+                          (AsyncTokenObtainPairView if async_views else TokenObtainPairView).as_view(),
+                          name='token_obtain_pair'
+                      ),
+                      path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+                      path('token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
+                  ] + router.urls
+
+    # Social sign-in views (and the provider libraries behind them) are only
+    # imported, and their routes only registered, for configured providers.
+    if conf.settings.GOOGLE_OAUTH2_CLIENT_ID:
+        from .views import google_auth
+
+        urlpatterns += [
+            path(
+                'token/google/',
+                (google_auth.AsyncGoogleSignInView if async_views else google_auth.GoogleSignInView).as_view(),
+                name='google_sign_in'
+            ),
+            path(
+                'token/google/complete/',
+                (
+                    google_auth.AsyncGoogleCompleteRegistrationView if async_views
+                    else google_auth.GoogleCompleteRegistrationView
+                ).as_view(),
+                name='google_complete_registration'
+            ),
+        ]
+
+    if conf.settings.TELEGRAM_BOT_TOKEN:
+        from .views import telegram_auth
+
+        urlpatterns += [
+            path(
+                'token/telegram/',
+                (
+                    telegram_auth.AsyncTelegramSignInView if async_views
+                    else telegram_auth.TelegramSignInView
+                ).as_view(),
+                name='telegram_sign_in'
+            ),
+            path(
+                'token/telegram/complete/',
+                (
+                    telegram_auth.AsyncTelegramCompleteRegistrationView if async_views
+                    else telegram_auth.TelegramCompleteRegistrationView
+                ).as_view(),
+                name='telegram_complete_registration'
+            ),
+        ]
+    return urlpatterns
+
+
+urlpatterns = build_urlpatterns()
@@ -1,6 +1,7 @@
 import ipaddress
 import math
 import re
+from functools import lru_cache
 from pathlib import Path
 from urllib.parse import urlsplit
 
@@ -209,6 +210,29 @@ def validate_integer(value):
     return integer_validator(value)
 
 
+# Compiled once at import: every EmailValidator shares these.
+EMAIL_USER_RE = re.compile(
+    # dot-atom
+    r"(^[-!#$%&'*+/=?^_`{}|~0-9A-Z]+(\.[-!#$%&'*+/=?^_`{}|~0-9A-Z]+)*\Z"
+    # quoted-string
+    r'|^"([\001-\010\013\014\016-\037!#-\[\]-\177]|\\[\001-\011\013\014\016-\177])'
+    r'*"\Z)',
+    re.IGNORECASE,
+)
+EMAIL_DOMAIN_RE = re.compile(
+    r"^" + DomainNameValidator.hostname_re + DomainNameValidator.domain_re + DomainNameValidator.tld_no_fqdn_re
+    + r"\Z",
+    re.IGNORECASE,
+)
+EMAIL_LITERAL_RE = re.compile(
+    # literal form, ipv4 or ipv6 address (SMTP 4.1.3)
+    r"\[([A-F0-9:.]+)\]\Z",
+    re.IGNORECASE,
+)
+# Recent verdicts remembered per validator, keyed by the lowercased address.
+EMAIL_VERDICT_CACHE_SIZE = 4096
+
+
 @deconstructible
 class EmailValidator:
     message = _("Enter a valid email address.")
@@ -217,23 +241,9 @@ class EmailValidator:
     domain_re = DomainNameValidator.domain_re
     tld_no_fqdn_re = DomainNameValidator.tld_no_fqdn_re
 
-    user_regex = _lazy_re_compile(
-        # dot-atom
-        r"(^[-!#$%&'*+/=?^_`{}|~0-9A-Z]+(\.[-!#$%&'*+/=?^_`{}|~0-9A-Z]+)*\Z"
-        # quoted-string
-        r'|^"([\001-\010\013\014\016-\037!#-\[\]-\177]|\\[\001-\011\013\014\016-\177])'
-        r'*"\Z)',
-        re.IGNORECASE,
-    )
-    domain_regex = _lazy_re_compile(
-        r"^" + hostname_re + domain_re + tld_no_fqdn_re + r"\Z",
-        re.IGNORECASE,
-    )
-    literal_regex = _lazy_re_compile(
-        # literal form, ipv4 or ipv6 address (SMTP 4.1.3)
-        r"\[([A-F0-9:.]+)\]\Z",
-        re.IGNORECASE,
-    )
+    user_regex = EMAIL_USER_RE
+    domain_regex = EMAIL_DOMAIN_RE
+    literal_regex = EMAIL_LITERAL_RE
     domain_allowlist = ["localhost"]
 
     # Field name is required to provide context in error messages
@@ -248,53 +258,47 @@ class EmailValidator:
             self.domain_allowlist = allowlist
         if field_name is not None:
             self.field_name = field_name
+        # Domains are case-insensitive, and so are the regexes, so the verdict
+        # of an address is the verdict of its lowercased form.
+        self._allowlist = frozenset(domain.lower() for domain in self.domain_allowlist)
+        self._verdicts = lru_cache(maxsize=EMAIL_VERDICT_CACHE_SIZE)(self._error_code)
 
     def __call__(self, value):
-        # The maximum length of an email is 320 characters per RFC 3696
-        # section 3.
-        if not value:
+        code = self.error_code(value)
+        if code is not None:
             raise CustomAPIException({
                 self.field_name: [
                     KwargsError(
-                        code=error_codes.FIELD_IS_REQUIRED,
+                        code=code,
                         kwargs={'provided_email': value or ''}
                     )
                 ]
             })
 
+    def error_code(self, value):
+        """The error code for ``value``, ``None`` when it is a valid address."""
+        if not value:
+            return error_codes.FIELD_IS_REQUIRED
+        return self._verdicts(value.lower())
+
+    def validate_many(self, emails):
+        """Error codes (``None`` for valid addresses) of ``emails``, in order, without raising."""
+        return [self.error_code(email) for email in emails]
+
+    def _error_code(self, value):
+        # The maximum length of an email is 320 characters per RFC 3696
+        # section 3.
         if "@" not in value or len(value) > 320:
-            raise CustomAPIException({
-                self.field_name: [
-                    KwargsError(
-                        code=error_codes.INVALID_EMAIL,
-                        kwargs={'provided_email': value}
-                    )
-                ]
-            })
+            return error_codes.INVALID_EMAIL
 
         user_part, domain_part = value.rsplit("@", 1)
 
         if not self.user_regex.match(user_part):
-            raise CustomAPIException({
-                self.field_name: [
-                    KwargsError(
-                        code=error_codes.INVALID_EMAIL,
-                        kwargs={'provided_email': value}
-                    )
-                ]
-            })
+            return error_codes.INVALID_EMAIL
 
-        if domain_part not in self.domain_allowlist and not self.validate_domain_part(
-            domain_part
-        ):
-            raise CustomAPIException({
-                self.field_name: [
-                    KwargsError(
-                        code=error_codes.INVALID_EMAIL,
-                        kwargs={'provided_email': value}
-                    )
-                ]
-            })
+        if domain_part not in self._allowlist and not self.validate_domain_part(domain_part):
+            return error_codes.INVALID_EMAIL
+        return None
 
     def validate_domain_part(self, domain_part):
         if self.domain_regex.match(domain_part):
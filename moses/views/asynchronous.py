@@ -0,0 +1,91 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from moses.common import encoders
+from moses.common.renderers import ENVELOPE_DATA_PREFIX
+from moses import conf
+
+
+def _dumps(data):
+    return (conf.settings.JSON_ENCODER or encoders.dumps)(data)
+
+
+async def aissue_tokens(issue, *args):
+    """Call the token-issuing ``issue`` from async code."""
+    if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        # Issuing a refresh token then writes it to the database.
+        return await sync_to_async(issue)(*args)
+    return issue(*args)
+
+
+class AsyncAPIView(View):
+    """
+    Async JSON POST endpoint for ASGI deployments.
+
+    DRF views are synchronous, so this is a plain Django async view: the body
+    is parsed as JSON, ``handle`` returns ``(data, status_code)`` and the
+    response uses the same envelope as CustomJSONRenderer. Like APIView it
+    checks ``throttle_classes`` and renders exceptions through DRF's
+    ``EXCEPTION_HANDLER`` with the first of ``DEFAULT_RENDERER_CLASSES``.
+
+    No authentication classes run: the sign-in endpoints allow anyone, and
+    throttles see every request as anonymous.
+    """
+    http_method_names = ['post', 'options']
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token endpoints are not session-authenticated, like DRF's APIView.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def post(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        try:
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles)(drf_request)
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                raise ParseError()
+            data, status_code = await self.handle(request, data)
+        except Exception as exc:
+            return await sync_to_async(self.handle_exception)(drf_request, exc)
+        return HttpResponse(
+            ENVELOPE_DATA_PREFIX + _dumps(data) + b'}',
+            status=status_code,
+            content_type='application/json',
+        )
+
+    async def handle(self, request, data):
+        raise NotImplementedError
+
+    def check_throttles(self, request):
+        """APIView.check_throttles: raise Throttled when any throttle refuses the request."""
+        throttle_durations = []
+        for throttle in (throttle_class() for throttle_class in self.throttle_classes):
+            if not throttle.allow_request(request, self):
+                throttle_durations.append(throttle.wait())
+        if throttle_durations:
+            durations = [duration for duration in throttle_durations if duration is not None]
+            raise Throttled(max(durations, default=None))
+
+    def handle_exception(self, request, exc):
+        """Render ``exc`` as APIView does; exceptions the handler doesn't know propagate."""
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        request.accepted_renderer, request.accepted_media_type = renderer, renderer.media_type
+        context = {'view': self, 'args': self.args, 'kwargs': self.kwargs, 'request': request}
+        response = api_settings.EXCEPTION_HANDLER(exc, context)
+        if response is None:
+            raise exc
+        response.accepted_renderer, response.accepted_media_type = renderer, renderer.media_type
+        response.renderer_context = {**context, 'response': response}
+        return response.render()
@@ -0,0 +1,115 @@
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from moses.services import social_auth
+from moses.services.token_versions import refresh_token_for
+from moses.views.asynchronous import AsyncAPIView, aissue_tokens
+
+
+def _tokens_data(user):
+    refresh = refresh_token_for(user)
+    return {
+        'status': 'authenticated',
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+
+def _phone_required_data(provider, temp_token, identity):
+    return {
+        'status': 'phone_required',
+        provider.token_field: temp_token,
+        **{field: identity.get(field, '') for field in provider.sign_up_fields},
+    }
+
+
+class SocialSignInView(APIView):
+    """
+    Step 1 of social sign-in for ``provider``.
+
+    If the user exists: returns JWT tokens.
+    If the user is new: returns a temporary token for completing registration.
+    """
+    permission_classes = [AllowAny]
+    provider = None
+    serializer_class = None
+    # Serializer field holding the provider credentials passed to verify().
+    credentials_field = None
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user, temp_token, identity = social_auth.sign_in(
+            self.provider,
+            serializer.validated_data[self.credentials_field],
+            serializer.validated_data['domain'],
+        )
+        if user is not None:
+            return Response(_tokens_data(user))
+        return Response(_phone_required_data(self.provider, temp_token, identity))
+
+
+class SocialCompleteRegistrationView(APIView):
+    """
+    Step 2 of social sign-in (new users only).
+    Accepts the temporary token, phone_number and domain.
+    Creates the user and returns JWT tokens.
+    """
+    permission_classes = [AllowAny]
+    provider = None
+    serializer_class = None
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        user = social_auth.complete_registration(
+            self.provider,
+            serializer.validated_data[self.provider.token_field],
+            serializer.validated_data['phone_number'],
+            serializer.validated_data['domain'],
+            email=serializer.validated_data.get('email', ''),
+        )
+        return Response(_tokens_data(user), status=status.HTTP_201_CREATED)
+
+
+class AsyncSocialSignInView(AsyncAPIView):
+    """Async SocialSignInView: provider verification and lookups never pin a worker thread."""
+    provider = None
+    serializer_class = None
+    credentials_field = None
+
+    async def handle(self, request, data):
+        serializer = self.serializer_class(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        user, temp_token, identity = await social_auth.asign_in(
+            self.provider,
+            serializer.validated_data[self.credentials_field],
+            serializer.validated_data['domain'],
+        )
+        if user is not None:
+            return await aissue_tokens(_tokens_data, user), status.HTTP_200_OK
+        return _phone_required_data(self.provider, temp_token, identity), status.HTTP_200_OK
+
+
+class AsyncSocialCompleteRegistrationView(AsyncAPIView):
+    """Async SocialCompleteRegistrationView."""
+    provider = None
+    serializer_class = None
+
+    async def handle(self, request, data):
+        serializer = self.serializer_class(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        user = await social_auth.acomplete_registration(
+            self.provider,
+            serializer.validated_data[self.provider.token_field],
+            serializer.validated_data['phone_number'],
+            serializer.validated_data['domain'],
+            email=serializer.validated_data.get('email', ''),
+        )
+        return await aissue_tokens(_tokens_data, user), status.HTTP_201_CREATED
@@ -1,6 +1,8 @@
+from rest_framework import status
 from rest_framework_simplejwt.views import TokenViewBase
 
 from moses.serializers import TokenObtainPairSerializer
+from moses.views.asynchronous import AsyncAPIView
 
 
 class TokenObtainPairView(TokenViewBase):
@@ -10,3 +12,16 @@ class TokenObtainPairView(TokenViewBase):
         return {
             'request': self.request
         }
+
+
+class AsyncTokenObtainPairView(AsyncAPIView):
+    """
+    Async TokenObtainPairView: the user lookup uses the async ORM and password
+    hashing runs in a worker thread (see MFAModelBackend.aauthenticate).
+    """
+    serializer_class = TokenObtainPairSerializer
+
+    async def handle(self, request, data):
+        serializer = self.serializer_class(data=data, context={'request': request})
+        attrs = serializer.to_internal_value(data)
+        return await serializer.avalidate(attrs), status.HTTP_200_OK
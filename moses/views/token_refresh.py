@@ -0,0 +1,13 @@
+from rest_framework_simplejwt.views import TokenViewBase
+
+from moses.serializers import TokenRefreshSerializer, TokenRevokeSerializer
+
+
+class TokenRefreshView(TokenViewBase):
+    """Refresh (and, with ROTATE_REFRESH_TOKENS, rotate) through moses' revocation store."""
+    serializer_class = TokenRefreshSerializer
+
+
+class TokenRevokeView(TokenViewBase):
+    """Revoke a refresh token, e.g. on sign-out."""
+    serializer_class = TokenRevokeSerializer
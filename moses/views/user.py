@@ -3,8 +3,9 @@ from django.conf import settings as django_settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import DEFAULT_DB_ALIAS
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils.timezone import now
 from djoser import signals, utils
 from djoser.compat import get_user_email
@@ -14,17 +15,25 @@ from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
 from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser
 from rest_framework.response import Response
 
+from moses import db_routers
 from moses.common import error_codes
 from moses.common.exceptions import KwargsError, CustomAPIException
-from moses.conf import settings as moses_settings
+from moses.common.pagination import KeysetPagination
+from moses import conf
 from moses.decorators import otp_required
 from moses.enums import Credential
-from moses.models import CustomUser
+from moses.models import CustomUser, email_iexact, is_mfa_enabled_annotation
+from moses.serializers import site_with_domain_exists
 from moses.services.credentials_confirmation import try_to_confirm_credential, send_credential_confirmation_code
+from moses.services.export import EXPORT_FORMATS, export_users
+from moses.services.mail import mail_batch, send_email
 from moses.services.messages import render_message
+from moses.services.phone_numbers import normalize_phone_number
 from moses.services.reset_password import send_password_reset_code
+from moses.services.sites import database_for_site
 
 User = get_user_model()
 
@@ -35,6 +44,48 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = djoser_settings.PERMISSIONS.user
     token_generator = default_token_generator
     lookup_field = djoser_settings.USER_ID_FIELD
+    pagination_class = KeysetPagination
+    # Pure read actions served from MOSES["READ_REPLICA_DATABASE"] (GET only).
+    replica_read_actions = (
+        "me",
+        "credential_availability",
+        "mfa_status",
+        "sms_unlock_time",
+        "get_user_roles",
+        "get_user_by_phone_number_or_email",
+    )
+    _read_replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        if (
+                self.action in self.replica_read_actions
+                and request.method in SAFE_METHODS
+                and not db_routers.is_pinned_to_primary(request)
+        ):
+            self._read_replica_token = db_routers.use_read_replica()
+        super().initial(request, *args, **kwargs)
+        if (
+                self._read_replica_token is not None
+                and request.user.is_authenticated
+                and db_routers.is_pinned_to_primary(request, request.user)
+        ):
+            # The user wrote recently from another client: read from the
+            # primary, including the user row authentication just fetched.
+            db_routers.release_read_replica(self._read_replica_token)
+            self._read_replica_token = None
+            request.user.refresh_from_db(using=DEFAULT_DB_ALIAS)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        db_routers.release_read_replica(self._read_replica_token)
+        self._read_replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            db_routers.pin_to_primary(request, request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        # Every email of the request goes out over one connection after commit.
+        with mail_batch():
+            return super().dispatch(request, *args, **kwargs)
 
     def permission_denied(self, request, **kwargs):
         if (
@@ -47,10 +98,48 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        queryset = super().get_queryset()
+        # Read from the database holding the requester's site. Staff see every
+        # site on it, other users only their own site.
+        if not user.is_authenticated:
+            queryset = super().get_queryset()
+        elif user.is_staff:
+            queryset = User.objects.db_manager(database_for_site(user.site_id)).all()
+        else:
+            queryset = User.objects.for_site(user.site_id).all()
         if djoser_settings.HIDE_USERS and self.action == "list" and not user.is_staff:
             queryset = queryset.filter(pk=user.pk)
-        return queryset
+        if (fields := self.get_sparse_fields()) is not None and (columns := self.get_sparse_columns(fields)):
+            queryset = queryset.only(*columns)
+        return queryset.annotate(is_mfa_enabled=is_mfa_enabled_annotation())
+
+    def get_sparse_fields(self):
+        """Serializer fields requested through ``?fields=`` on the list action, if any."""
+        if self.action != "list" or not (fields := self.request.query_params.get("fields")):
+            return None
+        return {name.strip() for name in fields.split(",") if name.strip()}
+
+    def get_sparse_columns(self, fields):
+        """Model columns backing ``fields``, or ``None`` when some of them can't be resolved."""
+        serializer = self.get_serializer_class()()
+        field_columns = getattr(serializer, "sparse_field_columns", {})
+        concrete_fields = {field.name for field in User._meta.concrete_fields}
+        columns = {"id", "created_at"}
+        for name in fields.intersection(serializer.fields):
+            if name in field_columns:
+                columns.update(field_columns[name])
+            elif (source := serializer.fields[name].source) in concrete_fields:
+                columns.add(source)
+            else:
+                return None
+        return columns
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if (fields := self.get_sparse_fields()) is not None:
+            serializer_fields = serializer.child.fields if kwargs.get("many") else serializer.fields
+            for name in set(serializer_fields) - fields:
+                serializer_fields.pop(name)
+        return serializer
 
     def get_permissions(self):
         if self.action == "create":
@@ -65,6 +154,8 @@ class UserViewSet(viewsets.ModelViewSet):
             self.permission_classes = djoser_settings.PERMISSIONS.password_reset_confirm
         elif self.action == "set_password":
             self.permission_classes = djoser_settings.PERMISSIONS.set_password
+        elif self.action == "export":
+            self.permission_classes = [IsAdminUser]
         elif self.action in ("mfa_status", "credential_availability", "sms_unlock_time"):
             self.permission_classes = []
         elif self.action == "destroy" or (
@@ -112,7 +203,11 @@ class UserViewSet(viewsets.ModelViewSet):
         return self.serializer_class
 
     def get_instance(self):
-        return self.request.user
+        # request.user carries the for_auth() columns only; ``me`` reads and
+        # writes every field, so fetch the rest in one query, not one per field.
+        user = self.request.user
+        user.load_deferred(*user.get_deferred_fields())
+        return user
 
     def perform_create(self, serializer, *args, **kwargs):
         user = serializer.save(*args, **kwargs)
@@ -197,25 +292,24 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(["get"], detail=False)
     def credential_availability(self, request):
-        kwargs = {'site__domain': request.GET.get('domain')}
+        lookup = Q()
         if (email := request.GET.get('email')) is not None:
-            kwargs['email'] = email
+            lookup &= email_iexact(email)
         elif (phone_number := request.GET.get('phone_number')) is not None:
-            kwargs['phone_number'] = phone_number
+            lookup &= Q(phone_number=normalize_phone_number(phone_number))
         return Response(
             {
-                'result': not CustomUser.objects.filter(**kwargs).exists()
+                'result': not CustomUser.objects.for_domain(request.GET.get('domain')).filter(lookup).exists()
             },
             status=status.HTTP_200_OK
         )
 
     @action(["get"], detail=False)
     def mfa_status(self, request):
-        u_qs = CustomUser.objects.filter(
-            phone_number=request.GET.get('phone_number'),
-            site__domain=request.GET.get('domain')
-        )
-        result = u_qs.exists() and bool(u_qs.first().mfa_secret_key)
+        is_mfa_enabled = CustomUser.objects.for_domain(request.GET.get('domain')).with_mfa_status().filter(
+            phone_number=normalize_phone_number(request.GET.get('phone_number')),
+        ).values_list('is_mfa_enabled', flat=True).first()
+        result = bool(is_mfa_enabled)
         return Response({'result': result}, status=status.HTTP_200_OK)
 
     @action(["post"], detail=False)
@@ -228,13 +322,14 @@ class UserViewSet(viewsets.ModelViewSet):
             })
 
         self.request.user.set_password(request.data.get('new_password'))
+        self.request.user.bump_token_version()
         self.request.user.save()
-        if not moses_settings.EMAILS_DISABLED:
+        if not conf.settings.EMAILS_DISABLED:
             user = self.request.user
-            send_mail(
+            send_email(
                 render_message('PASSWORD_CHANGED_TITLE', user),
                 render_message('PASSWORD_CHANGED_BODY', user),
-                'noreply@' + djoser_settings.DOMAIN, [user.email])
+                [user.email], 'noreply@' + djoser_settings.DOMAIN)
         if djoser_settings.LOGOUT_ON_PASSWORD_CHANGE:
             logout_user(self.request)
 
@@ -253,6 +348,7 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         serializer.user.set_password(serializer.validated_data["new_password"])
+        serializer.user.bump_token_version()
         if hasattr(serializer.user, "last_login"):
             serializer.user.last_login = now()
         serializer.user.save()
@@ -294,10 +390,18 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(["get"], detail=False)
     def get_user_by_phone_number_or_email(self, request):
         phone_or_email = request.GET.get('value', None)
-        user = CustomUser.objects.filter(Q(email=phone_or_email) | Q(phone_number=phone_or_email)).first()
+        # On the site of ?domain=, the requester's own by default.
+        if domain := request.GET.get('domain'):
+            users = CustomUser.objects.for_domain(domain)
+        else:
+            users = CustomUser.objects.for_site(request.user.site_id)
+        # Without a value there is nothing to look up: an empty email would match every blank one.
+        user = phone_or_email and users.filter(
+            email_iexact(phone_or_email) | Q(phone_number=normalize_phone_number(phone_or_email))
+        ).first()
         if user:
             from moses.serializers import PublicCustomUserSerializer
-            serializer_class = moses_settings.SHORT_USER_SERIALIZER or PublicCustomUserSerializer
+            serializer_class = conf.settings.SHORT_USER_SERIALIZER or PublicCustomUserSerializer
             return Response(serializer_class(user, context=self.get_serializer_context()).data)
         else:
             raise CustomAPIException({
@@ -306,6 +410,26 @@ class UserViewSet(viewsets.ModelViewSet):
                 ]
             }, status_code=status.HTTP_404_NOT_FOUND)
 
+    @action(["get"], detail=False)
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise CustomAPIException({
+                'export_format': [
+                    KwargsError(
+                        kwargs={'export_format': export_format},
+                        code=error_codes.INVALID_EXPORT_FORMAT)
+                ]
+            })
+        domain = request.query_params.get('domain')
+        site_with_domain_exists(domain)
+        response = StreamingHttpResponse(
+            export_users(domain, export_format),
+            content_type='text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="users-{domain}.{export_format}"'
+        return response
+
     @action(["get"], detail=False)
     def get_user_roles(self, request):
         query_set = Group.objects.filter(user=request.user)
@@ -321,7 +445,7 @@ class UserViewSet(viewsets.ModelViewSet):
                     mfa_secret_key.encode('utf-8')
                 ).provisioning_uri(
                     f"{request.user.first_name} {request.user.last_name}",
-                    moses_settings.DOMAIN
+                    conf.settings.DOMAIN
                 )
             }
         )
@@ -350,6 +474,7 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(["post"], detail=False)
     def disable_mfa(self, request):
         request.user.mfa_secret_key = ''
+        request.user.bump_token_version()
         request.user.save()
         return Response(
             {
@@ -368,17 +493,17 @@ class UserViewSet(viewsets.ModelViewSet):
                     KwargsError(error_codes.INVALID_SMS_TYPE)
                 ]
             }, status_code=status.HTTP_404_NOT_FOUND)
+        users = CustomUser.objects.for_domain(request.query_params.get('domain'))
         if candidate := ('candidate' in request.query_params):
+            # Users without a candidate never match; this also lets the partial candidate index serve the lookup.
             user = get_object_or_404(
-                CustomUser,
-                phone_number_candidate=request.query_params.get('phone_number'),
-                site__domain=request.query_params.get('domain')
+                users.for_throttle().exclude(phone_number_candidate=''),
+                phone_number_candidate=normalize_phone_number(request.query_params.get('phone_number')),
             )
         else:
             user = get_object_or_404(
-                CustomUser,
-                phone_number=request.query_params.get('phone_number'),
-                site__domain=request.query_params.get('domain')
+                users.for_throttle(),
+                phone_number=normalize_phone_number(request.query_params.get('phone_number')),
             )
         if sms_type == 'password_reset':
             sms_unlocks_at = user.password_reset_code_sms_unlocks_at
@@ -415,10 +540,10 @@ class UserViewSet(viewsets.ModelViewSet):
         )
         if False not in confirmation_result:
             if candidate_email:
-                send_mail(
+                send_email(
                     render_message('EMAIL_CHANGED_TITLE', request.user),
                     render_message('EMAIL_CHANGED_BODY', request.user),
-                    'noreply@' + moses_settings.DOMAIN, [candidate_email]
+                    [candidate_email], 'noreply@' + conf.settings.DOMAIN
                 )
             return Response({'result': 'ok'})
         result = {}
@@ -438,11 +563,11 @@ class UserViewSet(viewsets.ModelViewSet):
             request.data.get('candidate_pin', '')
         )
         if False not in confirmation_result:
-            if candidate_phone_number and not moses_settings.EMAILS_DISABLED:
-                send_mail(
+            if candidate_phone_number and not conf.settings.EMAILS_DISABLED:
+                send_email(
                     render_message('PHONE_NUMBER_CHANGED_TITLE', request.user),
                     render_message('PHONE_NUMBER_CHANGED_BODY', request.user),
-                    'noreply@' + moses_settings.DOMAIN, [request.user.email]
+                    [request.user.email], 'noreply@' + conf.settings.DOMAIN
                 )
             return Response(
                 {
@@ -2,7 +2,7 @@ import base64
 import json
 
 from django.contrib.auth import get_user_model
-from django.test import Client
+from django.test import Client, TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
@@ -12,23 +12,31 @@ client = Client()
 drf_request_factory = APIRequestFactory()
 
 
+def committing(view):
+    """Run ``view`` as if its request committed, so deferred side effects fire inside TestCase."""
+    def wrapper(request, *args, **kwargs):
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
 class APIClient:
     def __init__(self, namespace):
         from moses.views.token_obtain_pair import TokenObtainPairView
         from moses.views.user import UserViewSet
-        self.create_user_view = UserViewSet.as_view({'post': 'create'})
-        self.update_user_view = UserViewSet.as_view({'patch': 'me'})
-        self.request_phone_number_confirmation_pin_view = UserViewSet.as_view(
-            {'post': 'request_phone_number_confirmation_pin'})
-        self.confirm_phone_number_view = UserViewSet.as_view({'post': 'confirm_phone_number'})
-        self.confirm_email_view = UserViewSet.as_view({'post': 'confirm_email'})
-        self.update_password_view = UserViewSet.as_view({'post': 'set_password'})
-        self.enable_mfa_view = UserViewSet.as_view({'post': 'enable_mfa'})
-        self.disable_mfa_view = UserViewSet.as_view({'post': 'disable_mfa'})
-        self.login_view = TokenObtainPairView.as_view()
-        self.reset_password_view = UserViewSet.as_view({'post': 'reset_password'})
-        self.get_sms_unlock_time_view = UserViewSet.as_view({'get': 'sms_unlock_time'})
-        self.confirm_reset_password_view = UserViewSet.as_view({'post': 'reset_password_confirm'})
+        self.create_user_view = committing(UserViewSet.as_view({'post': 'create'}))
+        self.update_user_view = committing(UserViewSet.as_view({'patch': 'me'}))
+        self.request_phone_number_confirmation_pin_view = committing(UserViewSet.as_view(
+            {'post': 'request_phone_number_confirmation_pin'}))
+        self.confirm_phone_number_view = committing(UserViewSet.as_view({'post': 'confirm_phone_number'}))
+        self.confirm_email_view = committing(UserViewSet.as_view({'post': 'confirm_email'}))
+        self.update_password_view = committing(UserViewSet.as_view({'post': 'set_password'}))
+        self.enable_mfa_view = committing(UserViewSet.as_view({'post': 'enable_mfa'}))
+        self.disable_mfa_view = committing(UserViewSet.as_view({'post': 'disable_mfa'}))
+        self.login_view = committing(TokenObtainPairView.as_view())
+        self.reset_password_view = committing(UserViewSet.as_view({'post': 'reset_password'}))
+        self.get_sms_unlock_time_view = committing(UserViewSet.as_view({'get': 'sms_unlock_time'}))
+        self.confirm_reset_password_view = committing(UserViewSet.as_view({'post': 'reset_password_confirm'}))
         self._namespace = namespace
 
     def create_user(self, phone_number, password, name, email, domain):
@@ -71,7 +79,8 @@ class APIClient:
         response = self.login_view(request)
         if response.status_code == status.HTTP_200_OK:
             return get_user_model().objects.get(
-                id=json.loads(base64.b64decode(response.data['access'].split('.')[1]))['user_id']
+                # JWT segments are unpadded base64url.
+                id=json.loads(base64.urlsafe_b64decode(response.data['access'].split('.')[1] + '=='))['user_id']
             ), response
         return None, response
 
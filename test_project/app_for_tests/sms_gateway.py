@@ -0,0 +1,76 @@
+import http.client
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from moses.services.sms import SMSHandler
+
+
+class _GatewayRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        messages = payload if self.path == '/messages/batch' else [payload]
+        self.server.record(self.client_address, self.path, messages)
+        self.send_response(202)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSMSGateway(ThreadingHTTPServer):
+    """
+    Local keep-alive HTTP gateway: POST /messages takes one
+    ``{"to", "body"}`` message, POST /messages/batch a list of them.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _GatewayRequestHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.requests = []
+        self.connections = set()
+
+    def record(self, client_address, path, messages):
+        with self.lock:
+            self.connections.add(client_address)
+            self.requests.append(path)
+            self.messages += [(message['to'], message['body']) for message in messages]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class GatewaySMSHandler(SMSHandler):
+    """SMSHandler for FakeSMSGateway keeping one HTTP connection open."""
+    max_concurrency = 1
+
+    def __init__(self, gateway):
+        super().__init__()
+        self.host, self.port = gateway.server_address
+        self.connection = None
+
+    def open(self):
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=5)
+
+    def close(self):
+        self.connection.close()
+
+    def _post(self, path, payload):
+        self.connection.request('POST', path, json.dumps(payload), {'Content-Type': 'application/json'})
+        self.connection.getresponse().read()
+
+    def send(self, recipient, body):
+        self._post('/messages', {'to': recipient, 'body': body})
+
+    def send_many(self, messages):
+        self._post('/messages/batch', [{'to': recipient, 'body': body} for recipient, body in messages])
@@ -0,0 +1,85 @@
+from unittest import mock
+
+import pyotp
+from django.conf import settings as django_settings
+from django.contrib import admin
+from django.contrib.sites.models import Site
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase, override_settings
+
+from moses.admin import CustomUserAdmin
+from moses.common import pagination
+from moses.common.pagination import EstimatedCountPaginator
+from moses.models import CustomUser
+
+
+class CustomUserAdminTestCase(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(domain='admin.com')
+        self.john = CustomUser.objects.create(
+            site=self.site, phone_number='+12345678901', email='john@foo.com', first_name='John'
+        )
+        self.jane = CustomUser.objects.create(
+            site=self.site, phone_number='+12399999999', email='jane@foo.com', last_name='Johnson'
+        )
+        self.model_admin = CustomUserAdmin(CustomUser, admin.site)
+        self.request = RequestFactory().get('/')
+
+    def search(self, term):
+        queryset, may_have_duplicates = self.model_admin.get_search_results(
+            self.request, CustomUser.objects.all(), term
+        )
+        self.assertFalse(may_have_duplicates)
+        return set(queryset)
+
+    @override_settings(MOSES={**django_settings.MOSES, "ADMIN_SEARCH_MODE": "prefix"})
+    def test_prefix_search_matches_by_term_shape(self):
+        self.assertEqual(self.search('+123'), {self.john, self.jane})
+        self.assertEqual(self.search('+12345'), {self.john})
+        self.assertEqual(self.search('jane@'), {self.jane})
+        self.assertEqual(self.search('joh'), {self.john, self.jane})
+        self.assertEqual(self.search(str(self.jane.id)), {self.jane})
+        # Credentials only match from their start.
+        self.assertEqual(self.search('foo.com'), set())
+
+    @override_settings(MOSES={**django_settings.MOSES, "ADMIN_SEARCH_MODE": "exact"})
+    def test_exact_search(self):
+        self.assertEqual(self.search('+123'), set())
+        self.assertEqual(self.search('john@foo.com'), {self.john})
+        self.assertEqual(self.search('john'), {self.john})
+
+    def test_contains_search_is_the_default(self):
+        queryset, _ = self.model_admin.get_search_results(self.request, CustomUser.objects.all(), 'FOO.com')
+        self.assertEqual(set(queryset), {self.john, self.jane})
+
+    def test_mfa_url_is_memoized_per_secret(self):
+        self.assertEqual(self.john.mfa_url, '')
+        self.john.mfa_secret_key = 'JBSWY3DPEHPK3PXP'
+        with mock.patch('pyotp.totp.TOTP', wraps=pyotp.totp.TOTP) as totp:
+            url = self.john.mfa_url
+            self.assertIs(self.john.mfa_url, url)
+            self.john.mfa_secret_key = 'KRSXG5CTMVRXEZLU'
+            self.assertIn('secret=KRSXG5CTMVRXEZLU', self.john.mfa_url)
+        self.assertEqual(totp.call_count, 2)
+
+    def test_changelist_annotates_mfa_status(self):
+        CustomUser.objects.filter(pk=self.jane.pk).update(mfa_secret_key='JBSWY3DPEHPK3PXP')
+        users = self.model_admin.get_queryset(self.request).order_by('-is_mfa_enabled')
+        self.assertEqual([self.model_admin.is_mfa_enabled(user) for user in users], [True, False])
+
+    def test_site_list_filter(self):
+        self.assertIn('site', self.model_admin.list_filter)
+
+    def test_paginator_estimates_only_unfiltered_large_tables(self):
+        with mock.patch.object(pagination, 'estimated_row_count', return_value=50000) as estimate:
+            self.assertEqual(EstimatedCountPaginator(CustomUser.objects.order_by('pk'), 100).count, 50000)
+            self.assertEqual(
+                EstimatedCountPaginator(CustomUser.objects.filter(site=self.site).order_by('pk'), 100).count, 2
+            )
+        estimate.assert_called_once()
+        # SQLite has no planner statistics.
+        self.assertEqual(EstimatedCountPaginator(CustomUser.objects.order_by('pk'), 100).count, 2)
+
+    def test_trigram_indexes_need_postgres(self):
+        with self.assertRaises(CommandError):
+            call_command('moses_trigram_indexes')
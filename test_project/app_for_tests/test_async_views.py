@@ -0,0 +1,104 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework.throttling import BaseThrottle
+
+from moses.common import error_codes
+from moses.models import CustomUser
+from moses.services import google_auth
+from moses.views.google_auth import AsyncGoogleSignInView
+from moses.views.telegram_auth import AsyncTelegramSignInView, AsyncTelegramCompleteRegistrationView
+from moses.views.token_obtain_pair import AsyncTokenObtainPairView
+from test_project.app_for_tests.test_social_auth import BOT_TOKEN, telegram_auth_data
+
+async_request_factory = AsyncRequestFactory()
+
+
+class RefuseThrottle(BaseThrottle):
+    def allow_request(self, request, view):
+        return False
+
+    def wait(self):
+        return 10
+
+
+def post(view, data):
+    return view(async_request_factory.post('/', json.dumps(data), content_type='application/json'))
+
+
+@override_settings(MOSES={
+    **django_settings.MOSES, "TELEGRAM_BOT_TOKEN": BOT_TOKEN, "GOOGLE_OAUTH2_CLIENT_ID": "client-id",
+})
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.create(domain='async.com')
+        self.user = CustomUser.objects.create(
+            site=self.site, phone_number='+12345678901', email='a@foo.com', is_email_confirmed=True
+        )
+        self.user.set_password('abcxyz123')
+        self.user.save()
+
+    async def test_token_obtain(self):
+        view = AsyncTokenObtainPairView.as_view()
+        response = await post(view, {'phone_number': '+12345678901', 'password': 'abcxyz123', 'domain': 'async.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', json.loads(response.content)['data'])
+
+        response = await post(view, {'phone_number': '+12345678901', 'password': 'wrong', 'domain': 'async.com'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(
+            json.loads(response.content)['errors'][''][0]['error_code'],
+            error_codes.USER_WITH_PROVIDED_CREDENTIALS_DOES_NOT_REGISTERED_ON_SPECIFIED_DOMAIN,
+        )
+
+    async def test_throttles_apply(self):
+        view = AsyncTokenObtainPairView.as_view(throttle_classes=[RefuseThrottle])
+        response = await post(view, {'phone_number': '+12345678901', 'password': 'abcxyz123', 'domain': 'async.com'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertIn('detail', json.loads(response.content)['errors'])
+
+    async def test_token_obtain_field_errors(self):
+        response = await post(AsyncTokenObtainPairView.as_view(), {'domain': 'async.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', json.loads(response.content)['errors'])
+
+    async def test_telegram_registration(self):
+        response = await post(
+            AsyncTelegramSignInView.as_view(), {'auth_data': telegram_auth_data(5), 'domain': 'async.com'}
+        )
+        token = json.loads(response.content)['data']['telegram_auth_token']
+        response = await post(AsyncTelegramCompleteRegistrationView.as_view(), {
+            'telegram_auth_token': token, 'phone_number': '+12345678902', 'domain': 'async.com',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await CustomUser.objects.filter(site=self.site, telegram_id='5').aexists())
+
+    async def test_google_sign_in_verifies_with_cached_certs(self):
+        claims = {'iss': 'accounts.google.com', 'sub': 'sub', 'email': 'a@foo.com', 'email_verified': True}
+        fetch = mock.AsyncMock(return_value=({'kid': 'cert'}, 300))
+        with mock.patch.object(google_auth, '_google_certs', (0.0, None)), \
+                mock.patch.object(google_auth, '_afetch_google_certs', fetch), \
+                mock.patch('google.auth.jwt.decode', return_value=claims) as decode:
+            for _ in range(2):
+                response = await post(
+                    AsyncGoogleSignInView.as_view(), {'id_token': 'token', 'domain': 'async.com'}
+                )
+                self.assertEqual(json.loads(response.content)['data']['status'], 'authenticated')
+        fetch.assert_awaited_once()
+        decode.assert_called_with('token', certs={'kid': 'cert'}, audience='client-id')
+        await self.user.arefresh_from_db()
+        self.assertEqual(self.user.google_sub, 'sub')
+
+
+@unittest.skipIf(google_auth.httpx is None, "httpx is not installed")
+def test_http_client_is_closed_with_its_loop():
+    client = asyncio.run(google_auth._http_client())
+    assert client.is_closed
@@ -0,0 +1,64 @@
+from django.contrib.sites.models import Site
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import force_authenticate
+
+from moses.models import CustomUser, email_iexact
+from moses.views.user import UserViewSet
+from test_project.app_for_tests import APIClient, drf_request_factory
+
+test_client = APIClient('')
+
+
+class EmailLookupsTestCase(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(domain='emails.com')
+        self.user = CustomUser.objects.create(
+            site=self.site, phone_number='+996507030927', email='Mixed.Case@Foo.com', is_email_confirmed=True
+        )
+        self.user.set_password('secret!!1')
+        self.user.save()
+
+    def test_lookup_uses_the_lowered_expression(self):
+        queryset = CustomUser.objects.filter(email_iexact('MIXED.case@foo.COM'), site=self.site)
+        self.assertIn('LOWER', str(queryset.query).upper())
+        self.assertEqual(list(queryset), [self.user])
+
+    def test_one_account_per_email_whatever_its_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create(site=self.site, phone_number='+996507030928', email='mixed.case@foo.com')
+        other_site = Site.objects.create(domain='other-emails.com')
+        CustomUser.objects.create(site=other_site, phone_number='+996507030928', email='mixed.case@foo.com')
+
+    def test_credential_availability_ignores_case(self):
+        view = UserViewSet.as_view({'get': 'credential_availability'})
+        request = drf_request_factory.get(
+            reverse('moses:customuser-credential-availability'),
+            {'email': 'mixed.case@foo.com', 'domain': 'emails.com'},
+        )
+        self.assertEqual(view(request).data, {'result': False})
+
+    def test_user_lookup_without_value_finds_nobody(self):
+        CustomUser.objects.create(site=Site.objects.create(domain='blank.com'), phone_number='+996507030929', email='')
+        view = UserViewSet.as_view({'get': 'get_user_by_phone_number_or_email'})
+        for params in ({}, {'value': ''}):
+            request = drf_request_factory.get(
+                reverse('moses:customuser-get-user-by-phone-number-or-email'), params
+            )
+            force_authenticate(request, self.user)
+            self.assertEqual(view(request).status_code, 404)
+
+    def test_registration_rejects_email_differing_only_in_case(self):
+        user, response = test_client.create_user(
+            phone_number='+996507030928', password='secret!!1', name='Q', email='MIXED.CASE@foo.com',
+            domain='emails.com'
+        )
+        self.assertIsNone(user)
+        self.assertEqual(response.status_code, 400)
+
+    def test_reset_password_finds_user_by_mixed_case_email(self):
+        response = test_client.reset_password('mixed.case@FOO.com', 'emails.com')
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.password_reset_code)
@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from moses.common import error_codes
+from moses.common.exceptions import CustomAPIException
+from moses.validators import EmailValidator
+
+
+class EmailValidatorTestCase(SimpleTestCase):
+    def test_validate_many_returns_codes_in_order(self):
+        validator = EmailValidator()
+        self.assertEqual(
+            validator.validate_many(['a@foo.com', '', 'no-at', 'a@b', 'x@[127.0.0.1]', 'root@LOCALHOST']),
+            [None, error_codes.FIELD_IS_REQUIRED, error_codes.INVALID_EMAIL, error_codes.INVALID_EMAIL, None, None],
+        )
+
+    def test_verdicts_are_cached_by_lowercased_address(self):
+        validator = EmailValidator()
+        validator.validate_many(['User@Foo.com', 'user@foo.com', 'USER@FOO.COM', 'bad@'])
+        info = validator._verdicts.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
+    def test_call_raises_with_the_original_address(self):
+        with self.assertRaises(CustomAPIException) as raised:
+            EmailValidator(field_name='new_email')('Bad@@Foo')
+        self.assertEqual(raised.exception.errors_repr['new_email'][0]['error_code'], error_codes.INVALID_EMAIL)
+        self.assertEqual(raised.exception.errors_repr['new_email'][0]['kwargs'], {'provided_email': 'Bad@@Foo'})
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from django.contrib.sites.models import Site
+from django.test import TestCase
+
+from moses.common import error_codes
+from moses.common.exception_handlers import PrerenderedResponse
+from moses.common.exceptions import CustomAPIException, KwargsError
+from moses.models import CustomUser
+from test_project.app_for_tests import APIClient
+
+test_client = APIClient('')
+
+
+def test_kwargs_error_has_slots():
+    with pytest.raises(AttributeError):
+        KwargsError(error_codes.INVALID_OTP).extra = 1
+
+
+def test_kwargs_free_payloads_are_shared_and_read_only():
+    first = CustomAPIException({'otp': [KwargsError(error_codes.INVALID_OTP)]})
+    second = CustomAPIException({'otp': [KwargsError(error_codes.INVALID_OTP)]})
+    assert first.errors_repr is second.errors_repr
+    assert first.body is second.body
+    with pytest.raises(TypeError):
+        first.errors_repr['otp'] = []
+    assert json.loads(first.body) == {
+        'errors': {'otp': [{'error_code': error_codes.INVALID_OTP, 'kwargs': None}]},
+        'data': {},
+    }
+
+
+def test_empty_and_missing_kwargs_render_differently():
+    exc = CustomAPIException({'': [KwargsError(error_codes.ATTEMPTS_LIMIT_REACHED, kwargs={})]})
+    assert json.loads(exc.body)['errors'][''][0]['kwargs'] == {}
+
+
+def test_errors_with_kwargs_are_built_per_raise():
+    exc = CustomAPIException({'domain': [KwargsError(error_codes.SITE_WITH_DOMAIN_DOES_NOT_EXIST, {'domain': 'x'})]})
+    assert exc.body is None
+    assert exc.errors_repr == {
+        'domain': [{'error_code': error_codes.SITE_WITH_DOMAIN_DOES_NOT_EXIST, 'kwargs': {'domain': 'x'}}]
+    }
+
+
+class PrerenderedErrorResponseTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(domain='errors.com')
+        self.user = CustomUser.objects.create(site=site, phone_number='+996507030927')
+        self.user.set_password('secret!!1')
+        self.user.save()
+
+    def test_handler_serves_cached_body(self):
+        user, response = test_client.update_password(self.user, 'wrong', 'secret!!2')
+        self.assertIsInstance(response, PrerenderedResponse)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors']['current_password'][0]['error_code'], error_codes.INVALID_PASSWORD)
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), {
+            'errors': {'current_password': [{'error_code': error_codes.INVALID_PASSWORD, 'kwargs': None}]},
+            'data': {},
+        })
@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.contrib.sites.models import Site
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from moses.management.commands.moses_explain_queries import moses_queries, uses_index
+from moses.models import CustomUser
+from test_project.app_for_tests import APIClient
+
+test_client = APIClient('')
+
+
+class ExplainQueriesTestCase(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(domain='explain.com')
+
+    def test_every_moses_query_is_served_by_an_index(self):
+        out = StringIO()
+        call_command('moses_explain_queries', '--domain', 'explain.com', '--strict', stdout=out)
+        report = dict(line.split(None, 1) for line in out.getvalue().splitlines())
+        self.assertEqual(set(report), set(moses_queries(self.site.pk)))
+        self.assertEqual(set(report.values()), {'index'})
+
+    def test_plans_are_classified(self):
+        self.assertTrue(uses_index('Bitmap Heap Scan on moses_customuser\n  ->  Bitmap Index Scan on x'))
+        self.assertTrue(uses_index('3 0 0 SCAN moses_customuser USING INDEX moses_user_created_idx'))
+        self.assertFalse(uses_index('Seq Scan on moses_customuser  (cost=0.00..1.01 rows=1 width=8)'))
+        self.assertFalse(uses_index('2 0 0 SCAN moses_customuser'))
+
+    def test_no_seqscan_needs_postgres(self):
+        with self.assertRaises(CommandError):
+            call_command('moses_explain_queries', '--no-seqscan')
+
+    def test_empty_candidate_matches_nobody(self):
+        CustomUser.objects.create(site=self.site, phone_number='+996507030927', email='e@foo.com')
+        response = test_client.get_sms_unlock_time('phone_number_confirmation', '', 'explain.com', candidate=True)
+        self.assertEqual(response.status_code, 404)
+
+
+class ExplainQueriesDatabaseTestCase(TestCase):
+    databases = {'default', 'tenant'}
+
+    def test_domain_is_resolved_on_the_database(self):
+        Site.objects.using('tenant').create(domain='tenant-only.com')
+        out = StringIO()
+        call_command('moses_explain_queries', '--domain', 'tenant-only.com', '--database', 'tenant', stdout=out)
+        self.assertIn('sign_in', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('moses_explain_queries', '--domain', 'tenant-only.com', stdout=out)
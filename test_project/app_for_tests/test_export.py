@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from moses.models import CustomUser
+from moses.views.user import UserViewSet
+
+drf_request_factory = APIRequestFactory()
+
+
+class ExportUsersTestCase(TestCase):
+    def setUp(self):
+        self.export_view = UserViewSet.as_view({'get': 'export'})
+        site = Site.objects.create(domain='export.com')
+        other_site = Site.objects.create(domain='other.com')
+        self.staff = CustomUser.objects.create(site=site, phone_number='+100', email='staff@foo.com', is_staff=True)
+        CustomUser.objects.create(site=site, phone_number='+101', email='a@foo.com', mfa_secret_key='SECRET')
+        CustomUser.objects.create(site=other_site, phone_number='+102', email='b@foo.com')
+
+    def test_command_exports_site_users_as_csv(self):
+        out = io.StringIO()
+        call_command('moses_export_users', 'export.com', '--chunk-size', '1', stdout=out)
+        rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+        self.assertEqual({row['phone_number'] for row in rows}, {'+100', '+101'})
+        self.assertNotIn('mfa_secret_key', rows[0])
+        self.assertNotIn('password', rows[0])
+
+    def test_command_exports_ndjson(self):
+        out = io.StringIO()
+        call_command('moses_export_users', 'export.com', '--format', 'ndjson', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertIn(rows[0]['email'], ('staff@foo.com', 'a@foo.com'))
+
+    def _get(self, user, params):
+        request = drf_request_factory.get('/users/export/', params)
+        force_authenticate(request, user)
+        return self.export_view(request)
+
+    def test_endpoint_streams_for_staff_only(self):
+        response = self._get(self.staff, {'domain': 'export.com', 'export_format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+
+        user = CustomUser.objects.get(phone_number='+101')
+        response = self._get(user, {'domain': 'export.com'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_endpoint_rejects_unknown_format(self):
+        response = self._get(self.staff, {'domain': 'export.com', 'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
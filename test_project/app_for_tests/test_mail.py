@@ -0,0 +1,68 @@
+import smtplib
+from unittest import mock
+
+from django.contrib.sites.models import Site
+from django.core import mail
+from django.db import transaction
+from django.test import TestCase
+
+from moses.models import CustomUser
+from moses.services import mail as moses_mail
+from moses.services.mail import close_pooled_connection, mail_batch, send_email
+from moses.views.user import UserViewSet
+from test_project.app_for_tests import APIClient
+
+test_client = APIClient('')
+
+
+class MailTestCase(TestCase):
+    def setUp(self):
+        close_pooled_connection()
+        self.site = Site.objects.create(domain='mail.com')
+        patcher = mock.patch.object(moses_mail, 'get_connection', wraps=moses_mail.get_connection)
+        self.get_connection = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(close_pooled_connection)
+
+    def test_pooled_connection_is_reused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            send_email('one', 'body', ['a@foo.com'])
+            send_email('two', 'body', ['b@foo.com'])
+            self.assertEqual(mail.outbox, [])
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(self.get_connection.call_count, 1)
+
+    def test_failed_send_drops_pooled_connection(self):
+        connection = moses_mail.get_pooled_connection()
+        with mock.patch.object(connection, 'send_messages', side_effect=smtplib.SMTPDataError(554, b'rejected')), \
+                mock.patch.object(connection, 'close', side_effect=OSError) as close:
+            with self.assertRaises(smtplib.SMTPDataError):
+                moses_mail.send_messages([mail.EmailMessage('one', 'body', to=['a@foo.com'])])
+        close.assert_called_once()
+        self.assertIsNot(moses_mail.get_pooled_connection(), connection)
+        self.assertEqual(self.get_connection.call_count, 2)
+
+    def test_request_emails_are_sent_after_commit(self):
+        user = CustomUser.objects.create(
+            site=self.site, phone_number='+12345678901', email='old@foo.com', is_email_confirmed=True
+        )
+        with self.captureOnCommitCallbacks() as callbacks, \
+                mock.patch.object(test_client, 'update_user_view', UserViewSet.as_view({'patch': 'me'})):
+            _, response = test_client.update_user(user, {'email': 'new@foo.com'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(mail.outbox, [])
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['new@foo.com', 'old@foo.com'])
+        self.assertEqual(self.get_connection.call_count, 1)
+
+    def test_rolled_back_batch_is_not_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    with mail_batch():
+                        send_email('lost', 'body', ['a@foo.com'])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(mail.outbox, [])
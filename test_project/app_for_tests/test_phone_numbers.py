@@ -0,0 +1,75 @@
+import importlib
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from moses.models import CustomUser
+from moses.services import phone_numbers
+from moses.services.phone_numbers import is_valid_phone_number, normalize_phone_number, to_e164
+from test_project.app_for_tests import APIClient, mocks
+
+test_client = APIClient('')
+
+
+class PhoneNumbersTestCase(TestCase):
+    def setUp(self):
+        phone_numbers._is_valid.cache_clear()
+        self.site = Site.objects.create(domain='phones.com')
+
+    def test_to_e164(self):
+        self.assertEqual(to_e164('+996 (507) 03-09.27'), '+996507030927')
+        self.assertEqual(to_e164('00996507030927'), '+996507030927')
+        # Without a country code the number keeps its national form, compacted.
+        self.assertEqual(to_e164(' 0507 030927 '), '0507030927')
+        self.assertEqual(to_e164('0507-030-927'), '0507030927')
+
+    def test_validator_verdicts_are_memoized_on_the_canonical_number(self):
+        validator = mock.Mock(wraps=mocks.validate_phone_number)
+        with override_settings(MOSES={**django_settings.MOSES, "PHONE_NUMBER_VALIDATOR": validator}):
+            self.assertTrue(is_valid_phone_number('+996 507 030927'))
+            self.assertTrue(is_valid_phone_number('+996507030927'))
+        validator.assert_called_once_with('+996507030927')
+
+    def test_custom_normalizer(self):
+        with override_settings(MOSES={**django_settings.MOSES, "PHONE_NUMBER_NORMALIZER": str.upper}):
+            self.assertEqual(normalize_phone_number('abc'), 'ABC')
+
+    def test_registration_stores_and_looks_up_the_canonical_number(self):
+        user, response = test_client.create_user(
+            phone_number='+996 507 030-927', password='secret!!1', name='Q', email='q@foo.com', domain='phones.com'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(user.phone_number, '+996507030927')
+        self.assertFalse(CustomUser.objects.filter(phone_number='+996 507 030-927').exists())
+
+        user, response = test_client.login('+996 (507) 030927', 'secret!!1', 'phones.com')
+        self.assertEqual(response.status_code, 200)
+
+    def test_data_migration_normalizes_stored_numbers(self):
+        migration = importlib.import_module('moses.migrations.0012_normalize_phone_numbers')
+        typed = CustomUser.objects.create(site=self.site, phone_number='p1', email='t@foo.com')
+        taken = CustomUser.objects.create(site=self.site, phone_number='+996507030928', email='c@foo.com')
+        colliding = CustomUser.objects.create(site=self.site, phone_number='p2', email='d@foo.com')
+        # Stored before canonicalization, as typed.
+        CustomUser.objects.filter(pk=typed.pk).update(
+            phone_number='+996 507 030-927', phone_number_candidate='00996 507 030929'
+        )
+        CustomUser.objects.filter(pk=colliding.pk).update(phone_number='+996 507 030928')
+
+        # The canonical form of its own, whatever PHONE_NUMBER_NORMALIZER says today.
+        with override_settings(MOSES={**django_settings.MOSES, "PHONE_NUMBER_NORMALIZER": str.upper}), \
+                self.assertRaises(RuntimeError) as raised:
+            migration.normalize_phone_numbers(apps, SimpleNamespace(connection=connection))
+        self.assertIn(f"user {colliding.pk} of site {self.site.pk}: '+996 507 030928'", str(raised.exception))
+
+        typed.refresh_from_db()
+        self.assertEqual((typed.phone_number, typed.phone_number_candidate), ('+996507030927', '+996507030929'))
+        taken.refresh_from_db()
+        self.assertEqual(taken.phone_number, '+996507030928')
+        CustomUser.objects.filter(pk=colliding.pk).delete()
+        migration.normalize_phone_numbers(apps, SimpleNamespace(connection=connection))
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+from django.contrib.sites.models import Site
+from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from moses.authentication import JWTAuthentication, MFAModelBackend
+from moses.enums import Credential
+from moses.models import CustomUser
+from moses.services.credentials_confirmation import try_to_confirm_credential
+from moses.views.user import UserViewSet
+
+
+class QueryProfilesTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(domain='profiles.com')
+        self.user = CustomUser.objects.create(
+            site=site,
+            phone_number='+996507030927',
+            email='foo@foo.com',
+            phone_number_confirmation_pin=123123,
+        )
+        self.user.set_password('secret!!1')
+        self.user.save()
+
+    def test_profiles_defer_columns_outside_the_profile(self):
+        user = CustomUser.objects.for_auth().get(pk=self.user.pk)
+        self.assertIn('phone_number_confirmation_pin', user.get_deferred_fields())
+        self.assertNotIn('mfa_secret_key', user.get_deferred_fields())
+        user = CustomUser.objects.for_throttle().get(pk=self.user.pk)
+        self.assertIn('password', user.get_deferred_fields())
+        user = CustomUser.objects.for_social().get(pk=self.user.pk)
+        self.assertNotIn('google_sub', user.get_deferred_fields())
+
+    def test_jwt_authentication_loads_auth_profile(self):
+        token = AccessToken.for_user(self.user)
+        with self.assertNumQueries(1):
+            user = JWTAuthentication().get_user(token)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIn('phone_number_confirmation_pin', user.get_deferred_fields())
+
+    def test_me_instance_loads_deferred_fields_in_one_query(self):
+        view = UserViewSet()
+        view.request = SimpleNamespace(user=CustomUser.objects.for_auth().get(pk=self.user.pk))
+        with self.assertNumQueries(1):
+            user = view.get_instance()
+        self.assertFalse(user.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual(user.phone_number_confirmation_pin, 123123)
+
+    def test_mfa_backend_authenticates_with_auth_profile(self):
+        user = MFAModelBackend().authenticate(
+            None, username='+996507030927', password='secret!!1', domain='profiles.com'
+        )
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_deferred_confirmation_fields_are_loaded_in_one_query(self):
+        user = CustomUser.objects.for_auth().get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.load_deferred(
+                'phone_number_confirmation_attempts',
+                'phone_number_confirmation_pin',
+                'phone_number_candidate_confirmation_pin',
+            )
+        result = try_to_confirm_credential(user, Credential.PHONE_NUMBER, '123123', '')
+        self.assertEqual(result, (True, None))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_phone_number_confirmed)
+        self.assertEqual(self.user.phone_number_confirmation_pin, 0)
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from moses import db_routers
+from moses.db_routers import ReadReplicaRouter
+from moses.models import CustomUser
+from moses.views.user import UserViewSet
+
+REPLICA_MOSES = {**django_settings.MOSES, "READ_REPLICA_DATABASE": "replica"}
+
+
+@override_settings(MOSES=REPLICA_MOSES)
+def test_reads_are_routed_only_inside_read_replica():
+    router = ReadReplicaRouter()
+    assert router.db_for_read(CustomUser) is None
+    with db_routers.read_replica():
+        assert router.db_for_read(CustomUser) == "replica"
+    assert router.db_for_read(CustomUser) is None
+
+
+@override_settings(MOSES=REPLICA_MOSES)
+def test_instances_read_from_replica_are_written_to_primary():
+    user = CustomUser()
+    user._state.db = "replica"
+    assert ReadReplicaRouter().db_for_write(CustomUser, instance=user) == "default"
+    assert ReadReplicaRouter().allow_migrate("replica", "moses") is False
+
+
+def test_read_replica_is_noop_without_alias():
+    with db_routers.read_replica():
+        assert ReadReplicaRouter().db_for_read(CustomUser) is None
+
+
+@override_settings(MOSES=REPLICA_MOSES)
+class ReplicaActionsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        Site.objects.create(domain='replica.com')
+        self.mfa_status_view = UserViewSet.as_view({'get': 'mfa_status'})
+        self.factory = APIRequestFactory()
+
+    def _mfa_status(self):
+        request = self.factory.get('/users/mfa_status/', {'phone_number': '+0', 'domain': 'replica.com'})
+        with mock.patch.object(db_routers, 'use_read_replica', return_value=None) as use_read_replica:
+            response = self.mfa_status_view(request)
+        self.assertEqual(response.status_code, 200)
+        return use_read_replica.called
+
+    def test_read_action_uses_replica(self):
+        self.assertTrue(self._mfa_status())
+
+    def test_client_is_pinned_to_primary_after_write(self):
+        request = RequestFactory().post('/')
+        db_routers.pin_to_primary(request)
+        self.assertTrue(db_routers.is_pinned_to_primary(request))
+        self.assertFalse(self._mfa_status())
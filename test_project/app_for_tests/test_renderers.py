@@ -0,0 +1,48 @@
+import datetime
+import decimal
+import json
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django.utils.translation import gettext_lazy
+
+from moses.common import encoders
+from moses.common.renderers import CustomJSONRenderer, FastJSONRenderer
+
+PAYLOADS = [
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'name': 'Ünïcode'},
+    {'unlocks_at': datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc)},
+    {'amount': decimal.Decimal('1.5'), 'title': gettext_lazy('Password changed')},
+    [{'a': 1}, {'b': None}],
+    {'errors': {'': [{'error_code': 'invalid_otp', 'kwargs': None}]}, 'data': {}},
+    None,
+]
+
+
+def _context(status_code):
+    return {'response': SimpleNamespace(status_code=status_code)}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+@pytest.mark.parametrize('status_code', [200, 201, 204, 400, 404])
+@pytest.mark.parametrize('data', PAYLOADS)
+def test_fast_renderer_matches_custom_renderer(data, status_code, use_orjson):
+    orjson = encoders.orjson if use_orjson else None
+    with mock.patch.object(encoders, 'orjson', orjson):
+        fast = FastJSONRenderer().render(data, 'application/json', _context(status_code))
+    expected = CustomJSONRenderer().render(data, 'application/json', _context(status_code))
+    assert json.loads(fast) == json.loads(expected)
+
+
+def test_stdlib_fallback_is_byte_identical_to_drf():
+    data = {'id': uuid.uuid4(), 'when': datetime.date(2026, 1, 1), 'name': 'Ünïcode'}
+    with mock.patch.object(encoders, 'orjson', None):
+        fast = FastJSONRenderer().render(data, 'application/json', _context(200))
+    assert fast == CustomJSONRenderer().render(data, 'application/json', _context(200))
+
+
+def test_indent_falls_back_to_drf():
+    rendered = FastJSONRenderer().render({'a': 1}, 'application/json; indent=4', _context(200))
+    assert rendered == CustomJSONRenderer().render({'a': 1}, 'application/json; indent=4', _context(200))
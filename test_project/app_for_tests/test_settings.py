@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import pytest
+from django.conf import settings as django_settings
+from django.test import override_settings
+
+from moses import conf
+from moses.services import messages
+from test_project.app_for_tests import mocks
+
+
+def test_handlers_are_imported_when_compiled():
+    assert conf.settings.SEND_SMS_HANDLER is mocks.send_sms_handler
+
+
+def test_snapshot_is_read_only():
+    with pytest.raises(AttributeError):
+        conf.settings.DOMAIN = 'other.com'
+    with pytest.raises(TypeError):
+        conf.settings.MESSAGE_TEMPLATES['PHONE_NUMBER_CONFIRMATION_PIN_BODY'] = '{pin}'
+
+
+def test_override_swaps_snapshot():
+    original = conf.settings
+    user = SimpleNamespace(preferred_language='en')
+    with override_settings(MOSES={
+        **django_settings.MOSES,
+        "PASSWORD_RESET_TIMEOUT_SECONDS": 1,
+        "MESSAGE_TEMPLATES": {"PHONE_NUMBER_CONFIRMATION_PIN_BODY": "pin {pin}"},
+    }):
+        assert conf.settings is not original
+        assert conf.settings.PASSWORD_RESET_TIMEOUT_SECONDS == 1
+        assert messages.render_message('PHONE_NUMBER_CONFIRMATION_PIN_BODY', user, pin=1) == 'pin 1'
+    assert conf.settings.PASSWORD_RESET_TIMEOUT_SECONDS == original.PASSWORD_RESET_TIMEOUT_SECONDS
+    assert messages.render_message('PHONE_NUMBER_CONFIRMATION_PIN_BODY', user, pin=1) != 'pin 1'
@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+
+from moses.enums import Credential
+from moses.models import CustomUser
+from moses.serializers import PrivateCustomUserSerializer
+from moses.services.credentials_confirmation import send_credential_confirmation_code, try_to_confirm_credential
+from moses.services.side_effects import after_commit
+from moses.signals import phone_number_confirmed
+from test_project.app_for_tests import utils
+
+
+class SideEffectsTestCase(TestCase):
+    def setUp(self):
+        utils.SENT_SMS.clear()
+        self.site = Site.objects.create(domain='effects.com')
+        self.user = CustomUser.objects.create(site=self.site, phone_number='+12345678901', email='e@foo.com')
+        self.confirmed = []
+        receiver = lambda **kwargs: self.confirmed.append(kwargs['phone_number'])
+        phone_number_confirmed.connect(receiver, weak=False)
+        self.addCleanup(phone_number_confirmed.disconnect, receiver)
+
+    def _confirm(self):
+        send_credential_confirmation_code(self.user, Credential.PHONE_NUMBER, generate_new=True)
+        try_to_confirm_credential(self.user, Credential.PHONE_NUMBER, str(self.user.phone_number_confirmation_pin), None)
+
+    def test_rolled_back_sms_and_signals_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._confirm()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(utils.SENT_SMS, {})
+        self.assertEqual(self.confirmed, [])
+
+    def test_failed_update_sends_no_code(self):
+        save = CustomUser.save
+
+        def fail_on_name(user, *args, **kwargs):
+            # The phone number is saved, then the update's last write fails.
+            if user.first_name == 'Failing':
+                raise IntegrityError
+            save(user, *args, **kwargs)
+
+        serializer = PrivateCustomUserSerializer(
+            self.user, data={'phone_number': '+12345678902', 'first_name': 'Failing'}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        with self.captureOnCommitCallbacks(execute=True), self.assertRaises(IntegrityError), \
+                mock.patch.object(CustomUser, 'save', autospec=True, side_effect=fail_on_name):
+            serializer.save()
+        self.assertEqual(utils.SENT_SMS, {})
+
+    def test_side_effects_run_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._confirm()
+            self.assertEqual(utils.SENT_SMS, {})
+            self.assertEqual(self.confirmed, [])
+        self.assertIn('+12345678901', utils.SENT_SMS)
+        self.assertEqual(self.confirmed, ['+12345678901'])
+
+    def test_failing_side_effect_does_not_stop_the_others(self):
+        def fail():
+            raise RuntimeError
+
+        with self.assertLogs(level='ERROR'), self.captureOnCommitCallbacks(execute=True):
+            after_commit(fail)
+            self._confirm()
+        self.assertEqual(self.confirmed, ['+12345678901'])
+
+    @override_settings(MOSES={**django_settings.MOSES, "DEFER_SIDE_EFFECTS": False})
+    def test_inline_dispatch(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._confirm()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.confirmed, ['+12345678901'])
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+
+from moses.models import CustomUser
+from moses.services import signal_dispatch
+from moses.services.signal_dispatch import dispatch_signal, wait_for_receivers
+from moses.signals import email_confirmed
+
+
+class SignalDispatchTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(domain='signals.com')
+        self.user = CustomUser.objects.create(site=site, phone_number='+12345678901', email='s@foo.com')
+        self.calls = []
+        self.metrics = []
+
+    def connect(self, receiver):
+        email_confirmed.connect(receiver, weak=False)
+        self.addCleanup(email_confirmed.disconnect, receiver)
+
+    def send(self):
+        dispatch_signal(
+            email_confirmed, sender=CustomUser, user=self.user, email='s@foo.com', is_initial_confirmation=True
+        )
+
+    def moses(self, **overrides):
+        return override_settings(MOSES={
+            **django_settings.MOSES,
+            "SIGNAL_RECEIVER_METRICS_HANDLER": lambda *args: self.metrics.append(args),
+            **overrides,
+        })
+
+    def test_failing_receiver_is_isolated(self):
+        def failing(**kwargs):
+            raise RuntimeError
+
+        self.connect(failing)
+        self.connect(lambda **kwargs: self.calls.append(kwargs['email']))
+        with self.moses(), self.assertLogs('moses.services.signal_dispatch', 'ERROR'):
+            self.send()
+        self.assertEqual(self.calls, ['s@foo.com'])
+        self.assertEqual([(signal, outcome) for signal, _, _, outcome in self.metrics],
+                         [('email_confirmed', 'error'), ('email_confirmed', 'ok')])
+
+    def test_unverified_django_falls_back_to_send_robust(self):
+        def failing(**kwargs):
+            raise RuntimeError
+
+        self.connect(failing)
+        self.connect(lambda **kwargs: self.calls.append(kwargs['email']))
+        with mock.patch.object(signal_dispatch, 'LIVE_RECEIVERS_API', False), \
+                self.assertLogs('moses.services.signal_dispatch', 'ERROR'):
+            self.send()
+        self.assertEqual(self.calls, ['s@foo.com'])
+
+    def test_executor_does_not_block_the_caller(self):
+        release = threading.Event()
+
+        def slow(**kwargs):
+            release.wait(5)
+            self.calls.append(threading.current_thread().name)
+
+        self.connect(slow)
+        with self.moses(SIGNAL_DISPATCH='executor'):
+            self.send()
+            self.assertEqual(self.calls, [])
+            release.set()
+            self.assertTrue(wait_for_receivers(5))
+        self.assertTrue(self.calls[0].startswith('moses-signals'))
+        self.assertEqual(self.metrics[0][3], 'ok')
+
+    def test_async_receiver_is_cancelled_at_timeout(self):
+        async def hanging(**kwargs):
+            await asyncio.sleep(5)
+            self.calls.append('finished')
+
+        self.connect(hanging)
+        with self.moses(SIGNAL_RECEIVER_TIMEOUT_SECONDS=0.05), self.assertLogs('moses.services.signal_dispatch'):
+            self.send()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.metrics[0][3], 'timeout')
+        self.assertLess(self.metrics[0][2], 1)
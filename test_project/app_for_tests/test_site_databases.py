@@ -0,0 +1,168 @@
+import json
+
+from django.conf import settings as django_settings
+from django.contrib import admin
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.sites.models import Site
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from djoser.utils import encode_uid
+from rest_framework.test import force_authenticate
+
+from moses.admin import CustomUserAdmin
+from moses.db_routers import SiteDatabaseRouter
+from moses.models import CustomUser
+from moses.serializers import ActivationSerializer
+from moses.services import side_effects
+from moses.services.sites import site_id_for_domain
+from moses.views.user import UserViewSet
+from test_project.app_for_tests import drf_request_factory
+
+
+class SiteDatabasesTestCase(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(domain='tenant.com')
+        self.user = CustomUser.objects.create(site=self.site, phone_number='+996507030927', email='s@foo.com')
+
+    def test_site_id_is_cached_until_the_site_changes(self):
+        self.assertEqual(site_id_for_domain('tenant.com'), self.site.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(site_id_for_domain('tenant.com'), self.site.pk)
+
+        self.site.domain = 'renamed.com'
+        self.site.save()
+        self.assertIsNone(site_id_for_domain('tenant.com'))
+        self.assertEqual(site_id_for_domain('renamed.com'), self.site.pk)
+
+    def test_lookups_filter_on_the_site_id(self):
+        users = CustomUser.objects.for_domain('tenant.com').filter(phone_number='+996507030927')
+        self.assertNotIn('django_site', str(users.query))
+        self.assertEqual(list(users), [self.user])
+        self.assertFalse(CustomUser.objects.for_domain('unknown.com').exists())
+        self.assertFalse(CustomUser.objects.for_site(self.site.pk + 1).exists())
+
+    def test_unmapped_sites_leave_routing_alone(self):
+        self.assertIsNone(CustomUser.objects.for_site(self.site.pk)._db)
+        self.assertIsNone(SiteDatabaseRouter().db_for_write(CustomUser, instance=self.user))
+
+    def test_mapped_sites_use_their_database(self):
+        with override_settings(MOSES={**django_settings.MOSES, "SITE_DATABASES": {self.site.pk: 'tenant'}}):
+            self.assertEqual(CustomUser.objects.for_site(self.site.pk).for_auth().db, 'tenant')
+            router = SiteDatabaseRouter()
+            self.assertEqual(router.db_for_write(CustomUser, instance=self.user), 'tenant')
+            # Reading a site's users through the reverse relation.
+            self.assertEqual(router.db_for_read(CustomUser, instance=self.site), 'tenant')
+            self.assertIsNone(router.db_for_read(Site, instance=self.user))
+
+
+class MappedSiteTestCase(TestCase):
+    """A site whose users live on the ``tenant`` database, not the default one."""
+    databases = {'default', 'tenant'}
+
+    def setUp(self):
+        self.site = Site.objects.create(domain='mapped.com')
+        Site.objects.using('tenant').create(pk=self.site.pk, domain='mapped.com')
+        settings = override_settings(
+            MOSES={**django_settings.MOSES, "SITE_DATABASES": {self.site.pk: 'tenant'}},
+            DATABASE_ROUTERS=['moses.db_routers.SiteDatabaseRouter'],
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def register(self):
+        request = drf_request_factory.post(
+            reverse('moses:customuser-list'),
+            json.dumps({
+                'phone_number': '+996507030930',
+                'email': 'mapped@foo.com',
+                'first_name': 'M',
+                'last_name': 'M',
+                'password': 'secret!!1',
+                'domain': 'mapped.com',
+            }),
+            content_type='application/json',
+        )
+        with self.captureOnCommitCallbacks() as default_callbacks, \
+                self.captureOnCommitCallbacks(using='tenant') as tenant_callbacks:
+            response = UserViewSet.as_view({'post': 'create'})(request)
+        self.assertEqual(response.status_code, 201)
+        return CustomUser.objects.using('tenant').get(email='mapped@foo.com'), default_callbacks, tenant_callbacks
+
+    def test_registration_writes_to_the_site_database(self):
+        user, default_callbacks, tenant_callbacks = self.register()
+        self.assertFalse(CustomUser.objects.filter(pk=user.pk).exists())
+        # The confirmation SMS waits for the tenant commit, not the default one.
+        self.assertIn('_deliver', {callback.__name__ for callback in tenant_callbacks})
+        self.assertNotIn('_deliver', {callback.__name__ for callback in default_callbacks})
+
+    def test_side_effects_of_a_rolled_back_write_are_dropped(self):
+        sent = []
+        with self.captureOnCommitCallbacks(using='tenant', execute=True) as callbacks:
+            try:
+                with side_effects.atomic(using='tenant'):
+                    side_effects.after_commit(sent.append, 'sms')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual((callbacks, sent), ([], []))
+
+    def test_users_are_found_on_the_site_database(self):
+        user, *_ = self.register()
+
+        request = drf_request_factory.get(reverse('moses:customuser-list'))
+        force_authenticate(request, user)
+        response = UserViewSet.as_view({'get': 'list'})(request)
+        self.assertEqual([row['id'] for row in response.data['results']], [str(user.pk)])
+
+        request = drf_request_factory.get(
+            reverse('moses:customuser-get-user-by-phone-number-or-email'), {'value': 'mapped@foo.com'}
+        )
+        force_authenticate(request, user)
+        response = UserViewSet.as_view({'get': 'get_user_by_phone_number_or_email'})(request)
+        self.assertEqual(response.status_code, 200)
+
+        model_admin = CustomUserAdmin(CustomUser, admin.site)
+        request = RequestFactory().get('/', {'site__id__exact': self.site.pk})
+        self.assertEqual(list(model_admin.get_queryset(request)), [user])
+        self.assertEqual(model_admin.get_object(request, str(user.pk))._state.db, 'tenant')
+
+    def test_ids_found_on_several_databases_match_nobody(self):
+        user, *_ = self.register()
+        # A row copied to the default database: neither copy can be told apart.
+        CustomUser.objects.using('default').bulk_create([CustomUser(
+            pk=user.pk, site=self.site, phone_number=user.phone_number, email=user.email
+        )])
+        with self.assertRaises(CustomUser.MultipleObjectsReturned):
+            CustomUser.objects.get_from_any_database(user.pk)
+        model_admin = CustomUserAdmin(CustomUser, admin.site)
+        self.assertIsNone(model_admin.get_object(RequestFactory().get('/'), str(user.pk)))
+
+    def test_staff_list_every_site_of_their_database(self):
+        user, *_ = self.register()
+        neighbour = CustomUser.objects.using('tenant').create(
+            site=Site.objects.using('tenant').create(domain='neighbour.com'),
+            phone_number='+996507030931',
+            email='n@foo.com',
+        )
+        list_view = UserViewSet.as_view({'get': 'list'})
+        request = drf_request_factory.get(reverse('moses:customuser-list'))
+        force_authenticate(request, user)
+        self.assertEqual([row['id'] for row in list_view(request).data['results']], [str(user.pk)])
+
+        user.is_staff = True
+        request = drf_request_factory.get(reverse('moses:customuser-list'))
+        force_authenticate(request, user)
+        self.assertEqual(
+            {row['id'] for row in list_view(request).data['results']}, {str(user.pk), str(neighbour.pk)}
+        )
+
+    def test_activation_finds_the_user_on_the_site_database(self):
+        user, *_ = self.register()
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        serializer = ActivationSerializer(
+            data={'uid': encode_uid(user.pk), 'token': default_token_generator.make_token(user)},
+            context={'view': UserViewSet(token_generator=default_token_generator)},
+        )
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.user._state.db, 'tenant')
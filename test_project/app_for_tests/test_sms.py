@@ -0,0 +1,58 @@
+from asgiref.sync import async_to_sync
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.test import TestCase, override_settings
+
+from moses.enums import Credential
+from moses.models import CustomUser
+from moses.services import sms
+from moses.services.credentials_confirmation import send_credential_confirmation_code
+from test_project.app_for_tests import mocks
+from test_project.app_for_tests.sms_gateway import FakeSMSGateway, GatewaySMSHandler
+
+
+class SMSHandlerTestCase(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(domain='sms.com')
+        self.users = [
+            CustomUser.objects.create(site=self.site, phone_number=f'+1234567890{i}', email=f'u{i}@sms.com') for i in range(3)
+        ]
+
+    def test_plain_callable_is_wrapped(self):
+        handler = sms.get_sms_handler()
+        self.assertIsInstance(handler, sms.FunctionSMSHandler)
+        self.assertIs(handler.function, mocks.send_sms_handler)
+        self.assertIs(sms.get_sms_handler(), handler)
+
+    def test_batched_sends_reuse_one_connection(self):
+        with FakeSMSGateway() as gateway:
+            handler = GatewaySMSHandler(gateway)
+            with override_settings(MOSES={**django_settings.MOSES, "SEND_SMS_HANDLER": handler}):
+                with self.captureOnCommitCallbacks(execute=True):
+                    send_credential_confirmation_code(self.users[0], Credential.PHONE_NUMBER, generate_new=True)
+                with self.captureOnCommitCallbacks(execute=True):
+                    with sms.sms_batch():
+                        for user in self.users[1:]:
+                            send_credential_confirmation_code(user, Credential.PHONE_NUMBER, generate_new=True)
+                        self.assertEqual(len(gateway.messages), 1)
+                async_to_sync(sms.asend_sms)('+19999999999', 'async')
+            handler.shutdown()
+
+        self.assertEqual(gateway.requests, ['/messages', '/messages/batch', '/messages'])
+        self.assertEqual(
+            [to for to, _ in gateway.messages],
+            [user.phone_number for user in self.users] + ['+19999999999'],
+        )
+        self.assertEqual(len(gateway.connections), 1)
+        self.assertFalse(handler.is_open)
+
+    def test_batch_is_dropped_on_error(self):
+        with FakeSMSGateway() as gateway:
+            handler = GatewaySMSHandler(gateway)
+            with override_settings(MOSES={**django_settings.MOSES, "SEND_SMS_HANDLER": handler}):
+                with self.assertRaises(RuntimeError):
+                    with sms.sms_batch():
+                        sms.send_sms('+10000000000', 'lost')
+                        raise RuntimeError
+            handler.shutdown()
+        self.assertEqual(gateway.messages, [])
@@ -0,0 +1,112 @@
+import hashlib
+import hmac
+import time
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from moses.common import error_codes
+from moses.common.exceptions import CustomAPIException
+from moses.models import CustomUser
+from moses.services import social_auth
+from moses.views.google_auth import GoogleSignInView
+from moses.views.telegram_auth import TelegramSignInView, TelegramCompleteRegistrationView
+
+drf_request_factory = APIRequestFactory()
+
+BOT_TOKEN = '123456789:test-bot-token'
+
+
+def telegram_auth_data(telegram_id, **fields):
+    auth_data = {'id': telegram_id, 'first_name': 'Tg', 'username': 'tg_user', 'auth_date': int(time.time()), **fields}
+    data_check_string = '\n'.join(f'{key}={auth_data[key]}' for key in sorted(auth_data))
+    secret_key = hashlib.sha256(BOT_TOKEN.encode('utf-8')).digest()
+    auth_data['hash'] = hmac.new(secret_key, data_check_string.encode('utf-8'), hashlib.sha256).hexdigest()
+    return auth_data
+
+
+@override_settings(MOSES={**django_settings.MOSES, "TELEGRAM_BOT_TOKEN": BOT_TOKEN})
+class SocialAuthTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.create(domain='social.com')
+        self.sign_in_view = TelegramSignInView.as_view()
+        self.complete_view = TelegramCompleteRegistrationView.as_view()
+
+    def _sign_in(self, telegram_id):
+        return self.sign_in_view(drf_request_factory.post(
+            '/token/telegram/', {'auth_data': telegram_auth_data(telegram_id), 'domain': 'social.com'}, format='json'
+        ))
+
+    def _complete(self, token, phone_number):
+        return self.complete_view(drf_request_factory.post('/token/telegram/complete/', {
+            'telegram_auth_token': token, 'phone_number': phone_number, 'domain': 'social.com',
+        }, format='json'))
+
+    def test_registration_flow_and_single_use_token(self):
+        response = self._sign_in(42)
+        self.assertEqual(response.data['status'], 'phone_required')
+        self.assertEqual(response.data['username'], 'tg_user')
+        token = response.data['telegram_auth_token']
+
+        response = self._complete(token, '+12345678901')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(CustomUser.objects.filter(site=self.site, telegram_id='42').exists())
+
+        response = self._complete(token, '+12345678902')
+        self.assertEqual(
+            response.data['errors']['telegram_auth_token'][0]['error_code'],
+            error_codes.INVALID_TELEGRAM_AUTH_TEMP_TOKEN,
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._sign_in(42)
+        self.assertEqual(response.data['status'], 'authenticated')
+        # the site id is cached by now: just the (site, subject) lookup
+        self.assertEqual(len(queries.captured_queries), 1)
+
+    def test_conflict_releases_token(self):
+        CustomUser.objects.create(site=self.site, phone_number='+12345678901', email='taken@foo.com')
+        token = self._sign_in(7).data['telegram_auth_token']
+
+        response = self._complete(token, '+12345678901')
+        self.assertEqual(
+            response.data['errors']['phone_number'][0]['error_code'],
+            error_codes.PHONE_NUMBER_ALREADY_REGISTERED_ON_DOMAIN,
+        )
+        self.assertEqual(self._complete(token, '+12345678903').status_code, 201)
+
+    def test_google_links_subject_by_confirmed_email(self):
+        user = CustomUser.objects.create(
+            site=self.site, phone_number='+12345678901', email='g@foo.com', is_email_confirmed=True
+        )
+        claims = {'sub': 'google-sub', 'email': 'g@foo.com', 'email_verified': True}
+        with mock.patch('moses.services.google_auth.verify_google_id_token', return_value=claims):
+            response = GoogleSignInView.as_view()(drf_request_factory.post(
+                '/token/google/', {'id_token': 'token', 'domain': 'social.com'}, format='json'
+            ))
+        self.assertEqual(response.data['status'], 'authenticated')
+        user.refresh_from_db()
+        self.assertEqual(user.google_sub, 'google-sub')
+
+    def test_subject_match_comes_first(self):
+        CustomUser.objects.create(site=self.site, phone_number='+12345678901', email='G@foo.com')
+        linked = CustomUser.objects.create(site=self.site, phone_number='+12345678902', google_sub='google-sub')
+        identity = {'subject': 'google-sub', 'email': 'g@foo.com'}
+        users = list(social_auth._candidates(social_auth.get_provider('google'), self.site.pk, identity))
+        self.assertEqual(users[0], linked)
+        self.assertEqual(social_auth.find_user(social_auth.get_provider('google'), self.site.pk, identity), linked)
+
+    def test_unknown_domain(self):
+        with self.assertRaises(CustomAPIException) as raised:
+            social_auth.resolve_site_id('missing.com')
+        self.assertEqual(
+            raised.exception.errors_repr['domain'][0]['error_code'], error_codes.SITE_WITH_DOMAIN_DOES_NOT_EXIST
+        )
+        self.assertIs(social_auth.get_provider('telegram'), TelegramSignInView.provider)
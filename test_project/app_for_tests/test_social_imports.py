@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings as django_settings
+from django.test import override_settings
+
+import moses.urls
+
+# Imports moses.urls in a fresh interpreter, optionally followed by EAGER
+# imports, and reports the import time, the peak RSS and the google-auth
+# modules loaded. The eager imports are what moses.urls loaded at boot
+# before the social providers became lazy.
+IMPORT_BENCHMARK = """
+import json, resource, sys, time
+import django
+django.setup()
+started = time.perf_counter()
+import moses.urls
+{eager}
+print(json.dumps({{
+    'seconds': time.perf_counter() - started,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'google_modules': sorted(name for name in sys.modules if name.startswith('google.')),
+}}))
+"""
+EAGER_IMPORTS = """
+import moses.views.google_auth, moses.views.telegram_auth
+import google.oauth2.id_token, google.auth.transport.requests
+"""
+
+
+def _import_benchmark(eager=''):
+    result = subprocess.run(
+        [sys.executable, '-c', IMPORT_BENCHMARK.format(eager=eager)],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, 'PYTHONPATH': os.pathsep.join(sys.path)},
+    )
+    return json.loads(result.stdout)
+
+
+def _route_names(urlpatterns):
+    return {pattern.name for pattern in urlpatterns}
+
+
+def test_unconfigured_providers_are_not_imported(record_property):
+    lazy, eager = _import_benchmark(), _import_benchmark(EAGER_IMPORTS)
+    # Reported in the JUnit XML (--junitxml) for tracking boot cost over time.
+    for name, value in (('lazy', lazy), ('eager', eager)):
+        record_property(f'moses_urls_import_ms_{name}', round(value['seconds'] * 1000, 1))
+        record_property(f'moses_urls_max_rss_kb_{name}', value['max_rss_kb'])
+
+    assert lazy['google_modules'] == []
+    assert eager['google_modules']
+    assert lazy['max_rss_kb'] <= eager['max_rss_kb']
+    assert 'google_sign_in' not in _route_names(moses.urls.urlpatterns)
+    assert 'telegram_sign_in' not in _route_names(moses.urls.urlpatterns)
+
+
+def test_configured_providers_register_routes():
+    with override_settings(MOSES={
+        **django_settings.MOSES,
+        "GOOGLE_OAUTH2_CLIENT_ID": "client-id",
+        "TELEGRAM_BOT_TOKEN": "bot-token",
+    }):
+        urlpatterns = moses.urls.build_urlpatterns()
+    assert {'google_sign_in', 'google_complete_registration',
+            'telegram_sign_in', 'telegram_complete_registration'} <= _route_names(urlpatterns)
+    assert 'google_sign_in' not in _route_names(moses.urls.urlpatterns)
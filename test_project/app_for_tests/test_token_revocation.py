@@ -0,0 +1,114 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from moses.authentication import JWTAuthentication
+from moses.models import CustomUser, RevokedToken
+from moses.services import token_revocation
+from moses.services.token_revocation import BloomFilter, is_revoked
+from moses.services.token_versions import refresh_token_for
+from moses.views.token_refresh import TokenRefreshView, TokenRevokeView
+from test_project.app_for_tests import drf_request_factory
+
+
+def post(view, url_name, refresh):
+    request = drf_request_factory.post(reverse(url_name), {'refresh': refresh}, format='json')
+    return view.as_view()(request)
+
+
+class TokenRevocationTestCase(TestCase):
+    def setUp(self):
+        token_revocation.reset_revocation_filter()
+        site = Site.objects.create(domain='tokens.com')
+        self.user = CustomUser.objects.create(site=site, phone_number='+996507030927', email='t@foo.com')
+        self.refresh = refresh_token_for(self.user)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        jtis = [uuid.uuid4().hex for _ in range(1000)]
+        for jti in jtis:
+            bloom.add(jti)
+        self.assertTrue(all(jti in bloom for jti in jtis))
+        false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertLess(len(bloom.bits), 1300)
+
+    def test_bloom_filter_counts_new_items_only(self):
+        bloom = BloomFilter(1000, 0.01)
+        bloom.add('jti')
+        bloom.add('jti')
+        self.assertEqual(bloom.count, 1)
+
+    def test_unrevoked_checks_skip_the_cache_and_database(self):
+        is_revoked('warm-up')
+        with self.assertNumQueries(0):
+            self.assertFalse(is_revoked(uuid.uuid4().hex))
+
+    @override_settings(SIMPLE_JWT={'ROTATE_REFRESH_TOKENS': True})
+    def test_rotated_refresh_token_is_single_use(self):
+        response = post(TokenRefreshView, 'moses:token_refresh', str(self.refresh))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        rotated = response.data['refresh']
+
+        self.assertEqual(post(TokenRefreshView, 'moses:token_refresh', str(self.refresh)).status_code, 401)
+        self.assertEqual(post(TokenRefreshView, 'moses:token_refresh', rotated).status_code, 200)
+
+    @override_settings(SIMPLE_JWT={'ROTATE_REFRESH_TOKENS': True})
+    def test_rotation_revokes_access_tokens_of_the_old_refresh_token(self):
+        old_access = str(self.refresh.access_token)
+        response = post(TokenRefreshView, 'moses:token_refresh', str(self.refresh))
+        self.assertTrue(token_revocation.is_token_revoked(AccessToken(old_access)))
+        self.assertFalse(token_revocation.is_token_revoked(AccessToken(response.data['access'])))
+
+    def test_refresh_without_rotation_keeps_the_token(self):
+        response = post(TokenRefreshView, 'moses:token_refresh', str(self.refresh))
+        self.assertNotIn('refresh', response.data)
+        self.assertFalse(RevokedToken.objects.exists())
+
+    def test_revoked_refresh_token_cannot_refresh(self):
+        self.assertEqual(post(TokenRevokeView, 'moses:token_revoke', str(self.refresh)).status_code, 200)
+        self.assertEqual(post(TokenRefreshView, 'moses:token_refresh', str(self.refresh)).status_code, 401)
+
+    def test_revoking_refresh_token_revokes_its_access_tokens(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.refresh.access_token}')
+        self.assertEqual(JWTAuthentication().authenticate(request)[0], self.user)
+
+        post(TokenRevokeView, 'moses:token_revoke', str(self.refresh))
+        with self.assertRaises(AuthenticationFailed):
+            JWTAuthentication().authenticate(request)
+
+    def test_refresh_for_inactive_user_fails(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(post(TokenRefreshView, 'moses:token_refresh', str(self.refresh)).status_code, 401)
+
+    def test_authentication_rejects_revoked_access_token(self):
+        access = self.refresh.access_token
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(JWTAuthentication().authenticate(request)[0], self.user)
+
+        token_revocation.revoke_token(access)
+        with self.assertRaises(AuthenticationFailed):
+            JWTAuthentication().authenticate(request)
+
+    def test_revocations_from_other_processes_arrive_with_the_next_sync(self):
+        jti = uuid.uuid4().hex
+        self.assertFalse(is_revoked(jti))
+        RevokedToken.objects.create(jti=jti, expires_at=timezone.now() + timedelta(hours=1))
+        self.assertFalse(is_revoked(jti))
+        with override_settings(MOSES={**django_settings.MOSES, 'TOKEN_REVOCATION_SYNC_SECONDS': 0}):
+            self.assertTrue(is_revoked(jti))
+
+    def test_purge_expired_revocations(self):
+        RevokedToken.objects.create(jti='old', expires_at=timezone.now() - timedelta(seconds=1))
+        RevokedToken.objects.create(jti='live', expires_at=timezone.now() + timedelta(hours=1))
+        call_command('moses_purge_revoked_tokens', stdout=open('/dev/null', 'w'))
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
@@ -0,0 +1,105 @@
+from unittest import mock
+
+import pyotp
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+
+from moses.authentication import JWTAuthentication, JWTTokenUserAuthentication
+from moses.models import CustomUser
+from moses.serializers import TokenRefreshSerializer
+from moses.services import token_versions
+from moses.services.token_versions import TOKEN_VERSION_CLAIM, refresh_token_for
+from test_project.app_for_tests import APIClient
+
+test_client = APIClient('')
+
+
+def bearer(token):
+    return RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+class TokenVersionsTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(domain='versions.com')
+        self.user = CustomUser.objects.create(site=site, phone_number='+996507030927', email='v@foo.com')
+        self.user.set_password('secret!!1')
+        self.user.save()
+        self.refresh = refresh_token_for(self.user)
+
+    def assertRevoked(self, authentication=JWTAuthentication):
+        with self.assertRaises(AuthenticationFailed):
+            authentication().authenticate(bearer(self.refresh.access_token))
+
+    def test_tokens_carry_the_version(self):
+        _, response = test_client.login('+996507030927', 'secret!!1', 'versions.com')
+        self.assertEqual(response.status_code, 200)
+        user, _ = JWTAuthentication().authenticate(bearer(response.data['access']))
+        self.assertEqual(user, self.user)
+        self.assertEqual(self.refresh.access_token[TOKEN_VERSION_CLAIM], 0)
+
+    def test_password_change_revokes_tokens(self):
+        _, response = test_client.update_password(self.user, 'secret!!1', 'n3w-secret!!')
+        self.assertEqual(response.status_code, 204)
+        self.assertRevoked()
+        with self.assertRaises(TokenError):
+            TokenRefreshSerializer(data={'refresh': str(self.refresh)}).is_valid()
+
+    def test_mfa_disable_revokes_tokens(self):
+        key = pyotp.random_base32()
+        self.user, _ = test_client.enable_mfa(self.user, key, pyotp.totp.TOTP(key).now())
+        self.refresh = refresh_token_for(self.user)
+        self.user, response = test_client.disable_mfa(self.user, pyotp.totp.TOTP(key).now())
+        self.assertEqual(response.status_code, 200)
+        self.assertRevoked()
+
+    def test_deactivation_revokes_tokens(self):
+        user = CustomUser.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).token_version, 1)
+        # Reactivating doesn't bring the old tokens back.
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.assertRevoked()
+
+    def test_stateless_authentication_reads_the_cached_version(self):
+        JWTTokenUserAuthentication().authenticate(bearer(self.refresh.access_token))
+        with self.assertNumQueries(0):
+            JWTTokenUserAuthentication().authenticate(bearer(self.refresh.access_token))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.bump_token_version()
+            self.user.save()
+        self.assertRevoked(JWTTokenUserAuthentication)
+
+    def test_bumps_increment_in_the_database(self):
+        stale = CustomUser.objects.get(pk=self.user.pk)
+        self.user.bump_token_version()
+        self.user.save()
+        stale.bump_token_version()
+        stale.save(update_fields=['token_version'])
+        self.assertEqual(stale.token_version, 2)
+        self.assertEqual(CustomUser.objects.get(pk=self.user.pk).token_version, 2)
+
+    def test_cached_version_is_dropped_after_the_bump_is_written(self):
+        JWTTokenUserAuthentication().authenticate(bearer(self.refresh.access_token))
+        versions = []
+
+        def delete_many(keys):
+            versions.append(CustomUser.objects.values_list('token_version', flat=True).get(pk=self.user.pk))
+            cache.delete_many(keys)
+
+        with mock.patch.object(token_versions, 'cache', mock.Mock(get=cache.get, delete_many=delete_many)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.bump_token_version()
+                self.user.save()
+        self.assertEqual(versions, [1])
+        self.assertRevoked(JWTTokenUserAuthentication)
+
+    def test_cached_versions_are_kept_per_site(self):
+        JWTTokenUserAuthentication().authenticate(bearer(self.refresh.access_token))
+        key = token_versions.TOKEN_VERSION_CACHE_KEY
+        self.assertEqual(cache.get(key.format(self.user.site_id, self.user.pk)), 0)
+        # Another site's user with the same id has an entry of its own.
+        self.assertIsNone(cache.get(key.format(self.user.site_id + 1, self.user.pk)))
@@ -0,0 +1,67 @@
+import io
+import json
+import tempfile
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.test import TestCase
+
+from moses.common import error_codes
+from moses.models import CustomUser
+from moses.services.user_import import UserImport, read_rows
+from test_project.app_for_tests import utils
+
+CSV_ROWS = """phone_number,email,password,first_name,last_name,preferred_language
++996507030927,a@foo.com,secret!!1,A,A,
++996507030928,not-an-email,secret!!1,B,B,
++12,c@foo.com,secret!!1,C,C,
++996507030929,taken@foo.com,secret!!1,D,D,
++996507030927,e@foo.com,secret!!1,E,E,
++996507030930,,,F,F,en
++996507030931,g@foo.com,secret!!1,G,G,xx
+"""
+
+
+class UserImportTestCase(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(domain='import.com')
+        CustomUser.objects.create(site=self.site, phone_number='+996000000000', email='taken@foo.com')
+        utils.SENT_SMS = {}
+
+    def test_valid_rows_are_created_and_rejects_reported(self):
+        user_import = UserImport(self.site, batch_size=2, workers=0)
+        progress = list(user_import.run(read_rows(io.StringIO(CSV_ROWS))))
+        self.assertEqual(progress, [2, 4, 6, 7])
+        self.assertEqual(len(user_import.created_ids), 2)
+        self.assertEqual(user_import.rejected, [
+            (3, 'email', error_codes.INVALID_EMAIL),
+            (4, 'phone_number', error_codes.INVALID_PHONE_NUMBER),
+            (5, 'email', error_codes.EMAIL_ALREADY_REGISTERED_ON_DOMAIN),
+            (6, 'phone_number', error_codes.PHONE_NUMBER_ALREADY_REGISTERED_ON_DOMAIN),
+            (8, 'preferred_language', error_codes.INVALID_PREFERRED_LANGUAGE),
+        ])
+        user = CustomUser.objects.get(site=self.site, phone_number='+996507030927')
+        self.assertTrue(user.check_password('secret!!1'))
+        self.assertEqual(user.preferred_language, 'en')
+        self.assertFalse(CustomUser.objects.get(phone_number='+996507030930').has_usable_password())
+        self.assertEqual(utils.SENT_SMS, {})
+
+    def test_confirmations_are_sent_on_request(self):
+        user_import = UserImport(self.site, workers=0)
+        lines = io.StringIO(json.dumps({'phone_number': '+996507030927', 'email': 'a@foo.com'}) + '\n{oops\n')
+        list(user_import.run(read_rows(lines, 'ndjson')))
+        self.assertEqual(user_import.rejected, [(2, '', error_codes.INVALID_IMPORT_ROW)])
+        with self.captureOnCommitCallbacks(execute=True):
+            user_import.send_confirmations()
+        user = CustomUser.objects.get(pk=user_import.created_ids[0])
+        self.assertEqual(utils.SENT_SMS['+996507030927'], user.phone_number_confirmation_pin)
+
+    def test_command_uses_process_pool(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write(CSV_ROWS)
+            f.flush()
+            out, err = io.StringIO(), io.StringIO()
+            call_command('moses_import_users', 'import.com', f.name, '--workers', '2', stdout=out, stderr=err)
+        self.assertIn('Imported 2 of 7 rows', out.getvalue())
+        self.assertIn(error_codes.INVALID_EMAIL, err.getvalue())
+        self.assertTrue(CustomUser.objects.get(phone_number='+996507030927').check_password('secret!!1'))
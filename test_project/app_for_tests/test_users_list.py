@@ -0,0 +1,84 @@
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from moses.common import error_codes
+from moses.models import CustomUser
+from moses.serializers import PrivateCustomUserSerializer
+from moses.views.user import UserViewSet
+
+drf_request_factory = APIRequestFactory()
+
+
+class UsersListTestCase(TestCase):
+    def setUp(self):
+        self.list_view = UserViewSet.as_view({'get': 'list'})
+        site = Site.objects.create(domain='list.com')
+        created_at = now()
+        self.staff = CustomUser.objects.create(
+            site=site, phone_number='+100', email='staff@foo.com', is_staff=True, created_at=created_at
+        )
+        for i in range(4):
+            # two users share a timestamp so the id tiebreaker is exercised
+            CustomUser.objects.create(
+                site=site,
+                phone_number=f'+10{i + 1}',
+                email=f'user{i}@foo.com',
+                created_at=created_at - timedelta(minutes=i // 2),
+            )
+
+    def _get(self, params):
+        request = drf_request_factory.get('/users/', params)
+        force_authenticate(request, self.staff)
+        return self.list_view(request)
+
+    def test_pages_follow_keyset_order_without_count(self):
+        seen = []
+        params = {'page_size': 2}
+        with CaptureQueriesContext(connection) as queries:
+            while True:
+                response = self._get(params)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('count', response.data)
+                seen += [row['id'] for row in response.data['results']]
+                if response.data['next'] is None:
+                    break
+                params = {k: v[0] for k, v in parse_qs(urlsplit(response.data['next']).query).items()}
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+        expected = CustomUser.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, [str(pk) for pk in expected])
+
+    def test_count_is_opt_in(self):
+        response = self._get({'count': 1})
+        self.assertEqual(response.data['count'], 5)
+
+    def test_fields_narrow_serializer_and_projection(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get({'fields': 'id'})
+        self.assertEqual(set(response.data['results'][0]), {'id'})
+        users_query = next(query['sql'] for query in queries.captured_queries if 'moses_customuser' in query['sql'])
+        self.assertNotIn('phone_number', users_query)
+
+    @mock.patch.object(UserViewSet, 'serializer_class', PrivateCustomUserSerializer)
+    def test_mfa_status_is_annotated_without_loading_the_secret(self):
+        CustomUser.objects.filter(phone_number='+101').update(mfa_secret_key='SECRET')
+        with CaptureQueriesContext(connection) as queries:
+            response = self._get({'fields': 'phone_number,is_mfa_enabled'})
+        self.assertEqual(
+            {row['phone_number']: row['is_mfa_enabled'] for row in response.data['results']},
+            {'+100': False, '+101': True, '+102': False, '+103': False, '+104': False},
+        )
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertNotIn('"mfa_secret_key",', queries.captured_queries[0]['sql'])
+
+    def test_invalid_cursor(self):
+        response = self._get({'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors']['cursor'][0]['error_code'], error_codes.INVALID_CURSOR)
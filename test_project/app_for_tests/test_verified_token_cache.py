@@ -0,0 +1,57 @@
+import time
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.contrib.sites.models import Site
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from moses.authentication import JWTAuthentication, VerifiedTokenCache, verified_tokens
+from moses.models import CustomUser
+from moses.services.token_versions import refresh_token_for
+
+
+class VerifiedTokenCacheTestCase(SimpleTestCase):
+    def test_entries_expire_with_the_token(self):
+        cache = VerifiedTokenCache()
+        cache.put(b'live', {'exp': time.time() + 60}, 10)
+        cache.put(b'expired', {'exp': time.time() - 1}, 10)
+        cache.put(b'no-exp', {}, 10)
+        self.assertEqual(cache.get(b'live'), {'exp': mock.ANY})
+        self.assertIsNone(cache.get(b'expired'))
+        self.assertIsNone(cache.get(b'no-exp'))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = VerifiedTokenCache()
+        exp = time.time() + 60
+        cache.put(b'a', {'exp': exp}, 2)
+        cache.put(b'b', {'exp': exp}, 2)
+        cache.get(b'a')
+        cache.put(b'c', {'exp': exp}, 2)
+        self.assertIsNone(cache.get(b'b'))
+        self.assertIsNotNone(cache.get(b'a'))
+        self.assertIsNotNone(cache.get(b'c'))
+
+
+class CachedAuthenticationTestCase(TestCase):
+    def setUp(self):
+        verified_tokens.clear()
+        site = Site.objects.create(domain='verified.com')
+        self.user = CustomUser.objects.create(site=site, phone_number='+996507030927', email='c@foo.com')
+        self.request = RequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {refresh_token_for(self.user).access_token}'
+        )
+
+    def authenticate_twice(self):
+        with mock.patch.object(
+                JWTAuthentication, 'verify_token', autospec=True, side_effect=JWTAuthentication.verify_token
+        ) as verify_token:
+            self.assertEqual(JWTAuthentication().authenticate(self.request)[0], self.user)
+            self.assertEqual(JWTAuthentication().authenticate(self.request)[0], self.user)
+        return verify_token.call_count
+
+    def test_repeated_token_is_verified_once(self):
+        self.assertEqual(self.authenticate_twice(), 1)
+
+    @override_settings(MOSES={**django_settings.MOSES, "VERIFIED_TOKEN_CACHE_SIZE": 0})
+    def test_cache_can_be_disabled(self):
+        self.assertEqual(self.authenticate_twice(), 2)
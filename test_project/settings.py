@@ -16,6 +16,8 @@ DATABASES = {
         'PORT': 5432
     }
 }
+# Holds the users of the sites mapped to it in test_site_databases.
+DATABASES['tenant'] = {**DATABASES['default'], 'NAME': 'moses_test_tenant'}
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 MACOS = bool(int(os.environ.get('MACOS', 0)))
@@ -25,6 +27,7 @@ ROOT_URLCONF = "test_project.urls"
 AUTHENTICATION_BACKENDS = ("moses.authentication.MFAModelBackend",)
 DOMAIN = 'lvh.me'
 INSTALLED_APPS = [
+    "django.contrib.admin",
     "django.contrib.contenttypes",
     "django.contrib.auth",
     "django.contrib.sessions",
@@ -36,6 +39,12 @@ INSTALLED_APPS = [
     "moses"
 ]
 
+MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -79,7 +88,8 @@ DJOSER = {
         'current_user': 'moses.serializers.PrivateCustomUserSerializer',
         'token_obtain': 'moses.serializers.TokenObtainSerializer',
         'password_reset': 'moses.serializers.ResetPasswordSerializer',
-        'password_reset_confirm': 'moses.serializers.ConfirmResetPasswordSerializer'
+        'password_reset_confirm': 'moses.serializers.ConfirmResetPasswordSerializer',
+        'activation': 'moses.serializers.ActivationSerializer',
     }
 }
 FIXTURE_DIRS = [